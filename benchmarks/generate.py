@@ -0,0 +1,140 @@
+"""
+Генератор синтетических библиотек замечаний для замеров производительности.
+
+Словарь, категории и теги строятся из examples/example.json, поэтому тексты - русские слова реальной длины, а
+количество категорий, тегов и длины текстов растут с размером библиотеки так, как в настоящих файлах:
+    - слова, категории и теги выбираются с частотами по закону Ципфа (несколько частых, много редких);
+    - словарь растёт как корень из числа слов (закон Хипса): к словам примера добавляются более редкие формы
+      с другими приставками и окончаниями;
+    - длина текста - логнормальная, в среднем около 50 символов, как в примере;
+    - у замечания от 0 до 6 тегов, в среднем около 2,5.
+
+Результат зависит только от количества замечаний и зерна (seed), поэтому замеры разных версий программы идут на
+одинаковых файлах.
+
+Запуск:
+    python benchmarks/generate.py 100000 -o library.json [--seed 0]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Корень репозитория (пакет nca)
+
+from nca.remark_io import json_chunks, txt_chunks, write_file
+from nca.remark_library import Remark
+from nca.search_index import WORD_RE
+
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "example.json")
+PREFIXES = ("", "пере", "под", "пред", "за", "не", "об", "рас")  # Приставки для новых форм слов
+ENDINGS = ("", "а", "ы", "ой", "ами", "ение", "ость", "ный", "ого", "ать", "ует", "ах", "ом", "ии", "ей")  # Окончания
+VARIANTS = len(PREFIXES) * len(ENDINGS)  # Сколько разных форм бывает у слова
+HEAPS_K = 30  # Размер словаря: HEAPS_K * (число слов в библиотеке) ** 0.5
+WORDS_MU = 1.8  # Параметры логнормального числа слов в тексте (в среднем около 6-7 слов)
+WORDS_SIGMA = 0.5
+TAGS_PER_REMARK = (0, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 5, 6)  # Возможное число тегов (равновероятно, в среднем ~2,7)
+
+
+def zipf_weights(count):
+    """Возвращает накопленные веса закона Ципфа для count элементов (для random.choices(cum_weights=...))."""
+    return list(itertools.accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+def load_example():
+    """Возвращает слова, категории и теги файла примера (в порядке убывания частоты)."""
+    with open(EXAMPLE_FILE, encoding="utf-8") as file:
+        items = json.load(file)
+    words = {}
+    categories = {}
+    tags = {}
+    for item in items:
+        for word in WORD_RE.findall(item["text"].lower()):
+            words[word] = words.get(word, 0) + 1
+        categories[item["category"]] = categories.get(item["category"], 0) + 1
+        for tag in item["tags"]:
+            tags[tag] = tags.get(tag, 0) + 1
+    return by_frequency(words), by_frequency(categories), by_frequency(tags)
+
+
+def by_frequency(counts):
+    """Возвращает ключи словаря {имя: количество} в порядке убывания количества."""
+    return sorted(counts, key=counts.get, reverse=True)
+
+
+def extend(names, count, variants):
+    """Дополняет список names до count элементов вариантами variants(name, k) в порядке частоты исходных имён."""
+    result = list(dict.fromkeys(names))
+    seen = set(result)
+    for k in itertools.count(1):
+        if len(result) >= count or k > VARIANTS:
+            break  # Нужное количество набрано или новых вариантов больше нет
+        for name in names:
+            variant = variants(name, k)
+            if variant not in seen:
+                seen.add(variant)
+                result.append(variant)
+                if len(result) >= count:
+                    break
+    return result[:count]
+
+
+def word_form(word, k):
+    """Возвращает k-ю форму слова: основа слова с другой приставкой и другим окончанием (короткие слова - как есть)."""
+    if len(word) <= 3:
+        return word  # Предлоги и союзы не изменяются
+    stem = word[:-1] if len(word) > 4 else word
+    return PREFIXES[k // len(ENDINGS) % len(PREFIXES)] + stem + ENDINGS[k % len(ENDINGS)]
+
+
+def generate_remarks(count, seed=0):
+    """
+    Возвращает синтетические замечания библиотеки размера count (по одному).
+
+    Аргументы:
+        count (int): Количество замечаний.
+        seed (int, optional): Зерно генератора случайных чисел. По умолчанию 0.
+
+    Возвращает:
+        Iterator[Remark]: Замечания в порядке следования.
+    """
+    rng = random.Random(seed)
+    words, categories, tags = load_example()
+    vocabulary = extend(words, max(len(words), int(HEAPS_K * (count * 8) ** 0.5)), word_form)
+    categories = extend(categories, max(len(categories), int(count ** 0.5 / 3)), lambda name, k: f"{name} {k + 1}")
+    tags = extend(tags, max(len(tags), int(count ** 0.5)), lambda tag, k: word_form(tag, k))
+    word_weights = zipf_weights(len(vocabulary))
+    category_weights = zipf_weights(len(categories))
+    tag_weights = zipf_weights(len(tags))
+    for _ in range(count):
+        length = max(2, int(rng.lognormvariate(WORDS_MU, WORDS_SIGMA)))  # Число слов в тексте
+        text = " ".join(rng.choices(vocabulary, cum_weights=word_weights, k=length))
+        category = rng.choices(categories, cum_weights=category_weights)[0]
+        remark_tags = list(dict.fromkeys(rng.choices(tags, cum_weights=tag_weights, k=rng.choice(TAGS_PER_REMARK))))
+        yield Remark(text[0].upper() + text[1:] + ";", category, remark_tags)
+
+
+def write_library(filename, count, seed=0):
+    """Записывает синтетическую библиотеку из count замечаний в .json- или .txt-файл filename."""
+    remarks = list(generate_remarks(count, seed))
+    if filename.endswith(".txt"):
+        write_file(filename, txt_chunks(remarks))
+    else:
+        write_file(filename, json_chunks(remarks, list(dict.fromkeys(remark.category for remark in remarks))))
+
+
+def main():
+    """Разбирает аргументы командной строки и записывает библиотеку."""
+    parser = argparse.ArgumentParser(description="Генератор синтетических библиотек замечаний.")
+    parser.add_argument("count", type=int, help="количество замечаний (например, 1000, 10000, 100000, 1000000)")
+    parser.add_argument("-o", "--output", required=True, help="файл библиотеки (.json или .txt)")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора случайных чисел (по умолчанию 0)")
+    args = parser.parse_args()
+    write_library(args.output, args.count, args.seed)
+
+
+if __name__ == "__main__":
+    main()
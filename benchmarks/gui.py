@@ -0,0 +1,281 @@
+"""
+Сквозные замеры интерфейса без экрана (QT_QPA_PLATFORM=offscreen): главное окно проходит сценарий действий
+пользователя, и для каждого шага замеряется, насколько цикл событий был занят.
+
+Часть затрат приходится на сам Qt (перекладка списков, удаление вкладок, сигналы выделения), и замеры ядра
+(run.py) их не видят. Здесь же окно получает те же события, что и от пользователя: нажатия клавиш, щелчки по
+кнопкам, переключение вкладок. Зависания цикла событий измеряются "пульсом" - таймером с нулевым интервалом,
+который срабатывает на каждой итерации цикла: промежуток между соседними срабатываниями - время, в течение
+которого окно не отвечало. Для каждого шага записываются:
+    time: Время от начала шага до момента, когда окно снова бездействует (загрузка и фильтрация завершены).
+    max_stall: Самое долгое зависание цикла событий в секундах.
+    stalls: Сколько раз цикл событий был занят дольше STALL секунд (заметные пользователю задержки).
+
+Сценарий: запуск окна, открытие большого файла, выделение всех замечаний (Ctrl+A) и копирование, набор запроса
+по одному символу, выделение и удаление найденных замечаний, очистка поиска, переключение вкладок, повторное
+открытие файла (удаление и создание всех вкладок, чтение из снимка). Сценарий идёт с копией файла во временной
+папке, там же на время замеров хранятся настройки приложения: ни файл, ни его снимок, ни настройки пользователя не
+меняются.
+
+Результаты записываются в JSON-файл; с параметром --compare они сравниваются с прежними так же, как в run.py.
+Если какой-либо шаг подвесил окно дольше MAX_STALL секунд (--max-stall), скрипт завершается с кодом 1.
+
+Запуск:
+    python benchmarks/gui.py [--size 100000 | --file library.json] [-o gui-results.json] [--compare old.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # До импорта Qt: окно не выводится на экран
+
+from run import DATA_DIR, THRESHOLD, compare, prepare, program_version
+
+from PyQt5.QtCore import QEvent, QEventLoop, QObject, QSettings, Qt, QTimer, QT_VERSION_STR
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Корень репозитория (иконки ищутся от него)
+SIZE = 100000  # Размер синтетической библиотеки по умолчанию
+STALL = 0.05  # Зависание дольше этого (в секундах) заметно пользователю
+MAX_STALL = 2.0  # Зависание дольше этого (в секундах) - ошибка: окно выглядит зависшим
+TIMEOUT = 600  # Сколько секунд ждать завершения одного шага
+TABS = 5  # Сколько вкладок категорий переключать
+COMPARED = ("time", "max_stall")  # Какие замеры шагов сравниваются с прежними результатами
+
+
+class StallMonitor(QObject):
+    """
+    Пульс цикла событий: выполняет шаг сценария и замеряет зависания цикла событий, пока окно не станет бездействовать.
+
+    Методы:
+        run(action, done, timeout=TIMEOUT):
+            Выполняет действие в цикле событий и возвращает замеры шага.
+    """
+    def __init__(self, parent=None):
+        """Конструктор класса StallMonitor."""
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)  # Срабатывает на каждой итерации цикла событий
+        self.timer.timeout.connect(self.tick)
+        self.loop = None  # Локальный цикл событий текущего шага
+        self.done = None  # Условие завершения шага (проверяется после выполнения действия)
+        self.last = 0.0  # Момент предыдущего срабатывания пульса
+        self.gaps = []  # Промежутки между срабатываниями пульса за текущий шаг
+
+    def run(self, action, done, timeout=TIMEOUT):
+        """
+        Выполняет действие action в цикле событий и ждёт, пока done() не вернёт True.
+
+        Аргументы:
+            action (Callable[[], None]): Действие пользователя.
+            done (Callable[[], bool]): Проверяет, что окно закончило обработку действия.
+            timeout (float, optional): Сколько секунд ждать. По умолчанию TIMEOUT.
+
+        Возвращает:
+            dict[str, float | int]: Замеры шага (time, max_stall, stalls).
+        """
+        self.loop = QEventLoop()
+        self.done = None
+        self.gaps = []
+        expired = []
+
+        def start():
+            action()
+            self.done = done  # Ждём завершения только после того, как действие выполнено
+
+        def expire():
+            expired.append(True)
+            self.loop.quit()
+
+        QTimer.singleShot(0, start)
+        guard = QTimer()
+        guard.setSingleShot(True)
+        guard.timeout.connect(expire)
+        guard.start(int(timeout * 1000))
+        started = self.last = time.perf_counter()
+        self.timer.start()
+        self.loop.exec_()
+        self.timer.stop()
+        guard.stop()
+        if expired:
+            raise TimeoutError(f"Шаг не завершился за {timeout} с")
+        return {
+            "time": time.perf_counter() - started,
+            "max_stall": max(self.gaps, default=0.0),
+            "stalls": sum(gap > STALL for gap in self.gaps),
+        }
+
+    def tick(self):
+        """Отмечает очередную итерацию цикла событий и завершает шаг, когда окно бездействует."""
+        now = time.perf_counter()
+        self.gaps.append(now - self.last)
+        self.last = now
+        if self.done is not None and self.done():
+            self.loop.quit()
+
+
+def idle(window):
+    """Проверяет, что окно бездействует: файл открыт, загрузка и отложенная фильтрация завершены."""
+    return window.startup_file is None and window.load_worker is None and not window.filter_timer.isActive()
+
+
+def type_text(widget, text):
+    """
+    Возвращает действие: набор текста text в виджете widget (по нажатию клавиши на символ).
+
+    QTest.keyClicks умеет набирать только латиницу, поэтому события клавиш с текстом создаются напрямую.
+    """
+    def action():
+        for char in text:
+            for event_type in (QEvent.KeyPress, QEvent.KeyRelease):
+                QApplication.sendEvent(widget, QKeyEvent(event_type, 0, Qt.NoModifier, char))
+    return action
+
+
+def scenario(window, filename, query, tabs=TABS):
+    """
+    Возвращает шаги сценария: пары (название шага, действие). Действия, зависящие от предыдущих шагов (например,
+    выбор вкладок), вычисляются при выполнении.
+    """
+    current_list = window.ui.tabWidget.currentWidget
+    steps = [
+        ("startup", window.show),
+        ("open", lambda: window.load_file(filename)),
+        ("select all", lambda: QTest.keyClick(current_list(), Qt.Key_A, Qt.ControlModifier)),
+        ("copy", window.ui.remarkCopyButton.click),
+    ]
+    for length in range(1, len(query) + 1):
+        steps.append((f"type {query[:length]!r}", type_text(window.ui.searchLineEdit, query[length - 1])))
+    steps += [
+        ("select all (found)", lambda: QTest.keyClick(current_list(), Qt.Key_A, Qt.ControlModifier)),
+        ("delete (found)", window.ui.remarkRemoveButton.click),
+        ("clear search", window.ui.searchLineEdit.clear),
+    ]
+    for index in range(1, tabs + 1):
+        steps.append((f"tab {index}", lambda index=index: window.ui.tabWidget.setCurrentIndex(index)))
+    steps += [
+        ("tab 0", lambda: window.ui.tabWidget.setCurrentIndex(0)),
+        ("reopen", lambda: window.load_file(filename)),
+    ]
+    return steps
+
+
+def measure(filename, query=None, tabs=TABS):
+    """
+    Проходит сценарий в главном окне с файлом filename и возвращает замеры шагов.
+
+    Открытие всегда разбирает файл, а повторное открытие читает снимок, построенный при первом, поэтому файл не должен
+    иметь снимка: main передаёт сюда копию файла во временной папке.
+
+    Аргументы:
+        filename (str): Открываемый файл.
+        query (str, optional): Набираемый запрос. По умолчанию - первые слова замечания из середины файла.
+        tabs (int, optional): Сколько вкладок категорий переключать. По умолчанию TABS.
+
+    Возвращает:
+        tuple[dict[str, dict], int]: Замеры по шагам (в порядке сценария) и количество замечаний в файле.
+    """
+    os.chdir(ROOT)  # Окно ищет иконки относительно текущей папки
+    app = QApplication.instance() or QApplication([])
+    app.setStyle("Fusion")
+    from main_window import MainWindow
+
+    window = MainWindow()
+    monitor = StallMonitor()
+    results = {}
+    for name, action in scenario(window, filename, "", 0)[:2]:  # Запуск и открытие файла
+        results[name] = monitor.run(action, lambda: idle(window))
+    count = window.remark_model.rowCount()
+    if query is None:  # Запрос - начало замечания из середины открытого файла
+        remarks = window.remark_model.library.remarks
+        query = " ".join(remarks[len(remarks) // 2].text.lower().split()[:2])
+    for name, action in scenario(window, filename, query, tabs)[2:]:
+        results[name] = monitor.run(action, lambda: idle(window))
+    window.close()  # На вопрос о сохранении изменений отвечаем "Нет" (см. main)
+    return results, count
+
+
+def compared(results):
+    """Оставляет в замерах шагов только те, что сравниваются с прежними результатами (см. COMPARED)."""
+    return {name: {key: step[key] for key in COMPARED} for name, step in results.items()}
+
+
+def print_table(results):
+    """Печатает замеры шагов в виде таблицы."""
+    print(f"{'шаг':<32}{'время, с':>12}{'зависание, мс':>16}{'зависаний':>12}")
+    for name, step in results.items():
+        print(f"{name:<32}{step['time']:>12.3f}{step['max_stall'] * 1000:>16.1f}{step['stalls']:>12}")
+
+
+def main():
+    """Разбирает аргументы командной строки, проходит сценарий и записывает результаты."""
+    parser = argparse.ArgumentParser(description="Замеры интерфейса без экрана по сценарию действий пользователя.")
+    parser.add_argument("--size", type=int, default=SIZE, help=f"размер синтетической библиотеки ({SIZE})")
+    parser.add_argument("--file", help="открыть этот файл вместо синтетической библиотеки")
+    parser.add_argument("--query", help="набираемый запрос (по умолчанию - начало одного из замечаний)")
+    parser.add_argument("--tabs", type=int, default=TABS, help=f"сколько вкладок переключать ({TABS})")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора библиотеки (по умолчанию 0)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help=f"папка сгенерированных библиотек ({DATA_DIR})")
+    parser.add_argument("-o", "--output", default="gui-results.json", help="файл результатов (JSON)")
+    parser.add_argument("--compare", metavar="FILE", help="прежний файл результатов для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"допустимое замедление относительно прежних результатов (по умолчанию {THRESHOLD})")
+    parser.add_argument("--max-stall", type=float, default=MAX_STALL,
+                        help=f"допустимое зависание окна в секундах на любом шаге (по умолчанию {MAX_STALL})")
+    args = parser.parse_args()
+
+    filename = os.path.abspath(args.file or prepare(args.size, args.data_dir, args.seed)[0])
+    output = os.path.abspath(args.output)  # Пути - до перехода в корень репозитория (см. measure)
+    previous = args.compare and os.path.abspath(args.compare)
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Настройки окна (последний файл, режимы) - во временной папке, а не в настройках пользователя
+        for settings_format in (QSettings.NativeFormat, QSettings.IniFormat):
+            QSettings.setPath(settings_format, QSettings.UserScope, work_dir)
+        QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.No)  # Изменения не сохраняем
+        # Копия файла без снимка: снимок и журнал, созданные при замерах, остаются во временной папке
+        work_file = os.path.join(work_dir, os.path.basename(filename))
+        shutil.copyfile(filename, work_file)
+        results, count = measure(work_file, args.query, args.tabs)
+    report = {
+        "version": program_version(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "file": filename,
+        "remarks": count,
+        "steps": results,
+    }
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=4)
+    print_table(results)
+
+    status = 0
+    stalled = [name for name, step in results.items() if step["max_stall"] > args.max_stall]
+    if stalled:
+        print(f"Окно зависало дольше {args.max_stall} с:\n    " + "\n    ".join(
+            f"{name}: {results[name]['max_stall']:.2f} с" for name in stalled
+        ))
+        status = 1
+    if previous:
+        with open(previous, encoding="utf-8") as file:
+            old_report = json.load(file)
+        print(f"Сравнение с {args.compare} ({old_report.get('version')}):")
+        regressions = compare(compared(results), compared(old_report["steps"]), args.threshold)
+        if regressions:
+            print("Регрессии:\n    " + "\n    ".join(regressions))
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Замеры производительности ядра (пакет nca) на синтетических библиотеках разного размера.
+
+Для каждого размера библиотека создаётся генератором (см. generate.py) один раз и хранится в папке данных, в
+форматах .json и .txt. Каждый повтор замеров выполняется в отдельном процессе, поэтому пик памяти относится только
+к нему, а из повторов берётся лучшее время. Замеряются:
+    load_json, load_txt: Загрузка файла в библиотеку (чтение и построение индексов, как в LoadWorker).
+    save_json, save_txt: Атомарная запись библиотеки в файл (как при сохранении в приложении).
+    search_keystrokes, search_keystroke_max: Поиск при наборе запроса по одному символу - всего и худшее нажатие.
+    tag_toggles, tag_toggle_max: Отметка и снятие отметки трёх частых тегов в режимах AND и OR.
+    bulk_remove: Удаление 10% замечаний, разбросанных по всей библиотеке.
+    tab_rename: Переименование самой большой категории.
+    peak_memory_mb: Пик памяти процесса в мегабайтах (None, если платформа его не сообщает).
+
+Результаты записываются в JSON-файл вместе с версией программы (git) и окружением. С параметром --compare
+результаты сравниваются с прежним файлом: замеры, ставшие медленнее порога, считаются регрессиями, и скрипт
+завершается с кодом 1.
+
+Запуск:
+    python benchmarks/run.py [--sizes 1000 10000 100000 1000000] [--repeat 3] [-o results.json] [--compare old.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Корень репозитория (пакет nca)
+
+from generate import write_library
+from nca.remark_io import iter_json, json_chunks, load_library, txt_chunks, write_file
+
+
+SIZES = (1000, 10000, 100000)  # Размеры библиотек по умолчанию (1000000 - по запросу, нужно несколько ГБ памяти)
+REPEAT = 3  # Сколько раз повторять замеры для каждого размера
+THRESHOLD = 1.2  # Во сколько раз замер может стать медленнее, прежде чем это считается регрессией
+MIN_TIME = 0.001  # Замеры быстрее этого (в секундах) не сравниваются: в них больше шума, чем сигнала
+REMOVE_SHARE = 0.1  # Доля удаляемых замечаний
+TOGGLED_TAGS = 3  # Сколько частых тегов отмечается при замере фильтра тегов
+DATA_DIR = os.path.join(tempfile.gettempdir(), "nca-benchmarks")  # Папка сгенерированных библиотек по умолчанию
+
+
+def timed(function, *args):
+    """Вызывает function(*args) и возвращает пару (длительность в секундах, результат)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def peak_memory_mb():
+    """Возвращает пик памяти текущего процесса в мегабайтах или None, если платформа его не сообщает."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)  # В macOS - байты, в Linux - килобайты
+
+
+def keystroke_times(library, query):
+    """Возвращает длительности поиска после каждого набранного символа запроса query."""
+    return [timed(library.filter_mask, query[:length], (), "AND")[0] for length in range(1, len(query) + 1)]
+
+
+def toggle_times(library, tags):
+    """Возвращает длительности фильтрации при поочерёдной отметке тегов tags и снятии отметок (AND и OR)."""
+    states = [tags[:count] for count in range(1, len(tags) + 1)]
+    states += states[-2::-1] + [[]]  # Снимаем отметки в обратном порядке
+    return [timed(library.filter_mask, "", checked, mode)[0] for mode in ("AND", "OR") for checked in states]
+
+
+def measure(json_file, txt_file, seed=0):
+    """
+    Выполняет все замеры на библиотеке из файлов json_file и txt_file (в текущем процессе).
+
+    Возвращает:
+        dict[str, float | None]: Длительности в секундах и пик памяти в мегабайтах.
+    """
+    rng = random.Random(seed)
+    results = {}
+    results["load_txt"], library = timed(load_library, txt_file)
+    del library
+    results["load_json"], library = timed(load_library, json_file)
+    with tempfile.TemporaryDirectory() as directory:
+        results["save_json"], _ = timed(
+            write_file, os.path.join(directory, "library.json"), json_chunks(library.remarks, library.categories)
+        )
+        results["save_txt"], _ = timed(write_file, os.path.join(directory, "library.txt"), txt_chunks(library.remarks))
+
+    # Запрос - начало текста замечания из середины библиотеки: по мере набора результатов становится меньше
+    query = " ".join(library.remarks[len(library) // 2].text.lower().split()[:3])
+    times = keystroke_times(library, query)
+    results["search_keystrokes"], results["search_keystroke_max"] = sum(times), max(times)
+
+    counts = library.tag_counts.counts()
+    tags = sorted(counts, key=counts.get, reverse=True)[:TOGGLED_TAGS]
+    times = toggle_times(library, tags)
+    results["tag_toggles"], results["tag_toggle_max"] = sum(times), max(times)
+
+    category = max(library.categories, key=lambda name: len(library.category_ids(name)))
+    results["tab_rename"], _ = timed(library.rename_category, category, category + " (переименована)")
+
+    remark_ids = rng.sample([remark.id for remark in library.remarks], int(len(library) * REMOVE_SHARE))
+    results["bulk_remove"], _ = timed(library.remove, remark_ids)
+
+    results["peak_memory_mb"] = peak_memory_mb()
+    return results
+
+
+def prepare(size, data_dir, seed=0):
+    """Возвращает пути к .json- и .txt-файлам библиотеки размера size, при необходимости создаёт их."""
+    os.makedirs(data_dir, exist_ok=True)
+    json_file = os.path.join(data_dir, f"library-{size}-{seed}.json")
+    txt_file = os.path.join(data_dir, f"library-{size}-{seed}.txt")
+    if not os.path.exists(json_file):
+        write_library(json_file, size, seed)
+    if not os.path.exists(txt_file):
+        write_file(txt_file, txt_chunks(iter_json(json_file)))  # Те же тексты, без категорий и тегов
+    return json_file, txt_file
+
+
+def run_size(size, repeat, data_dir, seed=0):
+    """Выполняет замеры для библиотеки размера size в repeat отдельных процессах и объединяет их результаты."""
+    json_file, txt_file = prepare(size, data_dir, seed)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", json_file, txt_file, "--seed", str(seed)],
+            check=True, stdout=subprocess.PIPE
+        ).stdout
+        runs.append(json.loads(output))
+    results = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs if run[name] is not None]
+        if not values:
+            results[name] = None
+        else:
+            results[name] = max(values) if name == "peak_memory_mb" else min(values)  # Лучшее время, худшая память
+    return results
+
+
+def program_version():
+    """Возвращает версию программы (git describe) или None, если репозиторий git недоступен."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_results, threshold=THRESHOLD):
+    """
+    Печатает отношение новых замеров к прежним и возвращает список регрессий.
+
+    Аргументы:
+        results (dict): Новые результаты (поле "results" файла результатов).
+        old_results (dict): Прежние результаты в том же виде.
+        threshold (float, optional): Допустимое замедление (во сколько раз). По умолчанию THRESHOLD.
+
+    Возвращает:
+        list[str]: Описания регрессий: "размер замер: было -> стало".
+    """
+    regressions = []
+    for size, metrics in results.items():
+        old_metrics = old_results.get(size)
+        if old_metrics is None:
+            continue  # Этот размер прежде не замерялся
+        for name, value in metrics.items():
+            old_value = old_metrics.get(name)
+            if value is None or old_value is None or (old_value < MIN_TIME and name != "peak_memory_mb"):
+                continue
+            ratio = value / old_value if old_value else float("inf")
+            line = f"{size:>8} {name:<22}{old_value:>12.4f}{value:>12.4f}{ratio:>8.2f}x"
+            if ratio > threshold:
+                regressions.append(f"{size} {name}: {old_value:.4f} -> {value:.4f}")
+                line += "  регрессия"
+            print(line)
+    return regressions
+
+
+def main():
+    """Разбирает аргументы командной строки, выполняет замеры и записывает результаты."""
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических библиотеках.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help=f"размеры библиотек (по умолчанию {' '.join(map(str, SIZES))})")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"повторов для каждого размера ({REPEAT})")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора библиотек (по умолчанию 0)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help=f"папка сгенерированных библиотек ({DATA_DIR})")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="файл результатов (JSON)")
+    parser.add_argument("--compare", metavar="FILE", help="прежний файл результатов для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"допустимое замедление относительно прежних результатов (по умолчанию {THRESHOLD})")
+    parser.add_argument("--worker", nargs=2, metavar=("JSON", "TXT"), help=argparse.SUPPRESS)  # Один повтор замеров
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, seed=args.seed)))
+        return 0
+
+    results = {}
+    for size in args.sizes:
+        print(f"Замеры для {size} замечаний...", file=sys.stderr)
+        results[str(size)] = run_size(size, args.repeat, args.data_dir, args.seed)
+    report = {
+        "version": program_version(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=4)
+    print(json.dumps(results, indent=4))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            old_report = json.load(file)
+        print(f"Сравнение с {args.compare} ({old_report.get('version')}):")
+        regressions = compare(results, old_report["results"], args.threshold)
+        if regressions:
+            print("Регрессии:\n    " + "\n    ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
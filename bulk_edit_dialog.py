@@ -0,0 +1,69 @@
+from PyQt5.QtWidgets import QDialog
+
+from remark_dialog import TagCompleter
+from ui_bulk_edit_dialog import Ui_BulkEditDialog
+
+
+KEEP_CATEGORY = "Не менять категорию"  # Первый пункт списка категорий: замечания остаются в своих категориях
+
+
+class BulkEditDialog(QDialog):
+    """
+    Окно группового редактирования выбранных замечаний.
+
+    Позволяет перенести все выбранные замечания в одну категорию, добавить им теги и убрать теги. Тексты замечаний
+    не меняются. Все изменения применяются одним действием (см. RemarkModel.bulk_update).
+
+    Методы:
+        __init__(parent, count):
+            Конструктор окна.
+        get_data():
+            Возвращает данные из полей ввода.
+        split_tags(text):
+            Разбивает строку тегов через запятую на список.
+    """
+    def __init__(self, parent, count):
+        """
+        Конструктор окна BulkEditDialog.
+
+        Аргументы:
+            parent (QWidget): Родительский виджет (главное окно).
+            count (int): Количество выбранных замечаний.
+        """
+        super().__init__(parent)  # Вызываем конструктор родительского класса
+        self.ui = Ui_BulkEditDialog()  # Подгружаем интерфейс
+        self.ui.setupUi(self)  # Применяем его к текущему окну
+        self.ui.countLabel.setText(f"Выбрано замечаний: {count}")
+        # Загружаем в выпадающий список категории из вкладок (кроме "Все"), первым пунктом - "не менять"
+        categories = [
+            parent.ui.tabWidget.tabText(i)
+            for i in range(parent.ui.tabWidget.count())
+            if parent.ui.tabWidget.tabText(i) != "Все"
+        ]
+        self.ui.categoryComboBox.addItems([KEEP_CATEGORY, *categories])
+        # Подсказки тегов в обоих полях - из общего индекса тегов главного окна
+        for line_edit in (self.ui.addTagsLineEdit, self.ui.removeTagsLineEdit):
+            line_edit.setCompleter(TagCompleter(parent.remark_model, line_edit))
+        # Подключаем кнопки
+        self.ui.saveButton.clicked.connect(self.accept)
+        self.ui.cancelButton.clicked.connect(self.reject)
+
+    def get_data(self):
+        """
+        Возвращает данные, введённые пользователем.
+
+        Возвращает:
+            tuple[str | None, list[str], list[str]]: Новая категория (None - не менять), теги, которые нужно
+                добавить, и теги, которые нужно убрать.
+        """
+        category = None
+        if self.ui.categoryComboBox.currentIndex() > 0:  # Выбран не первый пункт "не менять"
+            category = self.ui.categoryComboBox.currentText()
+        add_tags = self.split_tags(self.ui.addTagsLineEdit.text())  # Теги, которые нужно добавить
+        remove_tags = self.split_tags(self.ui.removeTagsLineEdit.text())  # Теги, которые нужно убрать
+        return category, add_tags, remove_tags
+
+    @staticmethod
+    def split_tags(text):
+        """Разбивает строку тегов через запятую на список тегов в нижнем регистре без повторов."""
+        return list(dict.fromkeys(tag.strip().lower() for tag in text.split(",") if tag.strip()))
@@ -0,0 +1,96 @@
+import os
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from nca.remark_io import LoadCancelled, iter_chunks, iter_remarks
+from nca.remark_snapshot import Snapshot, supports_snapshot, write_snapshot
+
+
+class LoadWorker(QThread):
+    """
+    Фоновый поток загрузки файла замечаний.
+
+    Читает файл потоково, вне потока интерфейса, и передаёт замечания растущими порциями (см. iter_chunks) сигналом
+    chunk_loaded, поэтому первые замечания появляются в окне задолго до конца разбора большого файла, а в памяти
+    никогда не находится весь текст файла целиком. Сообщает о прогрессе в процентах и поддерживает отмену через
+    requestInterruption().
+
+    Если включены снимки, .json-файл читается из его снимка (см. remark_snapshot), когда снимок соответствует файлу:
+    без разбора JSON и без декодирования текстов. Если снимка нет или файл изменился, после разбора файла снимок
+    строится заново.
+
+    Сигналы:
+        progress(int): Процент прочитанного файла.
+        chunk_loaded(object): Очередная порция замечаний (list[Remark]).
+        completed(): Файл прочитан полностью.
+        failed(str): Текст ошибки, если файл не удалось загрузить.
+
+    Методы:
+        run():
+            Выполняет загрузку (вызывается QThread.start()).
+    """
+    progress = pyqtSignal(int)
+    chunk_loaded = pyqtSignal(object)
+    completed = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, parent=None, use_snapshot=False):
+        """
+        Конструктор класса LoadWorker.
+
+        Аргументы:
+            filename (str): Путь к загружаемому файлу.
+            parent (QObject, optional): Родительский объект. По умолчанию None.
+            use_snapshot (bool, optional): Читать файл из снимка и обновлять снимок. По умолчанию False.
+        """
+        super().__init__(parent)  # Вызываем конструктор родительского класса QThread
+        self.filename = filename  # Путь к загружаемому файлу
+        self.use_snapshot = use_snapshot and supports_snapshot(filename)  # Снимки строятся только для .json
+        self._percent = -1  # Последний отправленный процент (чтобы не отправлять одинаковые значения)
+
+    def run(self):
+        """Читает файл в фоновом потоке и отправляет замечания порциями, затем сигнал completed или failed."""
+        try:
+            snapshot = Snapshot.open(self.filename) if self.use_snapshot else None
+            if snapshot is not None:
+                remarks = snapshot.remarks(self.report_progress)
+            else:
+                stat = os.stat(self.filename)  # Версия файла, из которой будет построен снимок
+                remarks = iter_remarks(self.filename, self.report_progress)
+            loaded = []  # Прочитанные замечания (для нового снимка)
+            for chunk in iter_chunks(remarks):
+                if self.isInterruptionRequested():
+                    raise LoadCancelled()
+                self.chunk_loaded.emit(chunk)
+                if self.use_snapshot and snapshot is None:
+                    loaded.extend(chunk)
+            if self.use_snapshot and snapshot is None:
+                self.update_snapshot(loaded, stat)
+        except LoadCancelled:
+            return  # Загрузку отменили, результат никому не нужен
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.completed.emit()
+
+    def update_snapshot(self, remarks, stat):
+        """
+        Записывает снимок только что прочитанного файла, если файл не изменился во время чтения.
+
+        Снимок - лишь ускорение загрузки, поэтому ошибка его записи не считается ошибкой загрузки.
+        """
+        try:
+            current = os.stat(self.filename)
+            if (current.st_size, current.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                write_snapshot(self.filename, remarks)
+        except (OSError, ValueError):
+            pass
+
+    def report_progress(self, fraction):
+        """Отправляет прогресс в процентах. Если загрузку отменили, прерывает её исключением LoadCancelled."""
+        if self.isInterruptionRequested():
+            raise LoadCancelled()
+        percent = int(fraction * 100)
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
@@ -1,13 +1,17 @@
 import sys
 
+from utils import startup_timer  # Импортируется первым: от него отсчитывается время запуска
+
 from PyQt5.QtWidgets import QApplication
 
 from main_window import MainWindow
 
 
 if __name__ == "__main__":
+    startup_timer.mark("import")
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
+    startup_timer.mark("QApplication")
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
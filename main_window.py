@@ -1,26 +1,49 @@
-import json
+import contextlib
 import os
 
-from PyQt5.QtCore import QSettings, Qt
+from PyQt5.QtCore import QItemSelectionModel, QSettings, QStandardPaths, Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QGuiApplication, QIcon, QKeySequence
 from PyQt5.QtWidgets import (
     QMainWindow,
     QFileDialog,
     QMessageBox,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QLineEdit,
+    QProgressBar,
+    QPushButton,
     QShortcut,
     QTabBar,
 )
 
-from remark_dialog import RemarkDialog
-from tab_dialog import TabDialog
+from load_worker import LoadWorker
+from nca.journal import JOURNAL_SUFFIX, OperationJournal, base_matches_file, journal_base, journal_path, runs_to_ids
+from nca.remark_db import RemarkDatabase, is_database, write_database
+from nca.remark_io import file_checksum, json_chunks, txt_chunks, write_file
+from nca.remark_library import Remark
+from nca.remark_snapshot import write_json_snapshot
+from nca.undo_stack import UndoCommand, UndoStack, restore_record
+from remark_model import RemarkModel, RemarkFilterProxyModel
+from tag_model import TagListModel
 from ui_main_window import Ui_MainWindow
-from utils import resource_path
+from utils import resource_path, startup_timer
 
 
 WAIT = 5000
+FILTER_DEBOUNCE_MS = 150  # Задержка фильтрации после ввода по умолчанию (настройка "filter_debounce_ms")
+AUTOSAVE_INTERVAL_MS = 60000  # Через сколько миллисекунд после первого изменения журнал переносится в файл
+SEARCH_INDEX_BATCH = 2000  # Сколько замечаний из снимка добавлять в поисковый индекс за один проход цикла событий
+UNDO_MEMORY_MB = 64  # Сколько мегабайт памяти могут занимать команды отмены по умолчанию (настройка "undo_memory_mb")
+UNDO_LABELS = {
+    "add": "добавление замечания",
+    "remove": "удаление замечаний",
+    "edit": "изменение замечания",
+    "bulk_edit": "групповое изменение замечаний",
+    "clear": "очистка списка",
+    "add_tab": "добавление вкладки",
+    "remove_tab": "удаление вкладки",
+    "rename_tab": "изменение вкладки",
+    "move_tab": "перемещение вкладки",
+}  # Подписи отменяемых действий для строки состояния
 
 
 class MainWindow(QMainWindow):
@@ -30,23 +53,54 @@ class MainWindow(QMainWindow):
         super().__init__(parent=None)  # Вызываем конструктор родительского класса QMainWindow
         self.ui = Ui_MainWindow()  # Подгружаем интерфейс
         self.ui.setupUi(self)  # Применяем его к текущему окну
+        startup_timer.mark("setupUi")
 
         self.current_file = None # Инициализируем переменную, хранящую путь до текущего файла
+        self.load_worker = None  # Фоновый поток загрузки файла (None, если файл сейчас не загружается)
+        self.loading_backup = None  # Замечания и вкладки до начала загрузки (None, если интерфейс не менялся)
         self.is_modified = False  # Инициализируем флаг несохранённых изменений в текущем файле
+        self.transaction_depth = 0  # Глубина вложенности transaction() (0 - состояние окна обновляется сразу)
+        self.refresh_pending = False  # Внутри transaction() были изменения: обновить состояние окна в её конце
         self.settings = QSettings("eluvesi", "NCA")  # Загружаем сохранённые с помощью QSettings настройки
         last_file = self.settings.value("last_file", "")  # Из настроек узнаём путь к последнему файлу
         tag_panel_visible = self.settings.value("tag_panel_visible", False, type=bool)  # Видимость панели тегов
         self.tag_filter_mode = self.settings.value("tag_filter_mode", "AND")  # Режим фильтрации (И/ИЛИ)
+        self.verify_saves = self.settings.value("verify_saves", True, type=bool)  # Проверять файл после записи
+        self.backup_count = self.settings.value("backup_count", 0, type=int)  # Сколько резервных копий хранить
+        self.use_snapshots = self.settings.value("snapshot_cache", True, type=bool)  # Снимки .json для быстрой загрузки
+        startup_timer.mark("settings")
+        # Таймер откладывает фильтрацию, пока пользователь продолжает печатать или щёлкать по тегам
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)  # Каждое новое изменение перезапускает отсчёт
+        self.filter_timer.setInterval(self.settings.value("filter_debounce_ms", FILTER_DEBOUNCE_MS, type=int))
+        self.filter_timer.timeout.connect(self.filter_remarks)  # По истечении задержки фильтруем один раз
+        self.journal = OperationJournal()  # Журнал операций рядом с текущим файлом (для восстановления после сбоя)
+        self.replaying = False  # Идёт применение журнала: операции не записываются в журнал повторно
+        # Стек отмены и повтора действий, команды в нём занимают не больше заданного объёма памяти
+        self.undo_stack = UndoStack(self.settings.value("undo_memory_mb", UNDO_MEMORY_MB, type=int) * 1024 * 1024)
+        self.database = None  # Открытая база данных, если текущий файл - .sqlite/.nca.db (RemarkDatabase)
+        # Таймер автосохранения: через заданное время после первого изменения журнал переносится в сам файл
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(self.settings.value("autosave_interval_ms", AUTOSAVE_INTERVAL_MS, type=int))
+        self.autosave_timer.timeout.connect(self.compact_journal)
+        # Таймер достраивает поисковый индекс замечаний из снимка небольшими порциями, пока окно простаивает
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(0)
+        self.index_timer.timeout.connect(self.index_deferred_remarks)
 
         self.ui.tabWidget.setTabBar(LockedTabBar())  # Устанавливаем кастомный QTabBar с закреплёнными вкладками
         self.ui.tabWidget.setMovable(True)  # Включаем возможность перетаскивать вкладки
+        self.ui.tabWidget.tabBar().tab_dragged.connect(self.tab_moved)  # Перетаскивания вкладок записываем в журнал
 
-        self.summaryListWidget = QListWidget()  # Создаём список "Все"
-        self.set_list_connects(self.summaryListWidget)  # Подключаем реакции на действия пользователя
-        self.ui.tabWidget.insertTab(0, self.summaryListWidget, "Все")  # Создаём вкладку "Все"
-        self.uncategorizedListWidget = QListWidget()  # Создаём список "Без категории"
-        self.set_list_connects(self.uncategorizedListWidget)  # Подключаем реакции на действия пользователя
-        self.ui.tabWidget.addTab(self.uncategorizedListWidget, "Без категории")  # Создаём вкладку "Без категории"
+        self.remark_model = RemarkModel(self)  # Единое хранилище замечаний, вкладки показывают его через прокси
+        self.category_views = {}  # Индекс "категория -> список её вкладки" (кроме вкладки "Все")
+        self.active_view = None  # Список текущей вкладки: только его прокси-модель подключена к модели замечаний
+        self.summaryListView = self.create_list_view()  # Создаём список "Все" (без фильтра по категории)
+        self.ui.tabWidget.insertTab(0, self.summaryListView, "Все")  # Создаём вкладку "Все"
+        self.uncategorizedListView = self.create_list_view("Без категории")  # Создаём список "Без категории"
+        self.ui.tabWidget.addTab(self.uncategorizedListView, "Без категории")  # Создаём вкладку "Без категории"
+        self.category_views["Без категории"] = self.uncategorizedListView  # Запоминаем список вкладки в индексе
 
         # Работа с файлами
         self.ui.fileCreateButton.clicked.connect(self.create_file)  # Кнопка "Создать документ"
@@ -59,6 +113,7 @@ class MainWindow(QMainWindow):
         self.ui.tabRemoveButton.clicked.connect(self.remove_tab)  # Кнопка "Удалить вкладку"
         self.ui.tabEditButton.clicked.connect(self.edit_tab)  # Кнопка "Редактировать вкладку"
         self.ui.tabWidget.currentChanged.connect(self. tab_changed)  # При переходе на другую вкладку
+        self.activate_current_view()  # Подключаем к модели список вкладки "Все"
         # Работа с замечаниями
         self.ui.remarkAddButton.clicked.connect(self.add_remark)  # Кнопка "Добавить замечание"
         self.ui.remarkRemoveButton.clicked.connect(self.remove_remark)  # Кнопка "Удалить выбранные замечания"
@@ -67,7 +122,7 @@ class MainWindow(QMainWindow):
         self.ui.listClearButton.clicked.connect(self.clear_list)  # Кнопка "Очистить список"
         # Поиск
         self.ui.searchLineEdit.addAction(QIcon(resource_path("icons/find.png")), QLineEdit.LeadingPosition)  # Иконка
-        self.ui.searchLineEdit.textChanged.connect(self.filter_remarks)  # Динамическая фильтрация при вводе запроса
+        self.ui.searchLineEdit.textChanged.connect(self.filter_timer.start)  # Фильтрация после паузы в наборе запроса
         # Панель тегов
         self.ui.tagPanelWidget.setVisible(tag_panel_visible)  # Устанавливаем для панели состояние, взятое из настроек
         self.ui.tagPanelButton.setChecked(tag_panel_visible)  # И для кнопки панели тегов тоже
@@ -77,39 +132,198 @@ class MainWindow(QMainWindow):
         self.ui.tagPanelAndButton.clicked.connect(lambda: self.set_tag_filter_mode("AND"))  # Переключение по нажатию
         self.ui.tagPanelOrButton.setChecked(self.tag_filter_mode == "OR")  # Устанавливаем состояние для кнопки "OR"
         self.ui.tagPanelOrButton.clicked.connect(lambda: self.set_tag_filter_mode("OR"))  # Переключение по нажатию
-        self.ui.tagListWidget.itemPressed.connect(self.toggle_tag_checkbox)  # Установка чекбокса при клике на элемент
-        self.ui.tagListWidget.itemChanged.connect(self.filter_remarks)  # Динамическая фильтрация при выборе тегов
+        self.tag_model = TagListModel(self)  # Теги текущей вкладки с количеством замечаний и отметками
+        self.ui.tagListView.setModel(self.tag_model)
+        self.ui.tagListView.pressed.connect(self.tag_model.toggle)  # Установка чекбокса при клике на элемент
+        self.tag_model.check_changed.connect(self.filter_timer.start)  # Динамическая фильтрация при выборе тегов
+
+        # Прогресс фоновой загрузки файла и кнопка её отмены в строке состояния (видны только во время загрузки)
+        self.loadProgressBar = QProgressBar()
+        self.loadProgressBar.setMaximumWidth(200)
+        self.loadProgressBar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.loadProgressBar)
+        self.loadCancelButton = QPushButton("Отменить загрузку")
+        self.loadCancelButton.setVisible(False)
+        self.loadCancelButton.clicked.connect(self.cancel_loading)
+        self.statusBar().addPermanentWidget(self.loadCancelButton)
 
         # Включаем шорткаты
         self.set_shortcuts()
 
-        # Открываем последний редактируемый файл
+        # Последний редактируемый файл открываем после первой отрисовки окна (см. paintEvent)
+        self.startup_file = last_file  # None - файл при запуске уже открыт
+        self.first_paint = True  # Окно ещё ни разу не отрисовывалось
+
+    def paintEvent(self, event):
+        """Отрисовывает окно. После первой отрисовки откладывает открытие последнего файла до следующего цикла."""
+        super().paintEvent(event)
+        if self.first_paint:
+            self.first_paint = False
+            startup_timer.mark("first paint")
+            QTimer.singleShot(0, self.open_startup_file)  # Окно уже видно, а файл читается после
+
+    def open_startup_file(self):
+        """Открывает последний редактируемый файл, если он существует, иначе создаёт новый файл."""
+        last_file = self.startup_file
+        if last_file is None:
+            return  # До первой отрисовки уже открыли другой файл
         if last_file and os.path.exists(last_file):
             self.load_file(last_file)  # Если этот файл существует, то загружаем его
         else:
             self.create_file()  # Иначе создаём новый
 
-
     def load_file(self, filename):
-        """Загружает переданный файл и обновляет состояние приложения."""
-        # Очищаем интерфейс приложения перед загрузкой
+        """
+        Запускает загрузку переданного файла в фоновом потоке.
+
+        Пока файл читается, окно остаётся отзывчивым, прогресс отображается в строке состояния, а загрузку можно
+        отменить. Замечания поступают в модель порциями, и первые из них видны ещё до конца чтения файла. Прежние
+        замечания и вкладки запоминаются и возвращаются на место, если загрузку отменили или она не удалась.
+        """
+        self.cancel_loading(silent=True)  # Если загружается другой файл, прерываем его загрузку
+        self.startup_file = None  # Открыт другой файл - последний файл при запуске больше не открываем
+        self.load_worker = LoadWorker(filename, self, self.use_snapshots)  # Создаём фоновый поток загрузки
+        self.load_worker.progress.connect(self.loadProgressBar.setValue)  # Прогресс - в строку состояния
+        self.load_worker.chunk_loaded.connect(self.remarks_chunk_loaded)  # Порции замечаний добавляем в модель
+        self.load_worker.completed.connect(self.file_loaded)  # Завершаем загрузку
+        self.load_worker.failed.connect(self.file_load_failed)  # Сообщим об ошибке
+        self.load_worker.finished.connect(self.load_worker.deleteLater)  # Поток удалится сам после завершения
+        self.set_loading(True)  # Блокируем редактирование и показываем прогресс
+        self.statusBar().showMessage(f"Загрузка замечаний из {filename}...")
+        self.load_worker.start()
+
+    def start_loaded_library(self):
+        """Запоминает текущие замечания и вкладки и очищает интерфейс под замечания загружаемого файла."""
+        tab_names = [self.ui.tabWidget.tabText(i) for i in range(1, self.ui.tabWidget.count() - 1)]
+        self.loading_backup = (self.remark_model.library, tab_names)  # Вернём, если загрузка не завершится
+        # Очищаем интерфейс приложения
         self.remove_user_tabs()  # Удаляем все вкладки, кроме вкладок "Все" и "Без категории"
         self.ui.tabWidget.setCurrentIndex(0)  # Переключаемся на вкладку "Все"
-        # Загружаем файл по-разному в зависимости от формата
-        load_success = False
-        if filename.endswith(".txt"):  # Читаем список замечаний из txt-файла
-            load_success = self.read_from_txt(filename)
-        elif filename.endswith(".json"):  # Читаем список замечаний из json-файла
-            load_success = self.read_from_json(filename)
-        # Если успешно, то обновляем состояние
-        if load_success:
-            self.current_file = filename  # Устанавливаем файл в качестве текущего
-            self.is_modified = False  # Файл только что загружен, изменений нет
-            self.update_window_title()  # Обновляем заголовок окна
-            self.update_tag_list()  # Обновляем список на панели тегов
-            self.statusBar().showMessage(f"Замечания загружены из {self.current_file}.", WAIT)
-        else:
-            self.statusBar().showMessage(f"Не удалось загрузить файл {self.current_file}.", WAIT)
+        self.ui.searchLineEdit.clear()  # Сбрасываем поисковый запрос
+        self.tag_model.uncheck_all()  # Отметки тегов относятся к прежнему файлу
+        self.update_tag_list()  # Сбрасываем фильтр: прежняя маска относится к другим замечаниям
+
+    def remarks_chunk_loaded(self, remarks):
+        """Добавляет в модель очередную порцию загружаемых замечаний и создаёт вкладки для новых категорий."""
+        if self.sender() is not self.load_worker:
+            return  # Порция от отменённой загрузки, уже стоявшая в очереди событий
+        if self.loading_backup is None:  # Первая порция - очищаем интерфейс
+            self.start_loaded_library()
+        for remark in remarks:
+            if remark.category not in self.category_views:
+                self.add_category_tab(remark.category)
+        self.remark_model.append_remarks(remarks)  # Одна вставка строк на всю порцию
+
+    def file_loaded(self):
+        """Завершает загрузку файла: все замечания уже в модели, обновляем состояние приложения."""
+        if self.sender() is not self.load_worker:
+            return
+        filename = self.load_worker.filename
+        self.load_worker = None  # Загрузка завершена
+        self.set_loading(False)
+        if self.loading_backup is None:  # В файле не оказалось ни одного замечания
+            self.start_loaded_library()
+        self.loading_backup = None  # Прежние замечания больше не нужны
+        # Обновляем состояние
+        self.current_file = filename  # Устанавливаем файл в качестве текущего
+        self.is_modified = False  # Файл только что загружен, изменений нет
+        self.statusBar().showMessage(f"Замечания загружены из {self.current_file}.", WAIT)
+        self.close_database()
+        if is_database(filename):
+            self.open_database(filename)
+        self.start_journal()  # Начинаем журнал (или восстанавливаем изменения, если приложение завершилось сбоем)
+        self.update_window_title()  # Обновляем заголовок окна
+        self.update_tag_list()  # Обновляем список на панели тегов
+        self.index_timer.start()  # Тексты замечаний из снимка индексируем в свободное время
+        startup_timer.finish("library ready")  # При запуске: последний файл загружен
+
+    def index_deferred_remarks(self):
+        """Добавляет в поисковый индекс очередную порцию замечаний из снимка (см. SearchIndex.defer)."""
+        if not self.remark_model.library.search_index.add_pending(SEARCH_INDEX_BATCH):
+            self.index_timer.stop()  # Отложенных замечаний не осталось
+
+    def file_load_failed(self, error):
+        """Сообщает о том, что файл не удалось загрузить, и возвращает прежние замечания."""
+        if self.sender() is not self.load_worker:
+            return
+        filename = self.load_worker.filename
+        self.load_worker = None  # Загрузка завершена
+        self.set_loading(False)
+        self.restore_loading_backup()
+        self.statusBar().showMessage(f"Не удалось загрузить файл {filename}: {error}", WAIT)
+        startup_timer.finish("library ready")
+
+    def cancel_loading(self, silent=False, wait=False):
+        """
+        Отменяет фоновую загрузку файла, если она идёт, и возвращает прежние замечания.
+
+        Аргументы:
+            silent (bool, optional): Не сообщать об отмене в строке состояния. По умолчанию False.
+            wait (bool, optional): Дождаться завершения фонового потока (нужно при закрытии окна). По умолчанию False.
+        """
+        if self.load_worker is None:
+            return
+        worker = self.load_worker
+        self.load_worker = None
+        worker.requestInterruption()  # Поток прервётся на ближайшей проверке прогресса
+        # Отключаем сигналы, чтобы результат отменённой загрузки не попал в модель
+        worker.progress.disconnect()
+        worker.chunk_loaded.disconnect()
+        worker.completed.disconnect()
+        worker.failed.disconnect()
+        if wait:
+            worker.wait()
+        self.set_loading(False)
+        self.restore_loading_backup()
+        if not silent:
+            self.statusBar().showMessage("Загрузка файла отменена.", WAIT)
+
+    def restore_loading_backup(self):
+        """Возвращает замечания и вкладки, которые были до начала незавершённой загрузки."""
+        if self.loading_backup is None:
+            return  # Ни одна порция ещё не поступила, интерфейс не менялся
+        library, tab_names = self.loading_backup
+        self.loading_backup = None
+        self.remove_user_tabs()
+        for name in tab_names:
+            self.add_category_tab(name)
+        self.remark_model.set_library(library)  # Прежние замечания возвращаем одним сбросом модели
+        self.update_tag_list()
+
+    def add_category_tab(self, category, position=None):
+        """Создаёт вкладку категории category на позиции position (по умолчанию - перед вкладкой "Без категории")."""
+        if position is None:
+            position = self.ui.tabWidget.count() - 1
+        list_view = self.create_list_view(category)  # Список вкладки - прокси-представление модели
+        self.ui.tabWidget.insertTab(position, list_view, category)  # Вкладка
+        self.category_views[category] = list_view  # Запоминаем список вкладки в индексе
+        return list_view
+
+    def delete_category_tab(self, category):
+        """Удаляет вкладку категории category вместе со всеми её замечаниями."""
+        self.remark_model.remove_category(category)  # Удаляем замечания этой категории из модели
+        list_view = self.category_views.pop(category)  # Убираем категорию из индекса
+        self.remove_tab_at(self.ui.tabWidget.indexOf(list_view))  # Удаляем вкладку
+
+    def rename_category_tab(self, old_name, new_name, position):
+        """Переименовывает вкладку (и категорию её замечаний) old_name в new_name и ставит её на позицию position."""
+        list_view = self.category_views.pop(old_name)
+        index = self.ui.tabWidget.indexOf(list_view)
+        self.ui.tabWidget.setTabText(index, new_name)  # Обновляем название вкладки
+        # Сначала меняем категорию прокси-модели вкладки, чтобы замечания не пропали с неё при переименовании
+        self.category_views[new_name] = list_view
+        list_view.model().category = new_name
+        self.remark_model.rename_category(old_name, new_name)  # Переименовываем категорию у замечаний в модели
+        # Если позиция изменилась, перемещаем вкладку (список вкладки не пересоздаётся)
+        if position != index:
+            self.ui.tabWidget.tabBar().moveTab(index, position)  # Часть переименования, отдельно в журнал не пишется
+
+    def set_loading(self, loading):
+        """Блокирует редактирование на время фоновой загрузки и показывает её прогресс в строке состояния."""
+        self.ui.centralwidget.setEnabled(not loading)  # Окно перерисовывается, но изменить замечания нельзя
+        self.loadProgressBar.setValue(0)
+        self.loadProgressBar.setVisible(loading)
+        self.loadCancelButton.setVisible(loading)
 
     def create_file(self):
         """Очищает интерфейс приложения и сбрасывает переменную, хранящую путь к текущему файлу."""
@@ -121,17 +335,19 @@ class MainWindow(QMainWindow):
                 QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
                 QMessageBox.Yes
             )  # Окно с вариантами выбора: "да", "нет", "отмена"
-            if reply == QMessageBox.Yes:
-                self.save_file()  # Сохраняем текущий файл перед созданием нового
-            elif reply == QMessageBox.Cancel:
-                return
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Yes and not self.save_file()):
+                return  # Отменено или сохранить не удалось: изменения и журнал остаются
         # Обновляем состояние
+        self.startup_file = None  # Создан новый файл - последний файл при запуске больше не открываем
         self.current_file = None  # Обновляем текущий файл
+        self.close_database()
         self.remove_user_tabs()  # Удаляем все вкладки пользователя, и очищаем "Все" и "Без категории"
         self.is_modified = False  # Создан новый файл, изменений больше нет
+        self.statusBar().showMessage("Создан новый файл. Не забудьте сохранить изменения.", WAIT)
+        self.start_journal()  # Журнал нового файла хранится в папке данных приложения
         self.update_window_title()  # Обновляем заголовок окна
         self.update_tag_list()  # Обновляем список на панели тегов
-        self.statusBar().showMessage("Создан новый файл. Не забудьте сохранить изменения.", WAIT)
+        startup_timer.finish("library ready")  # При запуске: последнего файла нет, создан новый
 
     def open_file(self):
         """Открывает диалог выбора файла, запоминает открытый файл и переходит к загрузке замечаний."""
@@ -143,79 +359,33 @@ class MainWindow(QMainWindow):
                 QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
                 QMessageBox.Yes
             )  # Окно с вариантами выбора: "да", "нет", "отмена"
-            if reply == QMessageBox.Yes:
-                self.save_file()  # Сохраняем текущий файл перед открытием другого
-            elif reply == QMessageBox.Cancel:
-                return
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Yes and not self.save_file()):
+                return  # Отменено или сохранить не удалось: изменения и журнал остаются
         # Открываем диалог для выбора файла
         filename, _ = QFileDialog.getOpenFileName(
-            self, "Выберите файл с замечаниями", "", "Файлы замечаний (*.txt *.json)"
+            self, "Выберите файл с замечаниями", "", "Файлы замечаний (*.txt *.json *.sqlite *.nca.db)"
         )
         if filename and os.path.exists(filename):  # Если этот файл существует
             self.load_file(filename)  # Загружаем файл
 
-    def read_from_txt(self, filename):
-        """Считывает замечания из .txt-файла и добавляет их в единый список."""
-        try:
-            with open(filename, "r", encoding="utf-8") as file:
-                remarks = file.read().splitlines()  # Каждую новую строку воспринимаем как отдельное замечание
-                for text in remarks:
-                    if not text.strip():
-                        continue  # Не добавляем пустые замечания
-                    # Создаём элемент списка
-                    item = QListWidgetItem(text)  # Текст замечания (очередная строка .txt-файла)
-                    item.setData(Qt.UserRole, "Без категории")  # Категория (для .txt всегда "Без категории")
-                    item.setData(Qt.UserRole + 1, [])  # Теги (для .txt всегда пустой список)
-                    # Добавляем этот элемент в два списка
-                    self.uncategorizedListWidget.addItem(item)  # Добавляем в список на вкладке "Без категории"
-                    self.summaryListWidget.addItem(item.clone())  # Клона добавляем в список на вкладке "Все"
-            return True
-        except FileNotFoundError:
-            return False
-
-    def read_from_json(self, filename):
-        """Считывает замечания и категории из .json-файла, создаёт и заполняет вкладки."""
-        try:
-            with open(filename, "r", encoding="utf-8") as file:
-                data = json.load(file)  # список словарей [{"category": ..., "text": ..., "tags": ...}]
-                categories = {}  # Собираем категории
-                for item in data:
-                    category = item.get('category', "Без категории")  # Получаем категорию
-                    text = item.get('text', "").strip()  # Получаем текст
-                    tags = item.get('tags', [])  # Получаем теги
-                    if not text:
-                        continue  # Не добавляем пустые замечания
-                    if category == "Без категории":  # Если в файле в качестве категории встретили "Без категории", то
-                        list_widget = self.uncategorizedListWidget  # Берём в качестве list_widget уже имеющийся список
-                    else:  # Для всех остальных категорий
-                        if category not in categories:  # Если такую категорию встретили впервые
-                            list_widget = QListWidget()  # Создаём новый список
-                            self.set_list_connects(list_widget)  # Подключаем реакции для этого списка
-                            self.ui.tabWidget.insertTab(self.ui.tabWidget.count() - 1, list_widget, category)  # Вкладка
-                            categories[category] = list_widget  # Запоминаем список для повторных обращений
-                        else:  # Если такую категорию уже встречали
-                            list_widget = categories[category]  # Берём в качестве list_widget уже имеющийся список
-                    # Создаём элемент списка
-                    item = QListWidgetItem(text)  # Текст замечания
-                    item.setData(Qt.UserRole, category)  # Категория
-                    item.setData(Qt.UserRole + 1, tags)  # Теги
-                    # Добавляем этот элемент в два списка
-                    list_widget.addItem(item)  # Добавляем в список на вкладке категории
-                    self.summaryListWidget.addItem(item.clone())  # Клона добавляем в список на вкладке "Все"
-            return True
-        except (FileNotFoundError, json.JSONDecodeError):
-            return False
-
     def save_file(self):
-        """Сохраняет изменения в текущем файле. Если файл .txt и есть категории — предупреждает о потере категорий."""
+        """
+        Сохраняет изменения в текущем файле. Если файл .txt и есть категории — предупреждает о потере категорий.
+
+        Возвращает:
+            bool: True, если изменения записаны; False, если записать не удалось или пользователь отменил сохранение.
+        """
         if self.current_file:  # Если не None, значит был открыт какой-то файл, сохраним изменения
+            saved = False  # Удалось ли записать файл
             if self.current_file.endswith(".json"):  # Если .json - сохраняем в json
-                self.write_to_json(self.current_file)
+                saved = self.write_to_json(self.current_file)
+            elif is_database(self.current_file):  # Если база данных - записываем только изменения
+                saved = self.write_to_database(self.current_file)
             elif self.current_file.endswith(".txt"):  # Если .txt, произойдёт потеря категорий, проверим их наличие
                 has_categories = self.ui.tabWidget.tabBar().count() > 2  # Есть вкладки помимо "Все" и "Без категории"?
-                has_tags = bool(self.get_tab_tags(0))  # Есть ли теги? (bool: непустой список - True, [] - False)
+                has_tags = bool(self.remark_model.tag_counts())  # Есть ли теги? (по счётчикам, без перебора замечаний)
                 if not has_categories and not has_tags:  # Если вкладок и тегов нет, то записываем в .txt
-                    self.write_to_txt(self.current_file)
+                    saved = self.write_to_txt(self.current_file)
                 else:  # Если они были, спрашиваем пользователя, не хочет ли он сменить формат на .json
                     reply = QMessageBox.question(
                         self,
@@ -234,34 +404,52 @@ class MainWindow(QMainWindow):
                                 f"В данной директории уже есть файл \"{os.path.basename(new_filename)}\".\n"
                                 "Используйте опцию \"Сохранить как\" и выберите другое имя."
                             )
-                            return  # Сохранить не удалось, выходим
-                        os.rename(self.current_file, new_filename)  # Меняем расширение текущего файла на уровне ФС
-                        self.current_file = new_filename  # Меняем на уровне приложения
-                        self.write_to_json(self.current_file)  # Записываем в .json-файл
+                            return False  # Сохранить не удалось, выходим
+                        saved = self.write_to_json(new_filename)  # Записываем в .json-файл
+                        if saved:  # Старый .txt-файл удаляем только после того, как .json-файл записан
+                            try:
+                                os.remove(self.current_file)
+                            except OSError as e:
+                                self.statusBar().showMessage(f"Не удалось удалить {self.current_file}: {e}", WAIT)
+                            self.current_file = new_filename  # Меняем на уровне приложения
                     elif reply == QMessageBox.No:
-                        self.write_to_txt(self.current_file)  # Записываем в .txt-файл
+                        saved = self.write_to_txt(self.current_file)  # Записываем в .txt-файл
                     else:
-                        return  # Пользователь отменил сохранение
-            self.load_file(self.current_file)  # На всякий случай перезагрузим файл после сохранения
+                        return False  # Пользователь отменил сохранение
+            if saved:
+                self.file_saved(self.current_file)  # Интерфейс не перестраиваем: в памяти уже то, что записано
+            return saved
         else:  # Если None, значит был создан новый файл
-            self.save_file_as()  # Предлагаем пользователю выбрать имя для сохранения
+            return self.save_file_as()  # Предлагаем пользователю выбрать имя для сохранения
 
     def save_file_as(self):
-        """Открывает диалог для сохранения файла с новым именем. После сохранения загружает новый файл."""
+        """
+        Открывает диалог для сохранения файла с новым именем. После сохранения новый файл становится текущим.
+
+        Возвращает:
+            bool: True, если файл записан; False, если записать не удалось или пользователь отменил сохранение.
+        """
         # Открываем диалог для выбора пути и формата файла
         filename, file_ext = QFileDialog.getSaveFileName(
-            self, "Сохранить как", "", "JSON-файлы (*.json);;Текстовые файлы (*.txt)"
+            self, "Сохранить как", "",
+            "JSON-файлы (*.json);;Текстовые файлы (*.txt);;Базы данных SQLite (*.sqlite *.nca.db)"
         )
         if filename:  # Если путь валидный, определяем формат, в который нужно сохранить
+            saved = False  # Удалось ли записать файл
             if file_ext == "JSON-файлы (*.json)":
                 # Если .json - сохраняем в json
-                self.write_to_json(filename)
+                saved = self.write_to_json(filename)
+            elif file_ext == "Базы данных SQLite (*.sqlite *.nca.db)":
+                # Если база данных - записываем все замечания в новую базу
+                if not is_database(filename):
+                    filename += ".sqlite"
+                saved = self.write_to_database(filename)
             elif file_ext == "Текстовые файлы (*.txt)":
                 # Если .txt, может произойти потеря категорий, проверим их наличие
                 has_categories = self.ui.tabWidget.tabBar().count() > 2  # Есть вкладки помимо "Все" и "Без категории"?
-                has_tags = bool(self.get_tab_tags(0))  # Есть ли теги? (bool: непустой список - True, [] - False)
+                has_tags = bool(self.remark_model.tag_counts())  # Есть ли теги? (по счётчикам, без перебора замечаний)
                 if not has_categories and not has_tags:  # Если таких вкладок нет, то записываем в .txt
-                    self.write_to_txt(filename)
+                    saved = self.write_to_txt(filename)
                 else:  # Если они были, спрашиваем пользователя, не хочет ли он сменить формат на .json
                     reply = QMessageBox.question(
                         self,
@@ -280,51 +468,327 @@ class MainWindow(QMainWindow):
                                 f"В данной директории уже есть файл \"{os.path.basename(new_filename)}\".\n"
                                 "Выберите другое имя или сначала удалите существующий файл."
                             )
-                            return  # Сохранить не удалось, выходим
+                            return False  # Сохранить не удалось, выходим
                         filename = new_filename
-                        self.write_to_json(filename)  # Записываем в .json-файл
+                        saved = self.write_to_json(filename)  # Записываем в .json-файл
                     elif reply == QMessageBox.No:
-                        self.write_to_txt(filename)  # Записываем в .txt-файл
+                        saved = self.write_to_txt(filename)  # Записываем в .txt-файл
                     else:
-                        return  # Пользователь отменил сохранение
-            self.load_file(filename)  # На всякий случай перезагрузим файл после сохранения
+                        return False  # Пользователь отменил сохранение
+            if saved:
+                self.file_saved(filename)  # Новый файл становится текущим, вкладки и поиск остаются как были
+            return saved
+        return False  # Пользователь закрыл диалог, не выбрав файл
 
     def write_to_txt(self, filename):
-        """Записывает все замечания в .txt-файл. Информация о категориях не сохраняется."""
+        """Записывает все замечания в .txt-файл. Информация о категориях не сохраняется. Возвращает True при успехе."""
+        return self.write_payload(filename, txt_chunks(self.remark_model.remarks)) is not None
+
+    def write_to_json(self, file_path):
+        """Записывает все замечания в .json-файл. Информация о категориях сохраняется. Возвращает True при успехе."""
+        categories = self.tab_categories()
+        checksum = self.write_payload(file_path, json_chunks(self.remark_model.remarks, categories))
+        if checksum is not None and self.use_snapshots:
+            try:  # Обновляем снимок, чтобы следующая загрузка файла не разбирала JSON
+                write_json_snapshot(file_path, self.remark_model.remarks, categories, checksum)
+            except (OSError, ValueError):
+                pass  # Снимок будет построен заново при следующей загрузке
+        return checksum is not None
+
+    def write_to_database(self, filename):
+        """Записывает замечания в базу данных (см. sync_database). Возвращает True при успехе."""
         try:
-            with open(filename, "w", encoding="utf-8") as file:
-                for row in range(self.summaryListWidget.count()):  # Каждое замечание записываем с новой строки
-                    file.write(self.summaryListWidget.item(row).text() + "\n")
-            self.statusBar().showMessage(f"Замечания сохранены в {filename}.", WAIT)
+            self.sync_database(filename)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка при сохранении файла", f"Не удалось сохранить файл:\n{str(e)}")
+            return False
+        self.statusBar().showMessage(f"Замечания сохранены в {filename}.", WAIT)
+        return True
 
-    def write_to_json(self, file_path):
-        """Записывает все замечания в .json-файл. Информация о категориях сохраняется."""
-        # Будем заполнять data для сохранения в .json-файл
-        data = []
-        # Проходимся по всем вкладкам (категориям), кроме вкладки "Все" (так как нет такой категории)
-        for i in range(self.ui.tabWidget.count()):
-            tab_name = self.ui.tabWidget.tabText(i)
-            if tab_name == "Все":
-                continue  # Вкладку "Все" не сохраняем отдельно
-            # На каждой вкладке проходимся по списку замечаний заполняя массив remarks
-            list_widget = self.ui.tabWidget.widget(i)
-            for j in range(list_widget.count()):
-                item = list_widget.item(j)  # Получаем элемент списка
-                text = item.text()  # Получаем текст замечания
-                tags = item.data(Qt.UserRole + 1) # Получаем теги
-                data.append({
-                    "category": tab_name,
-                    "text": text,
-                    "tags": tags
-                })
+    def sync_database(self, filename):
+        """
+        Приводит базу данных filename в соответствие с замечаниями в памяти.
+
+        Если эта база уже открыта, в неё построчно записываются только операции из журнала с прошлого сохранения
+        (одной транзакцией). Иначе база записывается целиком заново (например, при "Сохранить как").
+        """
+        if self.database is not None and self.database.filename == filename:
+            try:
+                self.database.apply(self.journal.operations, self.tab_categories())
+            except Exception:
+                self.close_database()  # Соответствие строк могло нарушиться - в следующий раз запишем базу целиком
+                raise
+        else:
+            self.close_database()
+            self.database = write_database(filename, self.remark_model.remarks, self.tab_categories())
+
+    def open_database(self, filename):
+        """Открывает базу данных, из которой только что загружены замечания, и расставляет вкладки в её порядке."""
+        self.database = RemarkDatabase.open(filename)
+        categories = [name for name in self.database.categories() if name != "Без категории"]
+        self.restore_tabs(categories + ["Без категории"])  # Пустые вкладки хранятся только в базе
+
+    def close_database(self):
+        """Закрывает открытую базу данных (если она есть)."""
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    def tab_categories(self):
+        """Возвращает категории в порядке следования вкладок, кроме вкладки "Все" (нет такой категории)."""
+        categories = [self.ui.tabWidget.tabText(i) for i in range(self.ui.tabWidget.count())]
+        return [category for category in categories if category != "Все"]
+
+    def write_payload(self, filename, chunks):
+        """
+        Записывает сериализованные замечания в файл. Возвращает контрольную сумму записанного файла (SHA-256)
+        или None, если записать файл не удалось.
+
+        Запись атомарная (см. remark_io.write_file): при сбое прежняя версия файла остаётся на месте. Если задано
+        количество резервных копий (настройка backup_count), предыдущие версии файла сохраняются рядом с ним.
+        Если включена проверка сохранения (настройка verify_saves), файл читается обратно и его контрольная сумма
+        сверяется с контрольной суммой записанных данных. Интерфейс при этом не перестраивается.
+        """
         try:
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
-            self.statusBar().showMessage(f"Замечания сохранены в {file_path}.", WAIT)
+            written_checksum = write_file(filename, chunks, self.backup_count)
+            if self.verify_saves and file_checksum(filename) != written_checksum:
+                raise OSError("содержимое записанного файла не совпадает с сохраняемыми данными.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка при сохранении файла", f"Не удалось сохранить файл:\n{str(e)}")
+            return None
+        self.statusBar().showMessage(f"Замечания сохранены в {filename}.", WAIT)
+        return written_checksum
+
+    def file_saved(self, filename):
+        """Делает сохранённый файл текущим, сбрасывает флаг несохранённых изменений и начинает журнал заново."""
+        self.current_file = filename
+        self.is_modified = False
+        self.update_window_title()
+        self.autosave_timer.stop()  # Всё записано, переносить из журнала нечего
+        try:
+            row_order = self.database.ordered_ids() if self.database is not None else None  # Порядок строк базы
+            base = journal_base(self.remark_model.remarks, self.tab_categories(), filename, row_order=row_order)
+            self.journal.start(journal_path(filename), base)
+        except OSError as e:
+            self.journal.discard()
+            self.statusBar().showMessage(f"Не удалось создать журнал изменений: {e}", WAIT)
+
+    def start_journal(self):
+        """
+        Начинает журнал операций для только что открытого (или созданного) файла.
+
+        Если рядом с файлом остался журнал с операциями, значит приложение в прошлый раз завершилось аварийно:
+        пользователю предлагается восстановить несохранённые изменения. Журнал, который не соответствует текущей
+        версии файла (файл изменился после начала журнала), не применяется и откладывается в сторону с суффиксом .old.
+        """
+        self.journal.discard()  # Журнал прежнего файла больше не нужен: изменения сохранены или отброшены
+        self.autosave_timer.stop()
+        self.undo_stack.clear()  # Действия с прежним файлом отменять нельзя
+        path = self.current_journal_path()
+        pending = OperationJournal.read(path)
+        if pending is not None and pending[1]:  # Есть операции, не перенесённые в файл
+            base, operations = pending
+            if base_matches_file(base, self.current_file):
+                reply = QMessageBox.question(
+                    self,
+                    "Восстановление изменений",
+                    "Приложение было закрыто, не сохранив изменения в этом файле.\n"
+                    "Восстановить несохранённые изменения?",
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.Yes
+                )  # Окно с вариантами выбора: "да", "нет"
+                if reply == QMessageBox.Yes and self.recover_journal(path, base, operations):
+                    return
+            else:
+                self.set_journal_aside(path)
+        try:
+            base = journal_base(self.remark_model.remarks, self.tab_categories(), self.current_file, loaded=True)
+            self.journal.start(path, base)
+        except OSError as e:
+            self.journal.discard()
+            self.statusBar().showMessage(f"Не удалось создать журнал изменений: {e}", WAIT)
+
+    def current_journal_path(self):
+        """Возвращает путь к журналу текущего файла (для нового файла - в папке данных приложения)."""
+        if self.current_file:
+            return journal_path(self.current_file)
+        directory = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation), "eluvesi", "NCA")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, "untitled" + JOURNAL_SUFFIX)
+
+    def set_journal_aside(self, path):
+        """Откладывает неподходящий журнал в сторону (суффикс .old), чтобы новый журнал его не перезаписал."""
+        try:
+            os.replace(path, path + ".old")
+        except OSError:
+            pass
+        self.statusBar().showMessage(
+            f"Журнал изменений не соответствует файлу и сохранён как {os.path.basename(path)}.old.", WAIT
+        )
+
+    def recover_journal(self, path, base, operations):
+        """
+        Применяет к только что загруженному файлу операции из журнала, оставшегося после аварийного завершения.
+
+        Возвращает:
+            bool: True, если изменения восстановлены и журнал продолжен.
+        """
+        remarks = self.remark_model.remarks
+        file_ids = runs_to_ids(base.get("ids", []))
+        self.replaying = True
+        try:
+            if len(file_ids) != len(remarks):
+                raise ValueError("количество замечаний в файле не совпадает с журналом.")
+            # Идентификаторы из журнала -> идентификаторы замечаний, загруженных из файла (None - совпадают)
+            id_map = {journal_id: remark.id for journal_id, remark in zip(file_ids, remarks)}
+            with self.remark_model.batch():  # Все операции журнала - одним сбросом модели, а не сигналом на каждую
+                self.restore_tabs(base.get("tabs", []))
+                for journal_id, category, tags in base.get("overrides", []):  # Категории и теги, которых нет в .txt
+                    if category not in self.category_views:
+                        self.add_category_tab(category)
+                    remark_id = id_map[journal_id]
+                    remark = self.remark_model.get_remark(remark_id)
+                    self.remark_model.update_remark(remark_id, remark.text, category, tags)
+                for record in operations:
+                    if record["op"] == "session":
+                        id_map = None  # Дальше записи сделаны после восстановления: идентификаторы уже совпадают
+                    else:
+                        self.apply_operation(record, id_map)
+            self.journal.resume(path, base, operations)
+            self.close_database()  # Операции журнала - в прежних идентификаторах: базу при сохранении запишем целиком
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка восстановления", f"Не удалось восстановить изменения:\n{str(e)}")
+            self.set_journal_aside(path)
+            return False
+        finally:
+            self.replaying = False
+        self.is_modified = True  # Восстановленные изменения ещё не сохранены в файл
+        self.statusBar().showMessage(f"Восстановлено несохранённых изменений: {len(operations)}.", WAIT)
+        return True
+
+    def restore_tabs(self, tabs):
+        """Создаёт недостающие вкладки из списка tabs и расставляет вкладки в его порядке."""
+        tab_bar = self.ui.tabWidget.tabBar()
+        for position, name in enumerate(tabs, start=1):  # Позиция 0 - вкладка "Все"
+            if name not in self.category_views:
+                self.add_category_tab(name, position)
+            index = self.ui.tabWidget.indexOf(self.category_views[name])
+            if index != position:
+                tab_bar.moveTab(index, position)
+
+    def apply_operation(self, record, id_map=None):
+        """
+        Применяет операцию из журнала.
+
+        Аргументы:
+            record (dict): Запись журнала.
+            id_map (dict[int, int], optional): Соответствие идентификаторов из журнала идентификаторам в модели
+                (None - идентификаторы совпадают).
+        """
+        op = record["op"]
+        remark_id = (lambda journal_id: journal_id) if id_map is None else id_map.__getitem__
+        if op in ("add", "edit", "bulk_edit") and record["category"] not in (None, *self.category_views):
+            self.add_category_tab(record["category"])
+        elif op in ("restore", "restore_fields"):  # Категория - предпоследнее поле каждого замечания записи
+            for category in dict.fromkeys(item[-2] for item in record["remarks"]):
+                if category not in self.category_views:
+                    self.add_category_tab(category)
+        if op == "add":
+            new_id = self.remark_model.add_remark(Remark(record["text"], record["category"], record["tags"]))
+            if id_map is not None:
+                id_map[record["id"]] = new_id
+        elif op == "edit":
+            self.remark_model.update_remark(remark_id(record["id"]), record["text"], record["category"], record["tags"])
+        elif op == "bulk_edit":
+            self.remark_model.bulk_update(
+                [remark_id(journal_id) for journal_id in record["ids"]],
+                record["category"], record["add_tags"], record["remove_tags"]
+            )
+        elif op == "remove":
+            self.remark_model.remove_remarks([remark_id(journal_id) for journal_id in record["ids"]])
+        elif op == "restore":
+            items = []
+            for journal_id, row, text, category, tags in record["remarks"]:
+                remark = Remark(text, category, tags)
+                # Удалённое замечание возвращается с прежним идентификатором (после сбоя - с идентификатором в модели)
+                remark.id = journal_id if id_map is None else id_map.get(journal_id)
+                items.append((row, remark))
+            self.remark_model.restore_remarks(items)
+            if id_map is not None:
+                for (journal_id, *_), (_, remark) in zip(record["remarks"], items):
+                    id_map[journal_id] = remark.id
+        elif op == "restore_fields":
+            with self.remark_model.batch():  # Сигналы об изменённых строках - одной группой
+                for journal_id, category, tags in record["remarks"]:
+                    model_id = remark_id(journal_id)
+                    text = self.remark_model.get_remark(model_id).text
+                    self.remark_model.update_remark(model_id, text, category, tags)
+        elif op == "clear":
+            if record.get("category") is None:
+                self.remark_model.clear()
+            else:
+                self.remark_model.remove_category(record["category"])
+        elif op == "add_tab":
+            self.add_category_tab(record["name"], record["position"])
+        elif op == "remove_tab":
+            self.delete_category_tab(record["name"])
+        elif op == "rename_tab":
+            self.rename_category_tab(record["old_name"], record["new_name"], record["position"])
+        elif op == "move_tab":
+            self.ui.tabWidget.tabBar().moveTab(record["from"], record["to"])
+        else:
+            raise ValueError(f"неизвестная операция в журнале: {op}")
+
+    def record_operation(self, op, undo=None, redo=None, **fields):
+        """
+        Записывает операцию в журнал, запускает отсчёт до автосохранения и запоминает действие для отмены.
+
+        Ошибка записи журнала (например, папка только для чтения) не мешает работе: журнал просто перестаёт вестись.
+
+        Аргументы:
+            op (str): Операция.
+            undo (list[dict], optional): Записи журнала, отменяющие операцию. По умолчанию None (операция - сама
+                отмена или повтор действия и в стек отмены не попадает).
+            redo (list[dict], optional): Записи журнала, выполняющие операцию повторно. По умолчанию - сама операция.
+            **fields: Поля записи журнала.
+        """
+        if self.replaying:
+            return  # Операцию применили из журнала, в нём она уже есть
+        if undo is not None:
+            self.undo_stack.push(UndoCommand(op, undo, redo if redo is not None else [dict(fields, op=op)]))
+        try:
+            self.journal.append(op, **fields)
+        except OSError as e:
+            self.journal.close()
+            self.statusBar().showMessage(f"Журнал изменений отключён: {e}", WAIT)
+            return
+        if self.autosave_timer.interval() > 0 and not self.autosave_timer.isActive():
+            self.autosave_timer.start()  # Отсчёт от первого изменения: при частых правках файл всё равно обновится
+
+    def compact_journal(self):
+        """
+        Автосохранение: переносит накопленные в журнале изменения в сам файл и начинает журнал заново.
+
+        Файл не перезаписывается, если он ещё не сохранялся (нет пути), если идёт загрузка или если это .txt-файл,
+        а в замечаниях есть категории или теги (при записи они бы потерялись). В этих случаях журнал продолжает расти.
+        """
+        if not self.journal.count or self.current_file is None or self.load_worker is not None:
+            return
+        has_categories = self.ui.tabWidget.tabBar().count() > 2  # Есть вкладки помимо "Все" и "Без категории"?
+        if self.current_file.endswith(".txt") and (has_categories or self.remark_model.tag_counts()):
+            return  # Запись в .txt потеряла бы категории и теги
+        try:
+            if is_database(self.current_file):
+                self.sync_database(self.current_file)  # В базу записываются только изменённые строки
+            elif self.current_file.endswith(".txt"):
+                write_file(self.current_file, txt_chunks(self.remark_model.remarks))
+            else:  # Резервные копии при автосохранении не сдвигаем
+                write_file(self.current_file, json_chunks(self.remark_model.remarks, self.tab_categories()))
+        except Exception as e:
+            self.statusBar().showMessage(f"Не удалось автоматически сохранить файл: {e}", WAIT)
+            return
+        self.file_saved(self.current_file)
+        self.statusBar().showMessage(f"Изменения автоматически сохранены в {self.current_file}.", WAIT)
 
     def revert_file(self):
         """Отменяет все изменения в текущем файле, если у текущего файла есть сохранённая версия."""
@@ -339,6 +803,42 @@ class MainWindow(QMainWindow):
         else:
             self.statusBar().showMessage(f"Вы работаете с новым файлом, у него нет сохранённой копии.", WAIT)
 
+    def undo(self):
+        """Отменяет последнее действие с замечаниями или вкладками (без перезагрузки файла)."""
+        if self.load_worker is not None:
+            return  # Пока файл загружается, замечания не меняются
+        command = self.undo_stack.undo()
+        if command is None:
+            self.statusBar().showMessage("Нечего отменять.", WAIT)
+            return
+        self.apply_records(command.undo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Отменено: {UNDO_LABELS[command.op]}.")
+
+    def redo(self):
+        """Повторяет последнее отменённое действие."""
+        if self.load_worker is not None:
+            return  # Пока файл загружается, замечания не меняются
+        command = self.undo_stack.redo()
+        if command is None:
+            self.statusBar().showMessage("Нечего повторять.", WAIT)
+            return
+        self.apply_records(command.redo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Повторено: {UNDO_LABELS[command.op]}.")
+
+    def apply_records(self, records):
+        """Применяет записи журнала из команды отмены или повтора и дописывает их в журнал."""
+        self.replaying = True  # Применяемые записи запишем в журнал сами
+        try:
+            with self.transaction():
+                for record in records:
+                    self.apply_operation(record)
+        finally:
+            self.replaying = False
+        for record in records:
+            self.record_operation(**record)  # Без undo: повтор и отмена не попадают в стек отмены
+        self.index_timer.start()  # Тексты возвращённых замечаний индексируем в свободное время
 
     def add_remark(self):
         """Открывает диалог для добавления нового замечания в список. В качестве категории предлагает текущую."""
@@ -348,166 +848,107 @@ class MainWindow(QMainWindow):
             default_category = "Без категории"  # Для "Все" и "Без категории" по умолчанию предлагаем "Без категории"
         else:
             default_category = tab_name  # Для остальных вкладок по умолчанию предлагаем текущую вкладку
+        from remark_dialog import RemarkDialog  # Диалоги и их интерфейс загружаются при первом открытии
         dialog = RemarkDialog(self, category=default_category, tags=[])
         if not dialog.exec():
             return  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
         text, category, tags = dialog.get_data()
         if not text:
             return  # Не добавляем пустые замечания
-        # Ищем вкладку по категории
-        for i in range(self.ui.tabWidget.count()):
-            if self.ui.tabWidget.tabText(i) == category:
-                # Когда нашли, в переменную list_widget сохраняем список с этой вкладки
-                list_widget = self.ui.tabWidget.widget(i)
-                break
-        else:
-            return  # Если не нашли (break не отработал), то выходим, но вообще такая ситуация невозможна
-        # Создаём элемент списка
-        item = QListWidgetItem(text)  # Текст, введённый пользователем, сохраняем в качестве текста элемента
-        item.setData(Qt.UserRole, category)  # Категорию, выбранную пользователем, сохраняем в data элемента
-        item.setData(Qt.UserRole + 1, tags)  # Теги, введённые пользователем, сохраняем в data элемента
-        # Добавляем этот элемент в два списка
-        list_widget.addItem(item)  # Добавляем в список на вкладке выбранной категории
-        self.summaryListWidget.addItem(item.clone())  # Клонируем и добавляем клона в список на вкладке "Все"
-        # Обновляем состояние
-        self.is_modified = True  # Файл изменился
-        self.update_window_title()  # Обновляем заголовок окна
-        self.update_tag_list()  # Обновляем список на панели тегов
-        self.statusBar().showMessage("Добавлено новое замечание.", 3000)
+        # Проверяем, что вкладка этой категории существует
+        if category not in self.category_views:
+            return  # Если не нашли, то выходим, но вообще такая ситуация невозможна
+        # Добавляем замечание в модель, его покажут и вкладка "Все", и вкладка выбранной категории
+        remark_id = self.remark_model.add_remark(Remark(text, category, tags))
+        self.record_operation(
+            "add", id=remark_id, text=text, category=category, tags=tags,
+            undo=[{"op": "remove", "ids": [remark_id]}], redo=[restore_record(self.remark_model.library, [remark_id])]
+        )  # Повтор возвращает замечание с тем же идентификатором, чтобы следующие команды ссылались на него
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed("Добавлено новое замечание.", 3000)
 
     def remove_remark(self):
         """Удаляет выбранное замечание из текущей вкладки и из всех соответствующих вкладок."""
-        # Определяем текущую вкладку и список
-        current_index = self.ui.tabWidget.currentIndex()
-        tab_name = self.ui.tabWidget.tabText(current_index)
-        list_widget = self.ui.tabWidget.widget(current_index)
-        # Определяем, какие элементы выделены
-        selected_items = list_widget.selectedItems()
-        if not selected_items:
+        # Определяем, какие замечания выделены на текущей вкладке
+        remark_ids = self.get_selected_ids(self.ui.tabWidget.currentWidget())
+        if not remark_ids:
             return
-        # Для каждого выбранного замечания
-        for item in selected_items:
-            text = item.text()  # Запоминаем текст замечания
-            category = item.data(Qt.UserRole)  # Запоминаем категорию замечания
-            # Удаляем клона замечания со вкладки "Все"
-            for i in reversed(range(self.summaryListWidget.count())):
-                clone = self.summaryListWidget.item(i)
-                if clone.text() == text and clone.data(Qt.UserRole) == category:
-                    self.summaryListWidget.takeItem(i)  # Удаляем клона на вкладке "Все"
-                    break
-            # Если мы на вкладке "Все", ищем и удаляем оригинал замечания
-            if tab_name == "Все":
-                for i in range(self.ui.tabWidget.count()):
-                    # Ищем вкладку, на которой находится оригинал, по категории
-                    if self.ui.tabWidget.tabText(i) == category:
-                        list_widget = self.ui.tabWidget.widget(i)
-                        for j in reversed(range(list_widget.count())):
-                            # Ищем само замечание по тексту
-                            if list_widget.item(j).text() == text:
-                                list_widget.takeItem(j)  # Удаляем оригинал замечания
-                                break
-                        break
-            # Иначе мы уже на нужной вкладке, просто удаляем оригинал
-            else:
-                list_widget.takeItem(list_widget.row(item))  # Удаляем оригинал замечания
-        # Обновляем состояние
-        self.is_modified = True  # Файл изменился
-        self.update_window_title()  # Обновляем заголовок
-        self.update_tag_list()  # Обновляем список на панели тегов
-        self.statusBar().showMessage("Выбранные замечания удалены.", WAIT)
+        undo = [restore_record(self.remark_model.library, remark_ids)]  # Запоминаем до удаления
+        # Удаляем их из модели по идентификаторам, все вкладки обновятся автоматически
+        self.remark_model.remove_remarks(remark_ids)
+        self.record_operation("remove", ids=remark_ids, undo=undo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed("Выбранные замечания удалены.")
 
     def edit_remark(self):
-        """Поочерёдно открывает диалоги для редактирования выбранных замечаний."""
-        # Определяем текущую вкладку и список
-        current_index = self.ui.tabWidget.currentIndex()
-        tab_name = self.ui.tabWidget.tabText(current_index)
-        list_widget = self.ui.tabWidget.widget(current_index)
-        # Определяем, какие элементы выделены
-        selected_items = list_widget.selectedItems()
-        if not selected_items:
+        """
+        Открывает диалог редактирования выбранного замечания. Если выбрано несколько замечаний, открывает одно окно
+        группового редактирования для всех них.
+        """
+        # Определяем, какие замечания выделены на текущей вкладке
+        remark_ids = self.get_selected_ids(self.ui.tabWidget.currentWidget())
+        if not remark_ids:
             return
-        # Для каждого выбранного замечания
-        for item in selected_items:
-            old_text = item.text()  # Старый текст
-            old_category = item.data(Qt.UserRole)  # Старая категория
-            old_tags = item.data(Qt.UserRole + 1)  # Старые теги
-            dialog = RemarkDialog(self, text=old_text, category=old_category, tags=old_tags)  # Окно редактирования
-            if not dialog.exec():
-                continue  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
-            new_text, new_category, new_tags = dialog.get_data()  # Получаем новые данные
-            if not new_text:
-                continue  # Не добавляем пустые замечания
-            # Находим клона замечания на вкладке "Все" и обновляем его данные
-            for i in range(self.summaryListWidget.count()):
-                clone = self.summaryListWidget.item(i)
-                if clone.text() == old_text and clone.data(Qt.UserRole) == old_category:
-                    clone.setText(new_text)  # Обновляем текст
-                    clone.setData(Qt.UserRole, new_category)  # Обновляем категорию
-                    clone.setData(Qt.UserRole + 1, new_tags)  # Обновляем теги
-                    break
-            # Если мы на вкладке "Все", ищем и обновляем оригинал замечания
-            if tab_name == "Все":
-                for i in range(self.ui.tabWidget.count()):
-                    # Ищем вкладку, на которой находится оригинал, и удаляем его оттуда, либо просто меняем текст
-                    if self.ui.tabWidget.tabText(i) == old_category:
-                        orig_list_widget = self.ui.tabWidget.widget(i)
-                        for j in reversed(range(orig_list_widget.count())):
-                            # Ищем само замечание по тексту
-                            if orig_list_widget.item(j).text() == old_text:
-                                if new_category == old_category:
-                                    orig_list_widget.item(j).setText(new_text)  # Обновляем текст оригинала замечания
-                                    orig_list_widget.item(j).setData(Qt.UserRole + 1, new_tags)  # Обновляем теги
-                                else:
-                                    orig_list_widget.takeItem(j)  # Удаляем оригинал замечания
-                                break
-                        break
-                # Если категория изменилась, то добавляем в новую, иначе ничего
-                if new_category != old_category:
-                    for i in range(self.ui.tabWidget.count()):
-                        # Ищем вкладку, куда нужно перенести оригинал, и добавляем его туда
-                        if self.ui.tabWidget.tabText(i) == new_category:
-                            new_item = QListWidgetItem(new_text)  # Создаём элемент списка, записываем текст
-                            new_item.setData(Qt.UserRole, new_category)  # Записываем категорию
-                            new_item.setData(Qt.UserRole + 1, new_tags)  # Записываем теги
-                            self.ui.tabWidget.widget(i).addItem(new_item)  # Добавляем элемент в список
-                            break
-            # Иначе мы уже на нужной вкладке, просто обновляем оригинал
-            else:
-                # Если категория не изменилась, то просто меняем текст и теги
-                if new_category == old_category:
-                    item.setText(new_text)  # Обновляем текст
-                    item.setData(Qt.UserRole + 1, new_tags)  # Обновляем теги
-                # Иначе удаляем из старой категории и добавляем в новую
-                else:
-                    list_widget.takeItem(list_widget.row(item))
-                    for i in range(self.ui.tabWidget.count()):
-                        # Ищем вкладку, куда нужно перенести замечание
-                        if self.ui.tabWidget.tabText(i) == new_category:
-                            new_item = QListWidgetItem(new_text)  # Создаём элемент списка, записываем текст
-                            new_item.setData(Qt.UserRole, new_category)  # Записываем категорию
-                            new_item.setData(Qt.UserRole + 1, new_tags)  # Записываем теги
-                            self.ui.tabWidget.widget(i).addItem(new_item)  # Добавляем элемент в список
-                            break
-            # Обновляем состояние
-            self.is_modified = True  # Файл изменился
-            self.update_window_title()  # Обновляем заголовок
-            self.update_tag_list()  # Обновляем список на панели тегов
-            self.statusBar().showMessage("Замечание обновлено.", WAIT)
+        if len(remark_ids) > 1:
+            self.bulk_edit_remarks(remark_ids)
+            return
+        from remark_dialog import RemarkDialog  # Диалог и его интерфейс загружаются при первом открытии
+        remark_id = remark_ids[0]
+        remark = self.remark_model.get_remark(remark_id)
+        dialog = RemarkDialog(self, text=remark.text, category=remark.category, tags=remark.tags)  # Окно
+        if not dialog.exec():
+            return  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
+        new_text, new_category, new_tags = dialog.get_data()  # Получаем новые данные
+        if not new_text:
+            return  # Не добавляем пустые замечания
+        # Для отмены запоминаем прежние данные (список тегов не копируем: замечание получит новый список)
+        undo = [{"op": "edit", "id": remark_id, "text": remark.text, "category": remark.category, "tags": remark.tags}]
+        # Обновляем замечание в модели, при смене категории оно само переместится на другую вкладку
+        self.remark_model.update_remark(remark_id, new_text, new_category, new_tags)
+        self.record_operation("edit", id=remark_id, text=new_text, category=new_category, tags=new_tags, undo=undo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed("Замечание обновлено.")
+
+    def bulk_edit_remarks(self, remark_ids):
+        """
+        Групповое редактирование: переносит замечания remark_ids в выбранную категорию и добавляет или убирает теги.
+
+        Все замечания изменяются одним действием с одной записью в журнале, а заголовок окна, список тегов и строка
+        состояния обновляются один раз в конце.
+        """
+        from bulk_edit_dialog import BulkEditDialog  # Диалог и его интерфейс загружаются при первом открытии
+        dialog = BulkEditDialog(self, len(remark_ids))
+        if not dialog.exec():
+            return  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
+        category, add_tags, remove_tags = dialog.get_data()
+        if category is None and not add_tags and not remove_tags:
+            return  # Ничего не меняется
+        # Для отмены запоминаем прежние категории и теги (списки тегов не копируем: замечания получат новые списки)
+        remarks = [self.remark_model.get_remark(remark_id) for remark_id in remark_ids]
+        old_fields = [[remark.id, remark.category, remark.tags] for remark in remarks]
+        changed = self.remark_model.bulk_update(remark_ids, category, add_tags, remove_tags)
+        if not changed:
+            self.statusBar().showMessage("Выбранные замечания уже в нужной категории и с нужными тегами.", WAIT)
+            return
+        self.record_operation(
+            "bulk_edit", ids=remark_ids, category=category, add_tags=add_tags, remove_tags=remove_tags,
+            undo=[{"op": "restore_fields", "remarks": old_fields}]
+        )
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Изменено замечаний: {changed}.")
 
     def copy_remark(self):
         """Копирует выбранные замечания в буфер обмена."""
-        # Определяем текущую вкладку и список
-        current_index = self.ui.tabWidget.currentIndex()
-        list_widget = self.ui.tabWidget.widget(current_index)
-        # Определяем, какие элементы выделены
-        selected_items = list_widget.selectedItems()
-        if selected_items:
-            remarks_text = "\n".join(item.text() for item in selected_items)
+        # Определяем, какие замечания выделены на текущей вкладке
+        remark_ids = self.get_selected_ids(self.ui.tabWidget.currentWidget())
+        if remark_ids:
+            remarks_text = "\n".join(self.remark_model.get_remark(remark_id).text for remark_id in remark_ids)
             QGuiApplication.clipboard().setText(remarks_text)
             self.statusBar().showMessage("Выбранные замечания скопированы в буфер обмена.", WAIT)
 
     def add_tab(self):
         """Открывает диалог для добавления новой вкладки."""
+        from tab_dialog import TabDialog  # Диалог и его интерфейс загружаются при первом открытии
         dialog = TabDialog(self, position=self.ui.tabWidget.count() - 1)  # По умолчанию добавляем в конец
         if not dialog.exec():
             return  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
@@ -520,14 +961,11 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", f"Вкладка\"{name}\" уже существует.")
                 return
         # Если не существует, создаём и открываем новую вкладку
-        list_widget = QListWidget()  # Создаём виджет списка
-        self.set_list_connects(list_widget)  # Подключаем для него реакции
-        self.ui.tabWidget.insertTab(position, list_widget, name)  # Создаём новую вкладку с этим виджетом
-        self.ui.tabWidget.setCurrentWidget(list_widget)  # Переключаемся на новую вкладку
-        # Обновляем состояние
-        self.is_modified = True
-        self.update_window_title()
-        self.statusBar().showMessage(f"Добавлена новая вкладка \"{name}\".", WAIT)
+        list_view = self.add_category_tab(name, position)  # Вкладка со списком - прокси-представлением модели
+        self.record_operation("add_tab", name=name, position=position, undo=[{"op": "remove_tab", "name": name}])
+        self.ui.tabWidget.setCurrentWidget(list_view)  # Переключаемся на новую вкладку
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Добавлена новая вкладка \"{name}\".")
 
     def remove_tab(self):
         """Удаляет открытую вкладку со всеми замечаниями, а также клонов этих замечаний на вкладке "Все"."""
@@ -536,25 +974,16 @@ class MainWindow(QMainWindow):
         tab_name = self.ui.tabWidget.tabText(current_index)
         if tab_name in ["Все", "Без категории"]:
             return  # Эти вкладки нельзя удалить
-        # Определяем, с каким списком работаем
-        list_widget = self.ui.tabWidget.widget(current_index)
-        for i in range(list_widget.count()):
-            # Для каждого замечания из списка на текущей вкладке
-            item = list_widget.item(i)
-            text = item.text()  # Получаем текст замечания
-            category = item.data(Qt.UserRole)  # И его категорию
-            for j in reversed(range(self.summaryListWidget.count())):
-                # Ищем клона этого замечания на вкладке "Все"
-                clone = self.summaryListWidget.item(j)
-                if clone.text() == text and clone.data(Qt.UserRole) == category:
-                    self.summaryListWidget.takeItem(j)  # И удаляем его с вкладки "Все"
-                    break
-        self.ui.tabWidget.removeTab(current_index) # Удаляем текущую вкладку
-        # Обновляем состояние
-        self.is_modified = True  # Файл изменился
-        self.update_window_title()  # Обновляем заголовок
-        self.update_tag_list()  # Обновляем список на панели тегов
-        self.statusBar().showMessage(f"Вкладка \"{tab_name}\" удалена.", WAIT)
+        # Для отмены запоминаем позицию вкладки и замечания категории с их местами в списке
+        undo = [
+            {"op": "add_tab", "name": tab_name, "position": current_index},
+            restore_record(self.remark_model.library, self.remark_model.category_ids(tab_name)),
+        ]
+        with self.transaction():  # Замечания и вкладка удаляются одним обновлением
+            self.delete_category_tab(tab_name)  # Удаляем текущую вкладку вместе с замечаниями этой категории
+        self.record_operation("remove_tab", name=tab_name, undo=undo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Вкладка \"{tab_name}\" удалена.")
 
     def edit_tab(self):
         """Открывает диалог для редактирования текущей вкладки."""
@@ -563,6 +992,7 @@ class MainWindow(QMainWindow):
         old_name = self.ui.tabWidget.tabText(current_index)
         if old_name in ["Все", "Без категории"]:
             return  # Эти вкладки нельзя редактировать
+        from tab_dialog import TabDialog
         dialog = TabDialog(self, name=old_name, position=current_index)
         if not dialog.exec():
             return  # Если пользователь нажал "Отмена" или просто закрыл окно, то ничего не делаем
@@ -574,45 +1004,35 @@ class MainWindow(QMainWindow):
             # Вторая часть условия нужна, чтобы не было предупреждения когда пользователь хочет сменить только позицию
             QMessageBox.warning(self, "Ошибка", f"Вкладка \"{new_name}\" уже существует.")
             return
-        # Обновляем название вкладки
-        self.ui.tabWidget.setTabText(current_index, new_name)
-        # Обновляем data у всех замечаний на этой вкладке и у всех их клонов на вкладке "Все"
-        list_widget = self.ui.tabWidget.widget(current_index)
-        for i in range(list_widget.count()):
-            item = list_widget.item(i)
-            item.setData(Qt.UserRole, new_name)
-            # Обновляем клонов этих замечаний со вкладки "Все"
-            text = item.text()
-            for j in range(self.summaryListWidget.count()):
-                clone = self.summaryListWidget.item(j)
-                if clone.text() == text and clone.data(Qt.UserRole) == old_name:
-                    clone.setData(Qt.UserRole, new_name)
-                    break
-        # Если позиция изменилась, перемещаем вкладку и открываем её
+        # Переименовываем вкладку и категорию её замечаний, при необходимости перемещаем вкладку
+        self.rename_category_tab(old_name, new_name, new_position)
+        self.record_operation(
+            "rename_tab", old_name=old_name, new_name=new_name, position=new_position,
+            undo=[{"op": "rename_tab", "old_name": new_name, "new_name": old_name, "position": current_index}]
+        )
         if new_position != current_index:
-            widget = self.ui.tabWidget.widget(current_index)
-            self.ui.tabWidget.removeTab(current_index)
-            self.ui.tabWidget.insertTab(new_position, widget, new_name)
-            self.ui.tabWidget.setCurrentIndex(new_position)
-        # Обновляем состояние
-        self.is_modified = True
-        self.update_window_title()
-        self.statusBar().showMessage(f"Вкладка \"{old_name}\" переименована в \"{new_name}\".", WAIT)
+            self.ui.tabWidget.setCurrentIndex(new_position)  # Открываем перемещённую вкладку
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Вкладка \"{old_name}\" переименована в \"{new_name}\".")
 
     def remove_user_tabs(self):
         """Удаляет все вкладки, созданные пользователем. Вкладки "Все" и "Без категории" просто очищает."""
         # Удаляем все вкладки, кроме вкладок "Все" и "Без категории"
-        for i in reversed(range(1, self.ui.tabWidget.count() - 1)):
-            self.ui.tabWidget.removeTab(i)
-        # Очищаем списки на вкладках "Все" и "Без категории"
-        self.summaryListWidget.clear()
-        self.uncategorizedListWidget.clear()
-
-    def clear_all_lists(self):
-        """Очищает списки замечаний на всех вкладках категорий, не удаляя сами вкладки."""
-        # Очищаем списки на всех вкладках, в том числе "Все" и "Без категории"
-        for i in range(self.ui.tabWidget.count()):
-            self.ui.tabWidget.widget(i).clear()
+        with self.remark_model.batch():
+            for i in reversed(range(1, self.ui.tabWidget.count() - 1)):
+                self.remove_tab_at(i)
+            self.category_views = {"Без категории": self.uncategorizedListView}  # В индексе остаётся "Без категории"
+            # Очищаем модель - списки на вкладках "Все" и "Без категории" опустеют вместе с ней
+            self.remark_model.clear()
+
+    def remove_tab_at(self, index):
+        """Удаляет вкладку с индексом index вместе с её списком и прокси-моделью."""
+        list_view = self.ui.tabWidget.widget(index)
+        self.ui.tabWidget.removeTab(index)
+        list_view.model().set_active(False)  # Прокси-модель больше не следит за моделью
+        if self.active_view is list_view:
+            self.active_view = None
+        list_view.deleteLater()  # Удаляем список вместе с прокси-моделью
 
     def clear_list(self):
         """Очищает список замечаний на текущей вкладке. На вкладке "Все" очищает списки на всех вкладках."""
@@ -620,43 +1040,55 @@ class MainWindow(QMainWindow):
         current_index = self.ui.tabWidget.currentIndex()
         tab_name = self.ui.tabWidget.tabText(current_index)
         if tab_name == "Все":
-            # Если мы на вкладке "Все", то очищаем вообще все списки
-            self.clear_all_lists()
+            # Если мы на вкладке "Все", то удаляем вообще все замечания (вкладки остаются)
+            undo = [restore_record(self.remark_model.library)]
+            self.remark_model.clear()
+            self.record_operation("clear", category=None, undo=undo)
         else:
-            # На других вкладках - очищаем список на текущей вкладке, и удаляем клонов этих замечаний со вкладки "Все"
-            list_widget = self.ui.tabWidget.widget(current_index)
-            for i in range(list_widget.count()):
-                # Для каждого замечания на текущей вкладке
-                text = list_widget.item(i).text()
-                for j in reversed(range(self.summaryListWidget.count())):
-                    # Ищем на вкладке "Все" клона этого замечания и удаляем
-                    clone = self.summaryListWidget.item(j)
-                    if clone.text() == text and clone.data(Qt.UserRole) == tab_name:
-                        self.summaryListWidget.takeItem(j)
-                        break
-            list_widget.clear()  # Когда замечания со вкладки "Все" удалили, очищаем список на текущей вкладке
-        # Обновляем состояние
-        self.is_modified = True  # Файл изменился
-        self.update_window_title()  # Обновляем заголовок
-        self.statusBar().showMessage(f"Список замечаний на вкладке \"{tab_name}\" очищен.", WAIT)
+            # На других вкладках - удаляем замечания категории текущей вкладки
+            undo = [restore_record(self.remark_model.library, self.remark_model.category_ids(tab_name))]
+            self.remark_model.remove_category(tab_name)
+            self.record_operation("clear", category=tab_name, undo=undo)
+        # Файл изменился: обновляем заголовок, панель тегов и строку состояния
+        self.content_changed(f"Список замечаний на вкладке \"{tab_name}\" очищен.")
+
+    def create_list_view(self, category=None):
+        """Создаёт список замечаний для вкладки категории category (None - вкладка "Все") поверх общей модели."""
+        list_view = QListView()  # Создаём список
+        list_view.setUniformItemSizes(True)  # Высота строки вычисляется один раз, а не для каждого замечания
+        list_view.setLayoutMode(QListView.Batched)  # Раскладка строк порциями, не блокируя окно
+        # Прокси-модель удалится вместе со списком, к общей модели она подключится при переходе на вкладку
+        proxy_model = RemarkFilterProxyModel(self.remark_model, category, list_view)
+        list_view.setModel(proxy_model)  # Список отображает прокси-модель
+        self.set_list_connects(list_view)  # Подключаем реакции на действия пользователя
+        return list_view
 
-    def set_list_connects(self, list_widget):
+    def set_list_connects(self, list_view):
         """Подключает реакции на действия пользователя (клики, выделения) для указанного списка."""
-        list_widget.itemDoubleClicked.connect(self.edit_remark)  # Редактирование двойным кликом
-        list_widget.setSelectionMode(QListWidget.ExtendedSelection)  # Включаем множественное выделение
-        list_widget.itemSelectionChanged.connect(self.toggle_remark_buttons)  # Вкл/выкл кнопки замечаний
-        list_widget.setContextMenuPolicy(Qt.CustomContextMenu)  # Включаем контекстное меню (для реакции на ПКМ)
-        list_widget.customContextMenuRequested.connect(
-            lambda: self.copy_remark() if list_widget.selectedItems() else None
+        list_view.doubleClicked.connect(self.edit_remark)  # Редактирование двойным кликом
+        list_view.setSelectionMode(QListView.ExtendedSelection)  # Включаем множественное выделение
+        list_view.selectionModel().selectionChanged.connect(self.toggle_remark_buttons)  # Вкл/выкл кнопки замечаний
+        list_view.setContextMenuPolicy(Qt.CustomContextMenu)  # Включаем контекстное меню (для реакции на ПКМ)
+        list_view.customContextMenuRequested.connect(
+            lambda: self.copy_remark() if list_view.selectionModel().hasSelection() else None
         )  # Устанавливаем копирование выделенных замечаний в качестве реакции на нажатие ПКМ
 
+    def get_selected_ids(self, list_view):
+        """Возвращает идентификаторы замечаний, выделенных в списке, в порядке их следования в модели."""
+        proxy_model = list_view.model()
+        rows = sorted(
+            row for selection_range in list_view.selectionModel().selection()
+            for row in proxy_model.source_rows(selection_range.top(), selection_range.bottom())
+        )
+        return [self.remark_model.remarks[row].id for row in rows]
+
     def toggle_remark_buttons(self):
         """Выключает кнопки взаимодействия с замечаниями, если нет выбранных замечаний. И наоборот."""
         # Определяем текущую вкладку и список
         current_index = self.ui.tabWidget.currentIndex()
-        list_widget = self.ui.tabWidget.widget(current_index)
+        list_view = self.ui.tabWidget.widget(current_index)
         # Если ничего не выбрано, то отключаем кнопки удаления и редактирования замечаний, иначе - включаем
-        has_selection = bool(list_widget.selectedItems())
+        has_selection = list_view.selectionModel().hasSelection()
         self.ui.remarkRemoveButton.setEnabled(has_selection)
         self.ui.remarkEditButton.setEnabled(has_selection)
         self.ui.remarkCopyButton.setEnabled(has_selection)
@@ -678,12 +1110,6 @@ class MainWindow(QMainWindow):
         self.ui.tagPanelButton.setChecked(visible)  # Меняем состояние кнопки
         self.ui.tagPanelButton.setToolTip("Скрыть панель тегов" if visible else "Показать панель тегов")
 
-    def toggle_tag_checkbox(self, item):
-        """Переключает состояние чекбокса для элемента списка."""
-        current_state = item.checkState()  # Считываем текущее состояние
-        new_state = Qt.Unchecked if current_state == Qt.Checked else Qt.Checked  # Меняем на противоположное
-        item.setCheckState(new_state)  # Устанавливаем новое состояние
-
     def set_tag_filter_mode(self, mode):
         """Переключает режим фильтрации по тегам ("AND"/"OR") и обновляет состояние кнопок."""
         self.tag_filter_mode = mode  # Режим фильтрации: "AND" или  "OR"
@@ -691,40 +1117,63 @@ class MainWindow(QMainWindow):
         self.ui.tagPanelOrButton.setChecked(mode == "OR")  # Меняем состояние кнопки "||"
         self.filter_remarks()  # Повторно применяем фильтр с новым режимом
 
+    def tab_moved(self, from_index, to_index):
+        """Записывает в журнал перетаскивание вкладки - одной операцией от начальной позиции до конечной."""
+        undo = [{"op": "move_tab", "from": to_index, "to": from_index}]
+        self.record_operation("move_tab", undo=undo, **{"from": from_index, "to": to_index})
+
     def tab_changed(self):
+        self.activate_current_view()  # Подключаем к модели прокси-модель новой вкладки вместо прежней
         self.toggle_tab_buttons()  # Вкл/выкл кнопки редактирования и удаления вкладки
         self.toggle_remark_buttons()  # Вкл/выкл кнопки взаимодействия с замечаниями
         self.ui.searchLineEdit.clear()  # Очищаем строку поискового запроса
-        self.filter_remarks()  # Производим поиск с пустым поисковым запросом, чтобы отобразить скрытые элементы
-        self.update_tag_list()  # Обновляем список тегов
+        self.update_tag_list()  # Обновляем список тегов и фильтр (поисковый запрос сброшен, отметки тегов остаются)
+
+    def activate_current_view(self):
+        """
+        Подключает к модели замечаний прокси-модель текущей вкладки и отключает прокси-модель прежней вкладки.
+
+        Каждое изменение модели обрабатывает только одна прокси-модель, сколько бы вкладок ни было открыто, а список
+        (см. create_list_view) запрашивает у неё данные только видимых строк.
+        """
+        current_view = self.ui.tabWidget.currentWidget()
+        if current_view is self.active_view:
+            return
+        if self.active_view is not None:
+            self.active_view.model().set_active(False)
+        if current_view is not None:
+            current_view.model().set_active(True)
+        self.active_view = current_view
 
     def filter_remarks(self):
-        """Фильтрует замечания на текущей вкладке по поисковому запросу и по тегам."""
+        """
+        Фильтрует замечания на текущей вкладке по поисковому запросу и по тегам.
+
+        Сначала по индексам вычисляется маска видимых замечаний, затем она одним пакетом передаётся прокси-модели
+        текущей вкладки, и список перестраивается один раз. Отложенная фильтрация (filter_timer) при этом отменяется.
+
+        Прокси-модель перестраивается сбросом, поэтому выделенные замечания, оставшиеся видимыми, выделяются заново
+        по идентификаторам: перенос выделения средствами Qt при тысячах выделенных строк занимает секунды.
+        """
+        self.filter_timer.stop()  # Фильтруем прямо сейчас, отложенный вызов больше не нужен
         # Определяем поисковый запрос и переводим его в нижний регистр
         query = self.ui.searchLineEdit.text().strip().lower()
-        # Определяем список выбранных тегов
-        selected_tags = [
-            self.ui.tagListWidget.item(i).text()
-            for i in range(self.ui.tagListWidget.count())
-            if self.ui.tagListWidget.item(i).checkState() == Qt.Checked
-        ]
-        # Определяем список на текущей вкладке
-        list_widget = self.ui.tabWidget.currentWidget()
-        # Фильтруем список
-        for i in range(list_widget.count()):
-            item = list_widget.item(i)  # Очередной элемент списка
-            item_text = item.text().lower()  # Текст замечания в нижнем регистре
-            item_tags = item.data(Qt.UserRole + 1)  # Теги замечания
-            # Проверяем, содержится ли в тексте замечания введённый пользователем поисковый запрос
-            text_matches = query in item.text().lower() if query else True
-            # Если режим "И", то проверяем содержатся ли в тегах замечания все теги, выбранные пользователем
-            if self.tag_filter_mode == "AND":
-                tag_matches = all(tag in item_tags for tag in selected_tags) if selected_tags else True
-            # Если режим "ИЛИ", то проверяем содержится ли в тегах замечания хотя бы один тег, выбранный пользователем
-            else:
-                tag_matches = any(tag in item_tags for tag in selected_tags) if selected_tags else True
-            # Скрываем элемент, если нет никаких совпадений
-            item.setHidden(not (text_matches and tag_matches))
+        # По поисковому индексу и маскам тегов получаем маску подходящих замечаний (без перебора всех замечаний)
+        mask = self.remark_model.filter_mask(query, self.tag_model.checked_tags(), self.tag_filter_mode)
+        # Передаём маску прокси-модели текущей вкладки, она сама скроет неподходящие замечания
+        list_view = self.ui.tabWidget.currentWidget()
+        proxy_model = list_view.model()
+        selection_model = list_view.selectionModel()
+        selected_ids = self.get_selected_ids(list_view)
+        current = list_view.currentIndex()
+        current_id = self.remark_model.remarks[proxy_model.mapToSource(current).row()].id if current.isValid() else None
+        if not proxy_model.set_filter(mask):
+            return  # Видимые замечания не изменились, выделение осталось на месте
+        if selected_ids:
+            selection_model.select(proxy_model.selection_of(selected_ids), QItemSelectionModel.Select)
+        if current_id is not None:
+            selection_model.setCurrentIndex(proxy_model.index_of(current_id), QItemSelectionModel.NoUpdate)
+        self.toggle_remark_buttons()  # Сброс прокси-модели снимает выделение без сигнала selectionChanged
 
     def set_shortcuts(self):
         """Включает шорткаты для действий, не привязанных к кнопкам."""
@@ -736,6 +1185,9 @@ class MainWindow(QMainWindow):
         QShortcut(QKeySequence("Ctrl+F"), self).activated.connect(
             lambda: self.ui.searchLineEdit.setFocus()
         )
+        # Отмена последнего действия при нажатии сочетания клавиш "Ctrl + Z", повтор - "Ctrl + Shift + Z"
+        QShortcut(QKeySequence("Ctrl+Z"), self).activated.connect(self.undo)
+        QShortcut(QKeySequence("Ctrl+Shift+Z"), self).activated.connect(self.redo)
         # Обработка нажатия на "Esc" (разные действия в зависимости от текущего фокуса)
         QShortcut(QKeySequence("Esc"), self).activated.connect(
             self.esc_shortcut
@@ -743,18 +1195,55 @@ class MainWindow(QMainWindow):
 
     def esc_shortcut(self):
         """Обрабатывает нажатие на "Esc" по-разному в зависимости от фокуса."""
-        if self.ui.searchLineEdit.hasFocus():  # Если фокус на строке поиска
+        if self.load_worker is not None:  # Если идёт загрузка файла, отменяем её
+            self.cancel_loading()
+        elif self.ui.searchLineEdit.hasFocus():  # Если фокус на строке поиска
             self.ui.searchLineEdit.clear()  # Очищаем строку поиска
             self.ui.tabWidget.currentWidget().setFocus()  # Возвращаем фокус на список замечаний
-        elif self.ui.tagListWidget.hasFocus():  # Если фокус на списке тегов
-            self.ui.tagListWidget.clearSelection()  # Сбрасываем выделение в списке тегов
-            for i in range(self.ui.tagListWidget.count()):  # Сбрасываем все чекбоксы в списке тегов
-                item = self.ui.tagListWidget.item(i)
-                item.setCheckState(Qt.Unchecked)
+        elif self.ui.tagListView.hasFocus():  # Если фокус на списке тегов
+            self.ui.tagListView.clearSelection()  # Сбрасываем выделение в списке тегов
+            self.tag_model.uncheck_all()  # Сбрасываем все чекбоксы одним сигналом
+            self.filter_remarks()  # Применяем фильтр сразу, не дожидаясь таймера
             self.ui.tabWidget.currentWidget().setFocus()  # Возвращаем фокус на список замечаний
         else:  # Во всех прочих случаях
             self.ui.tabWidget.currentWidget().clearSelection()  # Сбрасываем выделение в списке замечаний
 
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Контекст для группы изменений замечаний и вкладок (например, применения многих операций подряд).
+
+        Сигналы модели объединяются (см. RemarkModel.batch), а заголовок окна, панель тегов и фильтр обновляются
+        один раз в конце внешней транзакции, а не после каждого изменения (см. content_changed).
+        """
+        self.transaction_depth += 1
+        try:
+            with self.remark_model.batch():
+                yield
+        finally:
+            self.transaction_depth -= 1
+            if self.transaction_depth == 0 and self.refresh_pending:
+                self.refresh_pending = False
+                self.refresh_state()
+
+    def content_changed(self, message, timeout=WAIT):
+        """
+        Отмечает, что файл изменился, и показывает message в строке состояния. Заголовок окна и панель тегов
+        обновляются сразу, а внутри transaction() - один раз в её конце.
+        """
+        self.is_modified = True
+        self.statusBar().showMessage(message, timeout)
+        if self.transaction_depth:
+            self.refresh_pending = True
+        else:
+            self.refresh_state()
+
+    def refresh_state(self):
+        """Обновляет всё, что зависит от замечаний: заголовок окна, список тегов, фильтр и кнопки замечаний."""
+        self.update_window_title()
+        self.update_tag_list()
+        self.toggle_remark_buttons()  # После сброса модели выделение снимается без сигнала selectionChanged
+
     def update_window_title(self):
         """Обновляет заголовок окна, отображает название текущего файла и звёздочку."""
         base_title = "Помощник нормоконтролёра"
@@ -763,25 +1252,20 @@ class MainWindow(QMainWindow):
         self.setWindowTitle(f"{file_name}{modify_marker} – {base_title}")
 
     def get_tab_tags(self, tab_index):
-        """Возвращает отсортированный список уникальных тегов для замечаний с текущей вкладки."""
-        list_widget = self.ui.tabWidget.widget(tab_index)  # Виджет списка со вкладки с индексом tab_index
-        tags = set()  # Используем set(), чтобы отбрасывать повторы
-        for i in range(list_widget.count()):
-            item = list_widget.item(i)
-            item_tags = item.data(Qt.UserRole + 1)
-            if item_tags:
-                tags.update(item_tags)
-        return sorted(tags)
+        """Возвращает отсортированный список уникальных тегов для замечаний с вкладки tab_index."""
+        category = self.ui.tabWidget.widget(tab_index).model().category  # Категория вкладки (None для "Все")
+        return sorted(self.remark_model.tag_counts(category))  # Теги берём из счётчиков, замечания не перебираем
 
     def update_tag_list(self):
-        """Обновляет список тегов на панели тегов (tagListWidget)."""
-        tags = self.get_tab_tags(self.ui.tabWidget.currentIndex())  # Получаем отсортированный список уникальных тегов
-        self.ui.tagListWidget.clear()   # Очищаем список перед обновлением
-        for tag in tags:
-            list_item = QListWidgetItem(tag)  # Создаём очередной элемент списка
-            list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)  # Добавляем элементу списка чекбокс
-            list_item.setCheckState(Qt.Unchecked)  # По умолчанию чекбокс не установлен
-            self.ui.tagListWidget.addItem(list_item)
+        """
+        Обновляет список тегов на панели тегов (tagListView) и заново применяет фильтр к текущей вкладке.
+
+        Список не создаётся заново: модель тегов получает новые счётчики и меняет только те строки, которые
+        изменились. Отметки тегов сохраняются.
+        """
+        category = self.ui.tabWidget.currentWidget().model().category  # Категория вкладки (None для "Все")
+        self.tag_model.set_counts(self.remark_model.tag_counts(category), self.remark_model.tag_counts())
+        self.filter_remarks()  # Замечания или вкладка могли измениться - обновляем фильтр
 
     def closeEvent(self, event):
         """Запрос подтверждения перед закрытием, если есть несохранённые изменения."""
@@ -793,15 +1277,23 @@ class MainWindow(QMainWindow):
                 QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
                 QMessageBox.Yes
             )  # Окно с вариантами выбора: "да", "нет", "отмена"
-            if reply == QMessageBox.Yes:
-                self.save_file()  # Сохраняем изменения
-            elif reply == QMessageBox.Cancel:
-                event.ignore()  # Отменяем закрытие окна
+            # Журнал удаляется, только если изменения сохранены или пользователь отказался их сохранять
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Yes and not self.save_file()):
+                event.ignore()  # Отменяем закрытие окна: сохранение отменено или не удалось
                 return
+        self.cancel_loading(silent=True, wait=True)  # Не закрываем окно, пока фоновый поток загрузки не остановится
         # Сохраняем необходимые данные в настройках
-        self.settings.setValue("last_file", self.current_file)  # Сохраняем в настройках текущий файл как последний
+        # Сохраняем в настройках текущий файл как последний (если окно закрыли до его открытия - прежний)
+        self.settings.setValue("last_file", self.current_file if self.startup_file is None else self.startup_file)
         self.settings.setValue("tag_panel_visible", self.ui.tagPanelWidget.isVisible())  # Видимость панели тегов
         self.settings.setValue("tag_filter_mode", self.tag_filter_mode)  # Режим фильтрации по тегам: "AND" или "OR"
+        self.settings.setValue("filter_debounce_ms", self.filter_timer.interval())  # Задержка фильтрации (мс)
+        self.settings.setValue("verify_saves", self.verify_saves)  # Проверка записанного файла
+        self.settings.setValue("backup_count", self.backup_count)  # Количество резервных копий файла
+        self.settings.setValue("snapshot_cache", self.use_snapshots)  # Снимки .json-файлов
+        self.settings.setValue("autosave_interval_ms", self.autosave_timer.interval())  # Период автосохранения (мс)
+        self.journal.discard()  # Окно закрывается штатно: изменения сохранены или отброшены пользователем
+        self.close_database()
         # Закрываем окно
         event.accept()
 
@@ -814,10 +1306,37 @@ class LockedTabBar(QTabBar):
     Переопределяет обработку отпускания кнопки мыши, чтобы автоматически
     вернуть эти вкладки на закреплённые позиции.
 
+    Во время перетаскивания QTabBar сообщает tabMoved при каждом обмене соседних вкладок, а возврат закреплённых
+    вкладок - это ещё несколько перемещений. Поэтому о перетаскивании целиком сообщается отдельным сигналом, один раз
+    после отпускания кнопки мыши.
+
+    Сигналы:
+        tab_dragged(int, int): Вкладку перетащили с одной позиции на другую (позиции до и после перетаскивания).
+
     Методы:
+        mousePressEvent(event):
+            Запоминает вкладку, которую начали перетаскивать.
         mouseReleaseEvent(event):
             Обрабатывает отпускание кнопки мыши и перемещает закреплённые вкладки.
     """
+    tab_dragged = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        """Конструктор класса LockedTabBar."""
+        super().__init__(parent)
+        self.drag_start = None  # Позиция и название вкладки, на которой нажали кнопку мыши
+
+    def mousePressEvent(self, event):
+        """
+        Обработка события нажатия кнопки мыши: запоминает, с какой позиции начинается перетаскивание вкладки.
+
+        Аргументы:
+            event (QMouseEvent): Событие нажатия кнопки мыши.
+        """
+        super().mousePressEvent(event)
+        index = self.tabAt(event.pos())
+        self.drag_start = (index, self.tabText(index)) if event.button() == Qt.LeftButton and index >= 0 else None
+
     def mouseReleaseEvent(self, event):
         """
         Обработка события отпускания кнопки мыши.
@@ -837,4 +1356,11 @@ class LockedTabBar(QTabBar):
         # Возвращаем вкладку "Без категории" на последнюю позицию
         for i in range(count):
             if self.tabText(i) == "Без категории":
-                self.moveTab(i, count - 1)
\ No newline at end of file
+                self.moveTab(i, count - 1)
+        # Сообщаем о перетаскивании одним перемещением: названия вкладок уникальны, ищем перетащенную по названию
+        if self.drag_start is not None and event.button() == Qt.LeftButton:
+            start, name = self.drag_start
+            self.drag_start = None
+            end = next((i for i in range(count) if self.tabText(i) == name), start)
+            if end != start:
+                self.tab_dragged.emit(start, end)
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+Ядро помощника нормоконтролёра: замечания и категории, библиотека замечаний с индексами (поиск, теги), чтение
+и запись файлов, снимки, база данных, журнал операций и стек отмены.
+
+Пакет не импортирует Qt: его можно использовать в скриптах, пакетной обработке и замерах производительности без
+QApplication. Графический интерфейс (main_window, remark_model, tag_model и диалоги) - представление над ним.
+
+Модули:
+    remark_library: Замечания (Remark), категории (Category) и библиотека замечаний (RemarkLibrary).
+    search_index: Полнотекстовый поиск по замечаниям.
+    tag_index: Битовые маски тегов, счётчики тегов и автодополнение.
+    remark_io: Чтение и атомарная запись файлов .txt и .json.
+    remark_snapshot: Двоичные снимки .json-файлов для быстрой загрузки.
+    remark_db: Файлы базы данных SQLite.
+    journal: Журнал операций для восстановления после сбоя.
+    undo_stack: Стек отмены и повтора действий.
+    cli: Пакетная обработка файлов из командной строки (python -m nca).
+
+Самые нужные классы доступны прямо из пакета (from nca import RemarkLibrary), остальное - из модулей. Модули ввода
+и вывода импортируются только по запросу, чтобы импорт самого пакета оставался быстрым.
+"""
+from nca.remark_library import Category, Remark, RemarkLibrary, edit_tags
+from nca.search_index import SearchIndex
+from nca.tag_index import TagCounts, TagIndex
+
+
+__all__ = ["Category", "Remark", "RemarkLibrary", "SearchIndex", "TagCounts", "TagIndex", "edit_tags"]
@@ -0,0 +1,7 @@
+"""Пакетная обработка файлов замечаний из командной строки: python -m nca <команда> (см. nca.cli)."""
+import sys
+
+from nca.cli import main
+
+
+sys.exit(main())
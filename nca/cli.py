@@ -0,0 +1,240 @@
+"""
+Пакетная обработка файлов замечаний из командной строки, без графического интерфейса: python -m nca <команда>.
+
+Команды:
+    search FILE QUERY: Выводит замечания, текст которых содержит запрос (с отбором по категории и тегам).
+    convert SRC DST: Переводит файл замечаний в другой формат (.txt, .json, .sqlite/.nca.db).
+    merge FILE...: Объединяет несколько файлов замечаний, одинаковые замечания записываются один раз.
+    stats FILE: Выводит количество замечаний по категориям и тегам.
+
+Файлы читаются и записываются теми же функциями, что и в приложении (см. remark_io и remark_db), по одному
+замечанию: индексы библиотеки не строятся, а .txt-файлы и вывод в .txt не держат замечания в памяти. Вместо
+пути к файлу можно указать "-" - стандартный ввод или вывод, формат которых задают параметры --from и --to.
+Из базы данных команда search читает только замечания, найденные полнотекстовым индексом (см. search_database).
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+from nca.remark_db import is_database, read_categories, search_database, write_database
+from nca.remark_io import iter_remarks, json_chunks, read_json, read_txt, txt_chunks, write_file
+from nca.search_index import normalize
+
+
+STREAM = "-"  # Вместо пути к файлу: стандартный ввод или вывод
+STREAM_FORMATS = ("txt", "json")  # Форматы стандартного ввода и вывода
+
+
+def read_remarks(filename, stream_format="txt"):
+    """
+    Читает замечания из файла или из стандартного ввода (filename == "-") по одному.
+
+    Аргументы:
+        filename (str): Путь к файлу или "-".
+        stream_format (str, optional): Формат стандартного ввода: "txt" или "json". По умолчанию "txt".
+
+    Возвращает:
+        tuple[Iterator[Remark], list[str]]: Прочитанные замечания и категории в порядке вкладок. Порядок вкладок
+            хранит только база данных (вместе с пустыми вкладками), для остальных форматов список пуст: вкладки
+            идут в порядке первого появления категории, как при открытии файла в приложении.
+    """
+    if filename == STREAM:
+        return (read_json if stream_format == "json" else read_txt)(sys.stdin.buffer), []
+    return iter_remarks(filename), read_categories(filename) if is_database(filename) else []
+
+
+def write_remarks(filename, remarks, stream_format="txt", categories=()):
+    """
+    Записывает замечания в файл (атомарно, как при сохранении в приложении) или в стандартный вывод.
+
+    В .txt замечания пишутся по мере чтения. Для .json и базы данных замечания сначала собираются в список:
+    они группируются по категориям в порядке categories, а категории, которых там нет, добавляются в порядке первого
+    появления (как вкладки при открытии файла). В базу данных записываются и категории без замечаний.
+
+    Аргументы:
+        filename (str): Путь к файлу или "-".
+        remarks (Iterable[Remark]): Замечания в порядке следования.
+        stream_format (str, optional): Формат стандартного вывода: "txt" или "json". По умолчанию "txt".
+        categories (Iterable[str], optional): Категории в порядке вкладок (см. read_remarks).
+    """
+    if filename == STREAM:
+        file_format = stream_format
+    elif filename.endswith(".txt"):
+        file_format = "txt"
+    elif filename.endswith(".json"):
+        file_format = "json"
+    elif is_database(filename):
+        file_format = "database"
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+    if file_format == "txt":
+        chunks = txt_chunks(remarks)
+    else:
+        remarks = list(remarks)
+        categories = list(dict.fromkeys(itertools.chain(categories, (remark.category for remark in remarks))))
+        if file_format == "database":
+            for remark_id, remark in enumerate(remarks):
+                remark.id = remark_id  # Идентификаторы, которые в приложении назначила бы библиотека
+            write_database(filename, remarks, categories).close()
+            return
+        chunks = json_chunks(remarks, categories)
+    if filename == STREAM:
+        output = sys.stdout.buffer
+        for chunk in chunks:
+            output.write(chunk.encode("utf-8"))
+        output.flush()
+    else:
+        write_file(filename, chunks)
+
+
+def search(args):
+    """Команда search: выводит замечания, подходящие под запрос, категорию и теги."""
+    query = normalize(args.query)
+    tags = set(args.tag)
+    match_tags = tags.issubset if args.mode == "AND" else tags.intersection  # Как фильтр тегов в приложении
+    source, categories = read_remarks(args.file, args.from_format)
+    if query and args.file != STREAM and is_database(args.file):
+        source = search_database(args.file, query)  # Из базы читаются только кандидаты из полнотекстового индекса
+    remarks = (
+        remark for remark in source
+        if query in normalize(remark.text)
+        and (args.category is None or remark.category == args.category)
+        and (not tags or match_tags(remark.tags))
+    )
+    if args.limit is not None:
+        remarks = itertools.islice(remarks, args.limit)  # Остальная часть файла не читается
+    if args.count:
+        print(sum(1 for _ in remarks))
+    else:
+        write_remarks(args.output, remarks, args.to_format, categories)
+
+
+def convert(args):
+    """Команда convert: переводит файл замечаний в формат, заданный расширением DST."""
+    remarks, categories = read_remarks(args.src, args.from_format)
+    write_remarks(args.dst, remarks, args.to_format, categories)
+
+
+def merge(args):
+    """
+    Команда merge: объединяет файлы замечаний в порядке их перечисления.
+
+    Замечания с одинаковыми категорией и текстом записываются один раз - в месте первого появления, с
+    объединёнными тегами.
+    """
+    merged = {}  # (категория, текст) -> замечание
+    categories = {}  # Порядок вкладок: категории файлов в порядке их перечисления (словарь без значений)
+    for filename in args.files:
+        remarks, file_categories = read_remarks(filename, args.from_format)
+        categories.update(dict.fromkeys(file_categories))
+        for remark in remarks:
+            categories.setdefault(remark.category)
+            key = (remark.category, remark.text.strip())
+            first = merged.get(key)
+            if first is None:
+                merged[key] = remark
+            else:
+                first.tags = first.tags + [tag for tag in remark.tags if tag not in first.tags]
+    write_remarks(args.output, merged.values(), args.to_format, categories)
+
+
+def stats(args):
+    """Команда stats: выводит количество замечаний, категорий и тегов."""
+    categories = Counter()  # Категории в порядке первого появления
+    tags = Counter()
+    untagged = 0
+    remarks, _ = read_remarks(args.file, args.from_format)
+    for remark in remarks:
+        categories[remark.category] += 1
+        tags.update(remark.tags)
+        untagged += not remark.tags
+    total = sum(categories.values())
+    if args.json:
+        result = {"remarks": total, "untagged": untagged, "categories": categories, "tags": dict(tags.most_common())}
+        print(json.dumps(result, ensure_ascii=False, indent=4))
+        return
+    print(f"Замечаний: {total}")
+    print(f"Без тегов: {untagged}")
+    print(f"Категорий: {len(categories)}")
+    for category, count in categories.items():
+        print(f"{count:>10}  {category}")
+    print(f"Тегов: {len(tags)}")
+    for tag, count in tags.most_common():
+        print(f"{count:>10}  {tag}")
+
+
+def build_parser():
+    """Создаёт разбор аргументов командной строки со всеми командами."""
+    input_options = argparse.ArgumentParser(add_help=False)
+    input_options.add_argument(
+        "--from", dest="from_format", choices=STREAM_FORMATS, default="txt",
+        help="формат стандартного ввода, если вместо файла указан \"-\" (по умолчанию txt)"
+    )
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument(
+        "--to", dest="to_format", choices=STREAM_FORMATS, default="txt",
+        help="формат стандартного вывода, если вместо файла указан \"-\" (по умолчанию txt)"
+    )
+
+    parser = argparse.ArgumentParser(prog="nca", description="Пакетная обработка файлов замечаний без GUI.")
+    commands = parser.add_subparsers(dest="command_name", metavar="COMMAND", required=True)
+
+    command = commands.add_parser("search", parents=[input_options, output_options],
+                                  help="поиск замечаний по тексту, категории и тегам")
+    command.add_argument("file", metavar="FILE", help="файл замечаний или \"-\"")
+    command.add_argument("query", metavar="QUERY", help="искомая подстрока (без учёта регистра, \"\" - любой текст)")
+    command.add_argument("-c", "--category", help="только замечания этой категории")
+    command.add_argument("-t", "--tag", action="append", default=[],
+                         help="только замечания с этим тегом (можно указать несколько раз)")
+    command.add_argument("--mode", choices=("AND", "OR"), default="AND",
+                         help="нужны все указанные теги (AND, по умолчанию) или любой из них (OR)")
+    command.add_argument("-n", "--limit", type=int, help="вывести не больше LIMIT замечаний")
+    command.add_argument("--count", action="store_true", help="вывести только количество найденных замечаний")
+    command.add_argument("-o", "--output", default=STREAM,
+                         help="файл для найденных замечаний (по умолчанию - стандартный вывод)")
+    command.set_defaults(command=search)
+
+    command = commands.add_parser("convert", parents=[input_options, output_options],
+                                  help="перевод файла замечаний в другой формат")
+    command.add_argument("src", metavar="SRC", help="исходный файл или \"-\"")
+    command.add_argument("dst", metavar="DST", help="новый файл (.txt, .json, .sqlite, .nca.db) или \"-\"")
+    command.set_defaults(command=convert)
+
+    command = commands.add_parser("merge", parents=[input_options, output_options],
+                                  help="объединение нескольких файлов замечаний")
+    command.add_argument("files", metavar="FILE", nargs="+", help="файлы замечаний в порядке объединения")
+    command.add_argument("-o", "--output", default=STREAM, help="файл результата (по умолчанию - стандартный вывод)")
+    command.set_defaults(command=merge)
+
+    command = commands.add_parser("stats", parents=[input_options], help="количество замечаний по категориям и тегам")
+    command.add_argument("file", metavar="FILE", help="файл замечаний или \"-\"")
+    command.add_argument("--json", action="store_true", help="вывести статистику в формате JSON")
+    command.set_defaults(command=stats)
+    return parser
+
+
+def main(argv=None):
+    """
+    Выполняет команду командной строки.
+
+    Аргументы:
+        argv (list[str], optional): Аргументы командной строки без имени программы. По умолчанию - sys.argv[1:].
+
+    Возвращает:
+        int: Код завершения: 0 - успех, 1 - ошибка чтения или записи.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.command(args)
+    except BrokenPipeError:
+        # Читатель конвейера закрылся раньше (например, head): остаток вывода отбрасываем без ошибки
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (OSError, ValueError, sqlite3.Error) as error:
+        print(f"{parser.prog}: {error}", file=sys.stderr)
+        return 1
+    return 0
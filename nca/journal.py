@@ -0,0 +1,221 @@
+import json
+import os
+
+from nca.remark_db import is_database
+from nca.remark_io import group_by_category
+
+
+JOURNAL_SUFFIX = ".journal"  # Журнал лежит рядом с файлом замечаний: <файл>.journal
+
+
+def journal_path(filename):
+    """Возвращает путь к журналу операций файла filename."""
+    return filename + JOURNAL_SUFFIX
+
+
+def ids_to_runs(remark_ids):
+    """
+    Сжимает последовательность идентификаторов в список отрезков [первый, длина].
+
+    Идентификаторы замечаний в файле обычно идут подряд большими отрезками, поэтому порядок замечаний в файле
+    занимает в журнале несколько чисел, а не по числу на замечание.
+    """
+    runs = []
+    for remark_id in remark_ids:
+        if runs and runs[-1][0] + runs[-1][1] == remark_id:
+            runs[-1][1] += 1  # Идентификатор продолжает текущий отрезок
+        else:
+            runs.append([remark_id, 1])
+    return runs
+
+
+def runs_to_ids(runs):
+    """Разворачивает список отрезков [первый, длина] обратно в список идентификаторов."""
+    return [remark_id for first, length in runs for remark_id in range(first, first + length)]
+
+
+def journal_base(remarks, tabs, filename, loaded=False, row_order=None):
+    """
+    Возвращает первую запись журнала: как замечания в памяти соответствуют замечаниям в файле filename.
+
+    Запись содержит идентификаторы замечаний в том порядке, в котором они записаны в файл (в виде отрезков),
+    вкладки в порядке следования, размер и время изменения файла. Для .txt-файла дополнительно сохраняются
+    категории и теги замечаний, которых в самом файле нет.
+
+    Если файл только что загружен (loaded), замечания в памяти идут в том же порядке, что и в файле. Если только
+    что записан, то .json-файл сгруппирован по категориям (см. remark_io.json_chunks), а порядок в памяти мог остаться
+    другим: например, в файле другой программы категории замечаний чередуются.
+
+    Аргументы:
+        remarks (list[Remark]): Замечания в порядке следования в памяти.
+        tabs (list[str]): Категории в порядке вкладок.
+        filename (str | None): Путь к файлу (None - новый файл, у которого нет версии на диске).
+        loaded (bool, optional): Файл только что загружен. По умолчанию False (только что записан).
+        row_order (list[int], optional): Для базы данных - идентификаторы замечаний в порядке строк базы
+            (см. RemarkDatabase.ordered_ids). По умолчанию совпадает с порядком в памяти.
+    """
+    base = {"tabs": tabs}
+    if filename is None:
+        ordered = []  # У нового файла нет версии на диске
+    elif is_database(filename) and row_order is not None:
+        by_id = {remark.id: remark for remark in remarks}
+        ordered = [by_id[remark_id] for remark_id in row_order]  # Возвращённые замечания могли попасть в конец базы
+    elif is_database(filename):
+        ordered = remarks  # База загружена или записана целиком: порядок строк совпадает с порядком в памяти
+    elif filename.endswith(".json") and loaded:
+        ordered = remarks  # Порядок в памяти совпадает с порядком в только что загруженном файле
+    elif filename.endswith(".json"):
+        ordered = [remark for _, group in group_by_category(remarks, tabs) for remark in group]
+    else:
+        ordered = remarks
+        base["overrides"] = [
+            [remark.id, remark.category, remark.tags]
+            for remark in remarks if remark.category != "Без категории" or remark.tags
+        ]
+    base["ids"] = ids_to_runs(remark.id for remark in ordered)
+    if filename is not None:
+        stat = os.stat(filename)
+        base["size"], base["mtime"] = stat.st_size, stat.st_mtime_ns
+    return base
+
+
+def base_matches_file(base, filename):
+    """Проверяет, что журнал с первой записью base начат для текущей версии файла filename (None - нового файла)."""
+    if filename is None:
+        return "size" not in base
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return False
+    return base.get("size") == stat.st_size and base.get("mtime") == stat.st_mtime_ns
+
+
+class OperationJournal:
+    """
+    Журнал операций над замечаниями и вкладками, который дописывается рядом с текущим файлом после каждого изменения.
+
+    Журнал - текстовый файл, по одной JSON-записи на строку. Первая запись ("base") описывает, как замечания
+    в памяти соответствуют замечаниям в файле: порядок их идентификаторов в файле, список вкладок, размер и время
+    изменения файла (чтобы не применить журнал к другой версии файла). Остальные записи - операции: добавление,
+    изменение (в том числе групповое) и удаление замечаний, очистка списка, добавление, переименование,
+    перемещение и удаление вкладок. Отмена и повтор действий записываются такими же операциями, а удалённые
+    замечания возвращаются записью "restore" с прежними идентификаторами и местами в списке ("restore_fields"
+    возвращает прежние категории и теги после группового изменения).
+    Запись "session" означает, что журнал был применён после сбоя и дальше идентификаторы совпадают
+    с идентификаторами замечаний, восстановленных из файла и предыдущих записей.
+
+    Дописать строку в журнал гораздо дешевле, чем перезаписать весь файл замечаний. При штатной работе журнал
+    удаляется (или начинается заново после сохранения), поэтому непустой журнал при открытии файла означает, что
+    приложение завершилось аварийно.
+
+    Методы:
+        start(path, base):
+            Начинает новый журнал.
+        resume(path, base, operations):
+            Продолжает существующий журнал после восстановления.
+        append(op, **fields):
+            Дописывает операцию в журнал.
+        close():
+            Закрывает журнал, оставляя файл на диске.
+        discard():
+            Закрывает и удаляет журнал.
+        read(path):
+            Читает журнал с диска.
+    """
+    def __init__(self):
+        """Конструктор класса OperationJournal."""
+        self.path = None  # Путь к текущему журналу (None, если журнал не ведётся)
+        self.operations = []  # Операции с начала журнала (для построчной записи в базу данных)
+        self._file = None  # Открытый на дозапись файл журнала
+
+    @property
+    def count(self):
+        """Количество операций с начала журнала."""
+        return len(self.operations)
+
+    def start(self, path, base):
+        """Начинает журнал path заново: записывает первую запись base (см. описание класса)."""
+        self.discard()  # Прежний журнал больше не нужен (изменения сохранены или отброшены)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._write(dict(base, op="base"))
+        os.fsync(self._file.fileno())  # Начало журнала должно попасть на диск раньше первых операций
+
+    def resume(self, path, base, operations):
+        """
+        Продолжает журнал path после восстановления: дальнейшие операции дописываются после записи "session".
+
+        Журнал переписывается из уже прочитанных записей base и operations, чтобы недописанная при сбое строка
+        не склеилась с новыми записями.
+        """
+        self.close()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for record in [base, *operations, {"op": "session"}]:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self.operations = list(operations)
+
+    def append(self, op, **fields):
+        """
+        Добавляет операцию op с параметрами fields в список операций и дописывает её в файл журнала (если он ведётся).
+        """
+        fields["op"] = op
+        self.operations.append(fields)
+        if self._file is not None:
+            self._write(fields)
+
+    def close(self):
+        """Закрывает файл журнала, не удаляя его."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Закрывает и удаляет журнал."""
+        self.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self.operations = []
+
+    def _write(self, record):
+        """Дописывает запись одной строкой и сразу передаёт её ОС, чтобы она пережила аварийное завершение."""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    @staticmethod
+    def read(path):
+        """
+        Читает журнал с диска.
+
+        Последняя строка могла записаться не полностью (приложение завершилось посреди записи) - такая строка
+        и всё после неё пропускаются.
+
+        Аргументы:
+            path (str): Путь к журналу.
+
+        Возвращает:
+            tuple[dict, list[dict]] | None: Первая запись и список операций или None, если журнала нет
+                или он повреждён с самого начала.
+        """
+        records = []
+        try:
+            with open(path, encoding="utf-8", errors="replace") as file:  # Недописанный символ не помешает чтению
+                for line in file:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break  # Недописанная строка
+        except OSError:
+            return None
+        if not records or records[0].get("op") != "base":
+            return None
+        return records[0], records[1:]
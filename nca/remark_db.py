@@ -0,0 +1,453 @@
+import os
+import sqlite3
+
+from nca.remark_library import Remark, edit_tags
+from nca.search_index import normalize
+
+
+DATABASE_EXTENSIONS = (".sqlite", ".nca.db")  # Расширения файлов базы данных замечаний
+PROGRESS_STEP = 1000  # Через сколько замечаний сообщать о прогрессе чтения
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS remarks (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS remarks_category ON remarks(category_id);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS remark_tags (
+    remark_id INTEGER NOT NULL REFERENCES remarks(id),
+    position INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL REFERENCES tags(id),
+    PRIMARY KEY (remark_id, position)
+);
+CREATE INDEX IF NOT EXISTS remark_tags_tag ON remark_tags(tag_id);
+"""  # Теги хранятся с позицией, чтобы порядок и повторы тегов замечания сохранялись без потерь
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS remarks_fts USING fts5(
+    text, content='remarks', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS remarks_fts_insert AFTER INSERT ON remarks BEGIN
+    INSERT INTO remarks_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS remarks_fts_delete AFTER DELETE ON remarks BEGIN
+    INSERT INTO remarks_fts(remarks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS remarks_fts_update AFTER UPDATE OF text ON remarks BEGIN
+    INSERT INTO remarks_fts(remarks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO remarks_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""  # Полнотекстовый индекс FTS5 поверх таблицы remarks, триггеры поддерживают его в актуальном состоянии
+FTS_MIN_QUERY = 3  # Токенизатор trigram находит подстроки не короче трёх символов
+
+
+def is_database(filename):
+    """Проверяет по расширению, что файл - база данных замечаний."""
+    return filename.endswith(DATABASE_EXTENSIONS)
+
+
+def connect(filename):
+    """Открывает базу данных замечаний и создаёт в ней таблицы, если их ещё нет."""
+    connection = sqlite3.connect(filename)
+    connection.executescript(SCHEMA)
+    create_fts(connection)
+    return connection
+
+
+def create_fts(connection):
+    """
+    Создаёт полнотекстовый индекс FTS5 для поиска по подстроке (команда search, см. search_database), если SQLite
+    собран с FTS5 и токенизатором trigram (SQLite 3.34+). Без них база работает, а поиск перебирает строки.
+
+    Если индекс создан в базе, где уже есть замечания, он заполняется по таблице remarks.
+    """
+    if has_fts(connection):
+        return True
+    try:
+        connection.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        return False
+    connection.execute("INSERT INTO remarks_fts(remarks_fts) VALUES ('rebuild')")
+    connection.commit()
+    return True
+
+
+def has_fts(connection):
+    """Проверяет, есть ли в базе полнотекстовый индекс."""
+    return connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'remarks_fts'").fetchone() is not None
+
+
+def iter_database(filename, progress=None):
+    """
+    Читает замечания из базы данных по одному, в порядке их идентификаторов.
+
+    Замечания и их теги читаются двумя курсорами, упорядоченными по идентификатору замечания, и сливаются на ходу,
+    поэтому таблица тегов целиком в память не загружается.
+
+    Аргументы:
+        filename (str): Путь к базе данных.
+        progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных замечаний.
+
+    Возвращает:
+        Iterator[Remark]: Прочитанные замечания.
+    """
+    connection = open_database(filename)
+    try:
+        yield from read_rows(connection, progress=progress)
+    finally:
+        connection.close()
+
+
+def search_database(filename, query):
+    """
+    Читает из базы данных только замечания, текст которых может содержать запрос, в порядке их идентификаторов.
+
+    Кандидаты находятся полнотекстовым индексом (см. create_fts), а без него или для короткого запроса - перебором
+    текстов в SQLite. Теги читаются только для кандидатов. Проверка "запрос является подстрокой нормализованного
+    текста" остаётся за вызывающим кодом: индекс сравнивает регистр по правилам SQLite.
+
+    Аргументы:
+        filename (str): Путь к базе данных.
+        query (str): Нормализованный запрос (см. search_index.normalize).
+
+    Возвращает:
+        Iterator[Remark]: Замечания-кандидаты.
+    """
+    connection = open_database(filename)
+    try:
+        connection.execute("CREATE TEMP TABLE matches (id INTEGER PRIMARY KEY)")
+        if len(query) >= FTS_MIN_QUERY and has_fts(connection):
+            connection.execute(
+                "INSERT INTO matches SELECT rowid FROM remarks_fts WHERE remarks_fts MATCH ?",
+                ('"' + query.replace('"', '""') + '"',)  # Запрос целиком - одна строка, а не выражение FTS5
+            )
+        else:
+            connection.create_function("normalize", 1, normalize)
+            connection.execute("INSERT INTO matches SELECT id FROM remarks WHERE instr(normalize(text), ?)", (query,))
+        yield from read_rows(connection, "IN (SELECT id FROM matches)")
+    finally:
+        connection.close()
+
+
+def read_categories(filename):
+    """Возвращает категории базы данных в порядке вкладок, включая категории без замечаний (пустые вкладки)."""
+    connection = open_database(filename)
+    try:
+        return [name for name, in connection.execute("SELECT name FROM categories ORDER BY position")]
+    finally:
+        connection.close()
+
+
+def open_database(filename):
+    """Открывает существующую базу данных замечаний для чтения."""
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"Файл не найден: {filename}")
+    return connect(filename)
+
+
+def read_rows(connection, condition=None, progress=None):
+    """
+    Читает замечания (все или с идентификаторами, подходящими под условие condition) в порядке идентификаторов.
+
+    Аргументы:
+        connection (sqlite3.Connection): Соединение с базой данных.
+        condition (str, optional): Условие на идентификатор замечания, например "IN (SELECT id FROM matches)".
+        progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных замечаний.
+
+    Возвращает:
+        Iterator[Remark]: Прочитанные замечания.
+    """
+    remark_filter = f"WHERE r.id {condition} " if condition else ""
+    tag_filter = f"WHERE rt.remark_id {condition} " if condition else ""
+    total = max(connection.execute("SELECT count(*) FROM remarks r " + remark_filter).fetchone()[0], 1)
+    remarks = connection.execute(
+        "SELECT r.id, c.name, r.text FROM remarks r JOIN categories c ON c.id = r.category_id "
+        + remark_filter + "ORDER BY r.id"
+    )
+    tags = connection.execute(
+        "SELECT rt.remark_id, t.name FROM remark_tags rt JOIN tags t ON t.id = rt.tag_id "
+        + tag_filter + "ORDER BY rt.remark_id, rt.position"
+    )
+    tag_row = tags.fetchone()
+    for i, (rowid, category, text) in enumerate(remarks):
+        if progress and i % PROGRESS_STEP == 0:
+            progress(i / total)
+        remark_tags = []
+        while tag_row is not None and tag_row[0] <= rowid:
+            if tag_row[0] == rowid:
+                remark_tags.append(tag_row[1])
+            tag_row = tags.fetchone()
+        yield Remark(text, category, remark_tags)
+
+
+def write_database(filename, remarks, categories):
+    """
+    Записывает все замечания в новую базу данных (например, при "Сохранить как" или конвертации из .json).
+
+    База строится во временном файле и подменяет прежний файл через os.replace, поэтому при сбое прежняя база
+    остаётся нетронутой. Идентификаторы замечаний в базе - их номера по порядку, начиная с 1.
+
+    Аргументы:
+        filename (str): Путь к базе данных.
+        remarks (list[Remark]): Замечания в порядке следования.
+        categories (list[str]): Категории в порядке вкладок.
+
+    Возвращает:
+        RemarkDatabase: Открытая база данных, готовая к построчной записи изменений.
+    """
+    temp_name = filename + ".tmp"
+    if os.path.exists(temp_name):
+        os.remove(temp_name)
+    connection = connect(temp_name)
+    try:
+        with connection:
+            database = RemarkDatabase(connection, filename, rowids=[])
+            database.set_category_order(categories)
+            category_ids = {name: database.category_id(name) for name in dict.fromkeys(r.category for r in remarks)}
+            connection.executemany(
+                "INSERT INTO remarks (id, category_id, text) VALUES (?, ?, ?)",
+                ((row, category_ids[remark.category], remark.text) for row, remark in enumerate(remarks, start=1))
+            )
+            tag_ids = {}
+            for row, remark in enumerate(remarks, start=1):
+                for position, tag in enumerate(remark.tags):
+                    tag_id = tag_ids.get(tag)
+                    if tag_id is None:
+                        tag_id = tag_ids[tag] = database.tag_id(tag)
+                    connection.execute(
+                        "INSERT INTO remark_tags (remark_id, position, tag_id) VALUES (?, ?, ?)",
+                        (row, position, tag_id)
+                    )
+        connection.close()
+        os.replace(temp_name, filename)
+    except BaseException:
+        connection.close()
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+    rowids = [None] * (max((remark.id for remark in remarks), default=-1) + 1)
+    for row, remark in enumerate(remarks, start=1):
+        rowids[remark.id] = row
+    return RemarkDatabase(connect(filename), filename, rowids)
+
+
+class RemarkDatabase:
+    """
+    Открытая база данных замечаний, в которую изменения записываются построчно.
+
+    Хранит соответствие идентификаторов замечаний в памяти (RemarkLibrary) идентификаторам строк в базе. При
+    сохранении в базу применяются только операции из журнала (см. OperationJournal), накопленные с прошлого
+    сохранения, - одной транзакцией, без перезаписи всей базы.
+
+    Методы:
+        open(filename):
+            Открывает базу данных, из которой только что загружены замечания.
+        apply(operations, categories):
+            Записывает в базу операции из журнала.
+        categories():
+            Возвращает категории в порядке вкладок.
+        ordered_ids():
+            Возвращает идентификаторы замечаний в порядке строк базы.
+        close():
+            Закрывает базу данных.
+    """
+    def __init__(self, connection, filename, rowids):
+        """
+        Конструктор класса RemarkDatabase.
+
+        Аргументы:
+            connection (sqlite3.Connection): Соединение с базой данных.
+            filename (str): Путь к базе данных.
+            rowids (list[int | None]): Идентификатор замечания в памяти -> идентификатор строки в базе.
+        """
+        self.connection = connection
+        self.filename = filename
+        self.rowids = rowids
+        self.removed_rowids = {}  # Удалённое замечание -> его прежняя строка (для возврата на то же место)
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Открывает базу данных, из которой только что загружены замечания (iter_database).
+
+        Замечания получили в памяти идентификаторы 0, 1, 2... в порядке идентификаторов строк в базе.
+        """
+        connection = connect(filename)
+        rowids = [rowid for rowid, in connection.execute("SELECT id FROM remarks ORDER BY id")]
+        return cls(connection, filename, rowids)
+
+    def categories(self):
+        """Возвращает названия категорий в порядке вкладок."""
+        return [name for name, in self.connection.execute("SELECT name FROM categories ORDER BY position")]
+
+    def ordered_ids(self):
+        """
+        Возвращает идентификаторы замечаний в памяти в порядке строк базы (в этом порядке их читает iter_database).
+
+        Обычно он совпадает с порядком в памяти, но возвращённое замечание, прежняя строка которого уже занята,
+        записывается в конец базы.
+        """
+        rows = sorted((rowid, remark_id) for remark_id, rowid in enumerate(self.rowids) if rowid is not None)
+        return [remark_id for _, remark_id in rows]
+
+    def apply(self, operations, categories):
+        """
+        Записывает в базу операции из журнала одной транзакцией и выставляет порядок категорий как у вкладок.
+
+        При ошибке транзакция откатывается целиком, база остаётся в прежнем состоянии.
+
+        Аргументы:
+            operations (list[dict]): Записи журнала (см. OperationJournal).
+            categories (list[str]): Категории в порядке вкладок.
+        """
+        with self.connection:
+            for record in operations:
+                self._apply(record)
+            self.set_category_order(categories)
+
+    def close(self):
+        """Закрывает базу данных."""
+        self.connection.close()
+
+    def category_id(self, name):
+        """Возвращает идентификатор категории, при необходимости добавляет её в конец списка."""
+        row = self.connection.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        position = self.connection.execute("SELECT coalesce(max(position), 0) + 1 FROM categories").fetchone()[0]
+        return self.connection.execute(
+            "INSERT INTO categories (name, position) VALUES (?, ?)", (name, position)
+        ).lastrowid
+
+    def tag_id(self, name):
+        """Возвращает идентификатор тега, при необходимости добавляет тег."""
+        row = self.connection.execute("SELECT id FROM tags WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self.connection.execute("INSERT INTO tags (name) VALUES (?)", (name,)).lastrowid
+
+    def set_category_order(self, categories):
+        """
+        Выставляет категориям позиции в порядке вкладок: недостающие категории добавляются, а категории без вкладки
+        и без замечаний удаляются.
+        """
+        for position, name in enumerate(categories, start=1):
+            category_id = self.category_id(name)
+            self.connection.execute("UPDATE categories SET position = ? WHERE id = ?", (position, category_id))
+        names = set(categories)
+        unused = [
+            (category_id,) for category_id, name in self.connection.execute(
+                "SELECT id, name FROM categories WHERE id NOT IN (SELECT DISTINCT category_id FROM remarks)"
+            ).fetchall() if name not in names
+        ]
+        self.connection.executemany("DELETE FROM categories WHERE id = ?", unused)
+
+    def _apply(self, record):
+        """Записывает в базу одну операцию из журнала."""
+        op = record["op"]
+        if op == "add":
+            self._insert(record["id"], record["text"], record["category"], record["tags"])
+        elif op == "restore":  # Возвращённые (например, отменой удаления) замечания - с прежними идентификаторами
+            for remark_id, _, text, category, tags in record["remarks"]:
+                self._insert(remark_id, text, category, tags, self.removed_rowids.pop(remark_id, None))
+        elif op == "restore_fields":
+            for remark_id, category, tags in record["remarks"]:
+                rowid = self.rowids[remark_id]
+                self.connection.execute(
+                    "UPDATE remarks SET category_id = ? WHERE id = ?", (self.category_id(category), rowid)
+                )
+                self._set_tags(rowid, tags)
+        elif op == "edit":
+            rowid = self.rowids[record["id"]]
+            self.connection.execute(
+                "UPDATE remarks SET category_id = ?, text = ? WHERE id = ?",
+                (self.category_id(record["category"]), record["text"], rowid)
+            )
+            self._set_tags(rowid, record["tags"])
+        elif op == "bulk_edit":
+            rowids = [self.rowids[remark_id] for remark_id in record["ids"]]
+            if record["category"] is not None:
+                category_id = self.category_id(record["category"])
+                self.connection.executemany(
+                    "UPDATE remarks SET category_id = ? WHERE id = ?", [(category_id, rowid) for rowid in rowids]
+                )
+            if record["add_tags"] or record["remove_tags"]:
+                for rowid in rowids:
+                    tags = [name for name, in self.connection.execute(
+                        "SELECT t.name FROM remark_tags rt JOIN tags t ON t.id = rt.tag_id "
+                        "WHERE rt.remark_id = ? ORDER BY rt.position", (rowid,)
+                    )]
+                    new_tags = edit_tags(tags, record["add_tags"], record["remove_tags"])
+                    if new_tags != tags:
+                        self._set_tags(rowid, new_tags)
+        elif op == "remove":
+            self._delete_remarks([self.rowids[remark_id] for remark_id in record["ids"]])
+            for remark_id in record["ids"]:
+                self.removed_rowids[remark_id] = self.rowids[remark_id]
+                self.rowids[remark_id] = None
+        elif op == "clear" and record.get("category") is None:
+            self.connection.execute("DELETE FROM remark_tags")
+            self.connection.execute("DELETE FROM remarks")
+            self.rowids = []  # Модель начала новую библиотеку: идентификаторы снова считаются с нуля
+            self.removed_rowids = {}
+        elif op in ("clear", "remove_tab"):
+            name = record["category"] if op == "clear" else record["name"]
+            rowids = [rowid for rowid, in self.connection.execute(
+                "SELECT r.id FROM remarks r JOIN categories c ON c.id = r.category_id WHERE c.name = ?", (name,)
+            )]
+            self._delete_remarks(rowids)
+            removed = set(rowids)
+            for remark_id, rowid in enumerate(self.rowids):
+                if rowid in removed:
+                    self.removed_rowids[remark_id] = rowid
+                    self.rowids[remark_id] = None
+            if op == "remove_tab":
+                self.connection.execute("DELETE FROM categories WHERE name = ?", (name,))
+        elif op == "add_tab":
+            self.category_id(record["name"])  # Позицию выставит set_category_order
+        elif op == "rename_tab":
+            self.connection.execute(
+                "UPDATE categories SET name = ? WHERE name = ?", (record["new_name"], record["old_name"])
+            )
+        # Перемещения вкладок (move_tab) отдельно не записываются: порядок выставляет set_category_order
+
+    def _insert(self, remark_id, text, category, tags, rowid=None):
+        """
+        Добавляет в базу замечание с идентификатором remark_id.
+
+        Если задана прежняя строка замечания (rowid) и она свободна, замечание записывается в неё, чтобы порядок
+        строк в базе совпадал с порядком в памяти. Иначе замечание получает новую строку в конце базы.
+        """
+        if rowid is not None and self.connection.execute("SELECT 1 FROM remarks WHERE id = ?", (rowid,)).fetchone():
+            rowid = None  # Строку уже заняло добавленное позже замечание
+        rowid = self.connection.execute(
+            "INSERT INTO remarks (id, category_id, text) VALUES (?, ?, ?)", (rowid, self.category_id(category), text)
+        ).lastrowid
+        self._set_tags(rowid, tags)
+        if remark_id >= len(self.rowids):  # Идентификатор больше всех известных - расширяем список
+            self.rowids.extend([None] * (remark_id + 1 - len(self.rowids)))
+        self.rowids[remark_id] = rowid
+
+    def _set_tags(self, rowid, tags):
+        """Заменяет теги замечания rowid."""
+        self.connection.execute("DELETE FROM remark_tags WHERE remark_id = ?", (rowid,))
+        self.connection.executemany(
+            "INSERT INTO remark_tags (remark_id, position, tag_id) VALUES (?, ?, ?)",
+            [(rowid, position, self.tag_id(tag)) for position, tag in enumerate(tags)]
+        )
+
+    def _delete_remarks(self, rowids):
+        """Удаляет замечания rowids вместе с их тегами."""
+        params = [(rowid,) for rowid in rowids]
+        self.connection.executemany("DELETE FROM remark_tags WHERE remark_id = ?", params)
+        self.connection.executemany("DELETE FROM remarks WHERE id = ?", params)
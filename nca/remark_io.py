@@ -0,0 +1,365 @@
+import codecs
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from nca.remark_db import is_database, iter_database
+from nca.remark_library import Remark, RemarkLibrary
+
+
+READ_SIZE = 64 * 1024  # Размер блока, которым читается файл (байт)
+CHUNK_SIZE = 1000  # Количество замечаний в первой порции, передаваемой в модель при потоковой загрузке
+MAX_CHUNK_SIZE = 32000  # Наибольшая порция: следующие порции удваиваются до этого размера
+WRITE_BLOCK = 1000  # Количество замечаний в одном блоке при записи файла
+WHITESPACE_RE = re.compile(r"\s*")  # Пробельные символы между элементами JSON
+NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]*\Z")  # Остаток буфера, который может продолжать разобранное число
+
+
+class LoadCancelled(Exception):
+    """Загрузка файла прервана пользователем (выбрасывается из функции progress)."""
+
+
+class JsonArrayStream:
+    """
+    Потоковый разбор JSON-массива: читает файл блоками по READ_SIZE байт и отдаёт элементы массива по одному.
+
+    В памяти одновременно находятся только текущий блок файла и разбираемый элемент, а не весь документ.
+
+    Методы:
+        __iter__():
+            Возвращает элементы массива по одному.
+    """
+    def __init__(self, file, progress=None):
+        """
+        Конструктор класса JsonArrayStream.
+
+        Аргументы:
+            file (BinaryIO): Файл, открытый в двоичном режиме.
+            progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных байт.
+        """
+        self.file = file
+        self.size = max(os.fstat(file.fileno()).st_size, 1)  # Размер файла (для прогресса)
+        self.progress = progress
+        self.decoder = json.JSONDecoder()  # Разбирает по одному элементу с заданной позиции
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()  # Не ломает символы на границах блоков
+        self.buffer = ""  # Прочитанный, но ещё не разобранный текст
+        self.pos = 0  # Позиция разбора в буфере
+        self.offset = 0  # Сколько символов файла отброшено из начала буфера (для сообщений об ошибках)
+        self.bytes_read = 0  # Сколько байт файла уже прочитано
+        self.eof = False  # Файл прочитан до конца
+
+    def __iter__(self):
+        """Возвращает элементы JSON-массива по одному."""
+        if self._peek() != "[":
+            raise ValueError("Файл должен содержать JSON-массив замечаний.")
+        self.pos += 1
+        if self._peek() == "]":  # Пустой массив
+            self.pos += 1
+        else:
+            while True:
+                yield self._decode_item()
+                char = self._peek()
+                if char == "]":
+                    self.pos += 1
+                    break
+                if char != ",":
+                    raise ValueError(f"Ошибка в JSON: ожидалась запятая или \"]\" (символ {self.offset + self.pos}).")
+                self.pos += 1
+        if self._peek():
+            raise ValueError("Ошибка в JSON: лишние данные после массива замечаний.")
+
+    def _fill(self):
+        """Дочитывает в буфер следующий блок файла. Возвращает False, если файл уже закончился."""
+        if self.eof:
+            return False
+        data = self.file.read(READ_SIZE)
+        self.eof = not data
+        self.bytes_read += len(data)
+        # Разобранную часть буфера отбрасываем, чтобы он не рос вместе с файлом
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(data, final=self.eof)
+        self.pos = 0
+        if self.progress:
+            self.progress(self.bytes_read / self.size)
+        return not self.eof
+
+    def _peek(self):
+        """Пропускает пробельные символы и возвращает следующий символ (пустую строку в конце файла)."""
+        while True:
+            self.pos = WHITESPACE_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _decode_item(self):
+        """Разбирает очередной элемент массива, при необходимости дочитывая файл."""
+        while True:
+            self._peek()
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                error = f"Ошибка в JSON: {e.msg} (символ {self.offset + e.pos})."  # До того, как буфер сдвинется
+                if self._fill():
+                    continue  # Элемент не поместился в буфер - дочитываем и пробуем снова
+                raise ValueError(error) from None
+            if NUMBER_TAIL_RE.match(self.buffer, end) and self._fill():
+                continue  # До конца буфера может идти продолжение числа (например, "15" из "15.5") - дочитываем
+            self.pos = end
+            return item
+
+
+def iter_txt(filename, progress=None):
+    """
+    Читает замечания из .txt-файла по одному: каждая непустая строка - отдельное замечание без категории и тегов.
+
+    Аргументы:
+        filename (str): Путь к файлу.
+        progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных байт.
+
+    Возвращает:
+        Iterator[Remark]: Прочитанные замечания.
+    """
+    with open(filename, "rb") as file:
+        yield from read_txt(file, progress)
+
+
+def read_txt(file, progress=None):
+    """Читает замечания в формате .txt из открытого в двоичном режиме файла или потока (например, stdin)."""
+    size = max(os.fstat(file.fileno()).st_size, 1)
+    bytes_read = 0
+    for i, line in enumerate(file):
+        bytes_read += len(line)
+        if progress and i % CHUNK_SIZE == 0:
+            progress(bytes_read / size)
+        # splitlines() разделяет строку так же, как раньше разделялся весь файл (в том числе по "\r")
+        for text in line.decode("utf-8").splitlines():
+            if text.strip():  # Не добавляем пустые замечания
+                yield Remark(text)  # Категория для .txt всегда "Без категории", теги - пустой список
+
+
+def iter_json(filename, progress=None):
+    """
+    Читает замечания из .json-файла вида [{"category": ..., "text": ..., "tags": [...]}, ...] по одному.
+
+    Файл разбирается потоково (см. JsonArrayStream), поэтому список словарей целиком в памяти не создаётся.
+    Замечания с пустым текстом пропускаются, отсутствующая категория считается "Без категории", отсутствующие
+    теги - пустым списком.
+
+    Аргументы:
+        filename (str): Путь к файлу.
+        progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных байт.
+
+    Возвращает:
+        Iterator[Remark]: Прочитанные замечания.
+    """
+    with open(filename, "rb") as file:
+        yield from read_json(file, progress)
+
+
+def read_json(file, progress=None):
+    """Читает замечания в формате .json из открытого в двоичном режиме файла или потока (например, stdin)."""
+    for item in JsonArrayStream(file, progress):
+        category = item.get('category', "Без категории")  # Получаем категорию
+        text = item.get('text', "").strip()  # Получаем текст
+        tags = item.get('tags', [])  # Получаем теги
+        if not text:
+            continue  # Не добавляем пустые замечания
+        yield Remark(text, category, tags)
+
+
+def iter_remarks(filename, progress=None):
+    """Читает замечания из файла .txt, .json или базы данных по одному (формат определяется по расширению)."""
+    if filename.endswith(".txt"):
+        return iter_txt(filename, progress)
+    if filename.endswith(".json"):
+        return iter_json(filename, progress)
+    if is_database(filename):
+        return iter_database(filename, progress)
+    raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+
+
+def iter_chunks(remarks, size=CHUNK_SIZE, max_size=MAX_CHUNK_SIZE):
+    """
+    Группирует поток замечаний в списки: первый из size замечаний, каждый следующий вдвое больше, но не больше
+    max_size.
+
+    Первая порция маленькая, чтобы замечания появились в окне сразу. Дальше порции растут: каждая вставка строк
+    заставляет прокси-модели вкладок перестраивать отображение, и при постоянном размере порции суммарная работа
+    росла бы квадратично с размером файла.
+    """
+    chunk = []
+    for remark in remarks:
+        chunk.append(remark)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+            size = min(size * 2, max_size)
+    if chunk:
+        yield chunk
+
+
+def load_library(filename, progress=None):
+    """
+    Загружает файл замечаний (.txt, .json или базу данных) целиком и строит по нему библиотеку с индексами.
+
+    Аргументы:
+        filename (str): Путь к файлу.
+        progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанного файла.
+
+    Возвращает:
+        RemarkLibrary: Библиотека замечаний из файла.
+    """
+    return RemarkLibrary(iter_remarks(filename, progress))
+
+
+def txt_chunks(remarks):
+    """Возвращает содержимое .txt-файла блоками: тексты замечаний, каждое с новой строки (категории и теги теряются)."""
+    block = []
+    for remark in remarks:
+        block.append(remark.text + "\n")
+        if len(block) == WRITE_BLOCK:
+            yield "".join(block)
+            block = []
+    if block:
+        yield "".join(block)
+
+
+def group_by_category(remarks, categories):
+    """
+    Раскладывает замечания по категориям за один проход (в списках - ссылки на замечания, а не их копии).
+
+    Возвращает:
+        list[tuple[str, list[Remark]]]: Пары "категория - её замечания" в порядке categories. Замечания категорий,
+            которых нет в categories, не попадают в результат. В таком порядке замечания записываются в .json-файл.
+    """
+    remarks_by_category = {category: [] for category in categories}
+    for remark in remarks:
+        category_remarks = remarks_by_category.get(remark.category)
+        if category_remarks is not None:
+            category_remarks.append(remark)
+    return list(remarks_by_category.items())
+
+
+def json_chunks(remarks, categories):
+    """
+    Возвращает содержимое .json-файла блоками: замечания, сгруппированные по категориям в порядке categories.
+
+    Каждое замечание сериализуется отдельно, поэтому список словарей для всего файла не создаётся. Результат
+    побайтно совпадает с json.dump(data, file, ensure_ascii=False, indent=4).
+
+    Аргументы:
+        remarks (Iterable[Remark]): Замечания в порядке следования.
+        categories (list[str]): Категории в порядке вкладок. Замечания других категорий не записываются.
+
+    Возвращает:
+        Iterator[str]: Части содержимого файла.
+    """
+    block = []
+    separator = "[\n    "  # Перед первым элементом - открывающая скобка, перед остальными - запятая
+    for category, category_remarks in group_by_category(remarks, categories):
+        for remark in category_remarks:
+            item = {"category": category, "text": remark.text, "tags": remark.tags}
+            # Строки JSON не содержат переводов строк, поэтому отступ элемента внутри массива - это замена "\n"
+            block.append(separator + json.dumps(item, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+            separator = ",\n    "
+            if len(block) == WRITE_BLOCK:
+                yield "".join(block)
+                block = []
+    block.append("[]" if separator.startswith("[") else "\n]")
+    yield "".join(block)
+
+
+def write_file(filename, chunks, backups=0):
+    """
+    Атомарно записывает содержимое в файл и возвращает контрольную сумму записанных байт (SHA-256).
+
+    Данные пишутся во временный файл в той же папке, сбрасываются на диск (fsync) и только затем подменяют
+    исходный файл через os.replace. При сбое или нехватке места прежний файл остаётся нетронутым.
+
+    Аргументы:
+        filename (str): Путь к файлу.
+        chunks (Iterable[str | bytes]): Части содержимого файла (см. txt_chunks, json_chunks).
+        backups (int, optional): Сколько предыдущих версий файла хранить рядом (.bak, .bak2, ...). По умолчанию 0.
+
+    Возвращает:
+        str: Контрольная сумма записанных байт.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    descriptor, temp_name = tempfile.mkstemp(prefix=f".{os.path.basename(filename)}.", suffix=".tmp", dir=directory)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            for chunk in chunks:
+                data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk  # Текст пишется в UTF-8
+                digest.update(data)
+                file.write(data)
+            file.flush()
+            os.fsync(file.fileno())  # Данные на диске до того, как файл подменит исходный
+        copy_permissions(filename, temp_name)
+        if backups > 0:
+            rotate_backups(filename, backups)
+        os.replace(temp_name, filename)  # Атомарная подмена файла
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_name)
+        raise
+    sync_directory(directory)
+    return digest.hexdigest()
+
+
+def copy_permissions(filename, temp_name):
+    """Даёт временному файлу права исходного файла (или обычные права нового файла, если исходного нет)."""
+    if os.path.exists(filename):
+        shutil.copymode(filename, temp_name)
+    else:
+        umask = os.umask(0)  # Узнать umask можно, только установив новый
+        os.umask(umask)
+        os.chmod(temp_name, 0o666 & ~umask)  # mkstemp создаёт файл с правами 0600
+
+
+def backup_name(filename, generation):
+    """Возвращает имя резервной копии файла: .bak для последней версии, .bak2, .bak3... для более старых."""
+    return f"{filename}.bak" if generation == 1 else f"{filename}.bak{generation}"
+
+
+def rotate_backups(filename, generations):
+    """Сдвигает резервные копии файла на одно поколение и делает текущую версию файла последней копией."""
+    if not os.path.exists(filename):
+        return
+    for generation in range(generations, 1, -1):  # Самая старая копия перезаписывается предыдущей
+        previous = backup_name(filename, generation - 1)
+        if os.path.exists(previous):
+            os.replace(previous, backup_name(filename, generation))
+    newest = backup_name(filename, 1)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(newest)
+    try:
+        os.link(filename, newest)  # Жёсткая ссылка: после подмены файла она указывает на прежнюю версию
+    except OSError:
+        shutil.copy2(filename, newest)  # Файловая система не поддерживает ссылки - копируем
+
+
+def sync_directory(directory):
+    """Сбрасывает на диск запись о подмене файла в папке (там, где ОС это поддерживает)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # Windows: папку открыть нельзя, os.replace там и так надёжен
+    with contextlib.suppress(OSError):
+        descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def file_checksum(filename):
+    """Читает файл блоками и возвращает контрольную сумму его содержимого (SHA-256)."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,428 @@
+from nca.search_index import SearchIndex
+from nca.tag_index import TagCounts, TagIndex, ids_to_mask
+
+
+PROGRESS_STEP = 1000  # Через сколько замечаний сообщать о прогрессе построения индексов
+
+
+def edit_tags(tags, add_tags=(), remove_tags=()):
+    """
+    Возвращает новый список тегов замечания при групповом редактировании: без тегов remove_tags и с тегами add_tags,
+    которых у замечания ещё не было, дописанными в конец. Порядок остальных тегов сохраняется.
+    """
+    remove_tags = set(remove_tags)
+    new_tags = [tag for tag in tags if tag not in remove_tags]
+    present = set(new_tags)
+    for tag in add_tags:
+        if tag not in present:
+            present.add(tag)
+            new_tags.append(tag)
+    return new_tags
+
+
+class Category:
+    """
+    Категория замечаний библиотеки. Все замечания категории ссылаются на один объект Category, поэтому
+    переименование категории меняет одно поле, сколько бы замечаний в ней ни было.
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        """
+        Конструктор класса Category.
+
+        Аргументы:
+            name (str): Название категории.
+        """
+        self.name = name
+
+
+class Remark:
+    """
+    Замечание: идентификатор, текст, категория и список тегов.
+
+    Каждое замечание хранится в единственном экземпляре в RemarkLibrary. Вкладки не копируют замечания,
+    а отображают их через прокси-модели. Идентификатор назначает библиотека при добавлении замечания, он не меняется
+    при редактировании и позволяет различать замечания с одинаковым текстом. Категория читается и задаётся
+    по названию, а библиотека заменяет его ссылкой на общий объект категории (см. Category).
+    """
+    __slots__ = ("id", "text", "_category", "tags")  # Без __dict__, чтобы большие библиотеки занимали меньше памяти
+    lazy_text = False  # Текст читается при первом обращении (см. remark_snapshot.SnapshotRemark)
+
+    def __init__(self, text, category="Без категории", tags=None):
+        """
+        Конструктор класса Remark.
+
+        Аргументы:
+            text (str): Текст замечания.
+            category (str, optional): Название категории. По умолчанию "Без категории".
+            tags (list[str], optional): Список тегов. По умолчанию None (пустой список).
+        """
+        self.id = None  # Идентификатор назначит библиотека
+        self.text = text
+        self.category = category
+        self.tags = tags if tags is not None else []
+
+    @property
+    def category(self):
+        """Название категории замечания."""
+        category = self._category
+        return category if category.__class__ is str else category.name
+
+    @category.setter
+    def category(self, value):
+        """Задаёт категорию: название (str) или объект категории библиотеки (Category)."""
+        self._category = value
+
+
+class RemarkLibrary:
+    """
+    Библиотека замечаний: список замечаний (по одному элементу на замечание) и индексы над ним.
+
+    Не зависит от Qt, поэтому может быть целиком построена в фоновом потоке и затем одним действием подставлена
+    в RemarkModel. Поддерживает индексы "идентификатор -> номер строки" и "категория -> идентификаторы замечаний",
+    поисковый индекс (search_index), индекс тегов (tag_index) и счётчики тегов по категориям (tag_counts).
+    Замечания одной категории ссылаются на общий объект Category, поэтому категория переименовывается за O(1).
+
+    Методы:
+        get(remark_id):
+            Возвращает замечание по идентификатору.
+        row_of(remark_id):
+            Возвращает номер строки замечания по идентификатору.
+        rows_of(remark_ids):
+            Возвращает отсортированные номера строк замечаний.
+        category_ids(name):
+            Возвращает идентификаторы замечаний категории.
+        append(remark):
+            Добавляет замечание в конец библиотеки.
+        extend(remarks):
+            Добавляет группу замечаний в конец библиотеки.
+        update(remark_id, text, category, tags):
+            Изменяет данные замечания.
+        bulk_update(remark_ids, category=None, add_tags=(), remove_tags=()):
+            Переносит группу замечаний в категорию и добавляет или убирает у них теги.
+        remove(remark_ids, compact=True):
+            Удаляет замечания с указанными идентификаторами.
+        restore(items, reindex=True):
+            Возвращает удалённые замечания на прежние места с прежними идентификаторами.
+        compact():
+            Убирает из списка строки удалённых замечаний.
+        remove_rows(first, last):
+            Удаляет замечания из диапазона строк (без пересчёта номеров строк).
+        reindex_rows(first_row):
+            Пересчитывает номера строк начиная с first_row.
+        rename_category(old_name, new_name):
+            Переименовывает категорию у всех её замечаний.
+        filter_mask(query, tags, tag_filter_mode):
+            Возвращает битовую маску замечаний, подходящих под поисковый запрос и теги.
+    """
+    def __init__(self, remarks=(), categories=None, progress=None):
+        """
+        Конструктор класса RemarkLibrary. Назначает замечаниям идентификаторы 0, 1, 2... и строит индексы.
+
+        Аргументы:
+            remarks (Iterable[Remark], optional): Замечания в порядке следования.
+            categories (list[str], optional): Категории в порядке вкладок. По умолчанию - в порядке первого
+                появления среди замечаний.
+            progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) построенных индексов.
+        """
+        self.remarks = list(remarks)  # Список замечаний (list[Remark]), номер строки = индекс в списке
+        if categories is None:
+            categories = dict.fromkeys(remark.category for remark in self.remarks)
+        self.categories = list(categories)  # Категории в порядке вкладок
+        self._next_id = 0  # Идентификатор, который получит следующее добавленное замечание
+        self._first_hole = None  # Первая строка удалённого, но ещё не убранного из списка замечания (см. remove)
+        self._rows_by_id = {}  # Индекс "идентификатор -> номер строки"
+        self._ids_by_category = {}  # Индекс "категория -> множество идентификаторов её замечаний"
+        self._category_objects = {}  # Название категории -> общий объект Category её замечаний
+        self.search_index = SearchIndex()  # Полнотекстовый индекс замечаний
+        self.tag_index = TagIndex()  # Индекс тегов на битовых масках
+        self.tag_counts = TagCounts()  # Количество замечаний с каждым тегом по категориям
+        for row, remark in enumerate(self.remarks):
+            self._register(remark)
+            self._rows_by_id[remark.id] = row
+            if progress and row % PROGRESS_STEP == 0:
+                progress(row / len(self.remarks))
+        self.tag_index.build(self.remarks)  # Маски тегов строим разом для всех замечаний
+
+    def __len__(self):
+        """Возвращает количество замечаний."""
+        return len(self.remarks)
+
+    def get(self, remark_id):
+        """Возвращает замечание с идентификатором remark_id."""
+        return self.remarks[self._rows_by_id[remark_id]]
+
+    def row_of(self, remark_id):
+        """Возвращает номер строки замечания с идентификатором remark_id."""
+        return self._rows_by_id[remark_id]
+
+    def rows_of(self, remark_ids, skip_missing=False):
+        """
+        Возвращает отсортированный по возрастанию список номеров строк замечаний remark_ids.
+
+        Если skip_missing, идентификаторы удалённых замечаний пропускаются (например, из маски, построенной до
+        удаления), иначе для них возникает KeyError.
+        """
+        rows_by_id = self._rows_by_id
+        if skip_missing:
+            return sorted(rows_by_id[remark_id] for remark_id in remark_ids if remark_id in rows_by_id)
+        return sorted(rows_by_id[remark_id] for remark_id in remark_ids)
+
+    def category_ids(self, name):
+        """Возвращает множество идентификаторов замечаний категории name."""
+        return self._ids_by_category.get(name, set())
+
+    def append(self, remark):
+        """Добавляет замечание в конец библиотеки, назначает ему идентификатор и возвращает номер его строки."""
+        row = len(self.remarks)
+        self.remarks.append(remark)
+        self._register(remark)
+        self._rows_by_id[remark.id] = row
+        self.tag_index.add(remark.id, remark.tags)
+        return row
+
+    def extend(self, remarks):
+        """
+        Добавляет группу замечаний в конец библиотеки (например, очередную порцию при потоковой загрузке).
+
+        Новые категории дописываются в конец списка categories в порядке первого появления.
+
+        Возвращает:
+            tuple[int, int]: Номера первой и последней добавленных строк (last < first, если группа пуста).
+        """
+        first = len(self.remarks)
+        known = set(self.categories)
+        for remark in remarks:
+            if remark.category not in known:
+                known.add(remark.category)
+                self.categories.append(remark.category)
+            self._register(remark)
+            self._rows_by_id[remark.id] = len(self.remarks)
+            self.remarks.append(remark)
+        self.tag_index.extend(self.remarks[first:])  # Маски тегов обновляем разом для всей группы
+        return first, len(self.remarks) - 1
+
+    def update(self, remark_id, text, category, tags):
+        """Изменяет текст, категорию и теги замечания remark_id и возвращает номер его строки."""
+        row = self._rows_by_id[remark_id]
+        remark = self.remarks[row]
+        if category != remark.category:  # Переносим замечание в индексе категорий
+            self._ids_by_category[remark.category].discard(remark_id)
+            self._ids_by_category.setdefault(category, set()).add(remark_id)
+        self.search_index.update(remark_id, text)
+        self.tag_index.update(remark_id, remark.tags, tags)
+        self.tag_counts.remove(remark.category, remark.tags)
+        self.tag_counts.add(category, tags)
+        remark.text = text
+        remark.category = self._category_object(category)
+        remark.tags = tags
+        return row
+
+    def bulk_update(self, remark_ids, category=None, add_tags=(), remove_tags=()):
+        """
+        Групповое редактирование: переносит замечания remark_ids в категорию category (None - не переносить),
+        добавляет им теги add_tags и убирает теги remove_tags (см. edit_tags). Тексты не меняются, поэтому поисковый
+        индекс не затрагивается, а маски тегов обновляются один раз на тег, а не на каждое замечание.
+
+        Возвращает:
+            list[int]: Отсортированные номера строк замечаний, которые действительно изменились.
+        """
+        rows = []
+        added, removed = {}, {}  # Тег -> идентификаторы замечаний, у которых он появился (исчез)
+        category_object = None if category is None else self._category_object(category)
+        for remark_id in remark_ids:
+            row = self._rows_by_id[remark_id]
+            remark = self.remarks[row]
+            new_category = remark.category if category is None else category
+            new_tags = edit_tags(remark.tags, add_tags, remove_tags)
+            if new_category == remark.category and new_tags == remark.tags:
+                continue  # Замечание уже в нужной категории и с нужными тегами
+            if new_category != remark.category:
+                self._ids_by_category[remark.category].discard(remark_id)
+                self._ids_by_category.setdefault(new_category, set()).add(remark_id)
+            old_set, new_set = set(remark.tags), set(new_tags)
+            for tag in old_set - new_set:
+                removed.setdefault(tag, []).append(remark_id)
+            for tag in new_set - old_set:
+                added.setdefault(tag, []).append(remark_id)
+            self.tag_counts.remove(remark.category, remark.tags)
+            self.tag_counts.add(new_category, new_tags)
+            if category_object is not None:
+                remark.category = category_object
+            remark.tags = new_tags
+            rows.append(row)
+        self.tag_index.update_many(added, removed)
+        rows.sort()
+        return rows
+
+    def remove(self, remark_ids, compact=True):
+        """
+        Удаляет замечания remark_ids за один проход по списку.
+
+        Если compact=False, замечания сразу убираются из индексов, а на их месте в списке остаются None, которые
+        убирает compact(). Так группа удалений подряд (например, при применении журнала) сдвигает список и
+        пересчитывает номера строк один раз, а не при каждом удалении. До compact() номера строк остальных замечаний
+        не меняются, но список нельзя показывать в модели.
+        """
+        rows = self.rows_of(set(remark_ids))
+        if not rows:
+            return
+        self._unregister(rows)
+        for row in rows:
+            self.remarks[row] = None
+        self._first_hole = rows[0] if self._first_hole is None else min(self._first_hole, rows[0])
+        if compact:
+            self.compact()
+
+    def restore(self, items, reindex=True):
+        """
+        Возвращает удалённые замечания на прежние места (например, при отмене удаления) одним проходом по списку.
+
+        Замечания сохраняют свои идентификаторы (идентификаторы не используются повторно, поэтому они свободны),
+        замечания без идентификатора получают новый. Тексты попадают в поисковый индекс отложенно (см.
+        SearchIndex.defer): возврат тысяч замечаний не ждёт разбора их текстов.
+
+        Аргументы:
+            items (list[tuple[int, Remark]]): Пары (номер строки, замечание), отсортированные по номеру строки.
+                Номер строки - место замечания после возврата всей группы; если строк меньше, замечание
+                дописывается в конец.
+            reindex (bool, optional): Пересчитать номера строк. При возврате нескольких групп подряд
+                reindex_rows можно вызвать один раз в конце. По умолчанию True.
+
+        Возвращает:
+            list[int]: Номера строк, которые заняли возвращённые замечания.
+        """
+        if not items:
+            return []
+        self.compact()  # Номера строк относятся к списку без удалённых замечаний
+        for _, remark in items:
+            if remark.id is None:
+                remark.id = self._next_id
+            elif remark.id in self._rows_by_id:
+                raise ValueError(f"замечание {remark.id} уже есть в библиотеке.")
+            self._next_id = max(self._next_id, remark.id + 1)
+        first = min(items[0][0], len(self.remarks))
+        tail = iter(self.remarks[first:])
+        merged = []  # Новый список начиная со строки first
+        rows = []
+        for row, remark in items:
+            while first + len(merged) < row:  # Сначала - прежние замечания, стоявшие перед этим
+                previous = next(tail, None)
+                if previous is None:
+                    break
+                merged.append(previous)
+            rows.append(first + len(merged))
+            merged.append(remark)
+        merged.extend(tail)
+        self.remarks[first:] = merged
+        known = set(self.categories)
+        for _, remark in items:
+            if remark.category not in known:
+                known.add(remark.category)
+                self.categories.append(remark.category)
+            self._register(remark, new_id=False)
+        self.tag_index.extend([remark for _, remark in items])
+        if reindex:
+            self.reindex_rows(first)
+        return rows
+
+    def compact(self):
+        """Убирает из списка строки удалённых замечаний (см. remove) и пересчитывает номера строк после них."""
+        first = self._first_hole
+        if first is None:
+            return
+        self._first_hole = None
+        self.remarks[first:] = [remark for remark in self.remarks[first:] if remark is not None]
+        self.reindex_rows(first)  # Номера строк сдвинулись только начиная с первой удалённой
+
+    def remove_rows(self, first, last):
+        """
+        Удаляет замечания из строк с first по last включительно.
+
+        Номера строк в индексе не пересчитываются: при удалении нескольких диапазонов подряд reindex_rows
+        вызывается один раз в конце.
+        """
+        self._unregister(range(first, last + 1))
+        del self.remarks[first:last + 1]
+
+    def reindex_rows(self, first_row):
+        """Пересчитывает индекс "идентификатор -> номер строки" начиная со строки first_row."""
+        for row in range(first_row, len(self.remarks)):
+            self._rows_by_id[self.remarks[row].id] = row
+
+    def rename_category(self, old_name, new_name):
+        """
+        Переименовывает категорию old_name в new_name у всех её замечаний.
+
+        Замечания ссылаются на общий объект категории, поэтому меняется только его название, а сами замечания
+        не перебираются. Перебор нужен, лишь если категория new_name уже есть и в ней есть замечания (категории
+        сливаются), но и тогда название категории у замечаний после переименования то же самое.
+        """
+        remark_ids = self._ids_by_category.pop(old_name, set())
+        category = self._category_objects.pop(old_name, None)
+        if self._ids_by_category.get(new_name):  # Сливаем с существующей категорией
+            target = self._category_objects[new_name]
+            for remark_id in remark_ids:
+                self.remarks[self._rows_by_id[remark_id]].category = target
+            self._ids_by_category[new_name] |= remark_ids
+        else:
+            self._ids_by_category[new_name] = remark_ids
+            if category is not None:
+                category.name = new_name
+                self._category_objects[new_name] = category
+        self.tag_counts.rename_category(old_name, new_name)
+
+    def filter_mask(self, query, tags, tag_filter_mode):
+        """
+        Возвращает битовую маску замечаний, подходящих под поисковый запрос и выбранные теги.
+
+        Результат поиска и маска тегов объединяются одной операцией над целыми числами.
+
+        Аргументы:
+            query (str): Поисковый запрос (пустая строка - без поиска).
+            tags (Iterable[str]): Выбранные теги.
+            tag_filter_mode (str): Режим фильтрации по тегам: "AND" или "OR".
+
+        Возвращает:
+            int | None: Маска подходящих замечаний или None, если фильтры не заданы.
+        """
+        mask = self.tag_index.mask(tags, tag_filter_mode)
+        if query:
+            search_mask = ids_to_mask(self.search_index.search(query))
+            mask = search_mask if mask is None else mask & search_mask
+        return mask
+
+    def _register(self, remark, new_id=True):
+        """
+        Назначает замечанию новый идентификатор (если new_id) и добавляет его в индекс категорий, в поисковый индекс
+        и в счётчики тегов (в маски тегов замечание добавляют вызывающие методы). Замечание с прежним
+        идентификатором (см. restore) попадает в поисковый индекс отложенно.
+        """
+        if new_id:
+            remark.id = self._next_id
+            self._next_id += 1
+        remark.category = self._category_object(remark.category)
+        self._ids_by_category.setdefault(remark.category, set()).add(remark.id)
+        self.tag_counts.add(remark.category, remark.tags)
+        if remark.lazy_text or not new_id:
+            self.search_index.defer(remark.id, remark)  # Текст прочитаем при первом поиске, а не при загрузке
+        else:
+            self.search_index.add(remark.id, remark.text)
+
+    def _category_object(self, name):
+        """Возвращает общий объект категории name, при необходимости создаёт его."""
+        category = self._category_objects.get(name)
+        if category is None:
+            category = self._category_objects[name] = Category(name)
+        return category
+
+    def _unregister(self, rows):
+        """Убирает замечания из строк rows из индексов (сами строки остаются в списке)."""
+        for row in rows:
+            remark = self.remarks[row]
+            del self._rows_by_id[remark.id]
+            self._ids_by_category.get(remark.category, set()).discard(remark.id)
+            self.search_index.remove(remark.id)
+            self.tag_index.remove(remark.id, remark.tags)
+            self.tag_counts.remove(remark.category, remark.tags)
@@ -0,0 +1,268 @@
+import array
+import mmap
+import os
+import struct
+import sys
+
+from nca.remark_io import CHUNK_SIZE, file_checksum, group_by_category, write_file
+from nca.remark_library import Remark
+
+
+SNAPSHOT_SUFFIX = ".snapshot"  # Снимок лежит рядом с исходным файлом: <файл>.snapshot
+SNAPSHOT_MAGIC = b"NCASNAP1"  # Сигнатура и версия формата снимка
+BYTE_ORDER = 0 if sys.byteorder == "little" else 1  # Порядок байт, в котором записаны таблицы снимка
+# Заголовок: сигнатура, порядок байт, количество замечаний, количество строк в таблице строк, количество ссылок
+# на теги, размер таблицы строк в байтах, размер и время изменения исходного файла, его контрольная сумма (SHA-256)
+HEADER = struct.Struct("<8sB3xIIIQQq32s")
+_REMARK_TEXT = Remark.text  # Слот text базового класса, в котором SnapshotRemark хранит прочитанный текст
+
+
+def snapshot_path(filename):
+    """Возвращает путь к снимку файла filename."""
+    return filename + SNAPSHOT_SUFFIX
+
+
+def supports_snapshot(filename):
+    """Возвращает True, если для файла filename ведётся снимок (снимки строятся только для .json-файлов)."""
+    return filename is not None and filename.endswith(".json")
+
+
+def align(position):
+    """Выравнивает позицию в файле снимка по границе 8 байт (таблицы чисел начинаются с выровненных позиций)."""
+    return (position + 7) & ~7
+
+
+class SnapshotRemark(Remark):
+    """
+    Замечание из снимка: текст не декодируется при загрузке, а читается из отображённого в память снимка
+    при первом обращении (например, когда строка впервые отрисовывается в списке) и затем хранится как обычно.
+    """
+    __slots__ = ("_snapshot", "_index")
+    lazy_text = True  # Текст ещё не прочитан: поисковый индекс не должен читать его при загрузке
+
+    def __init__(self, snapshot, index, category, tags):
+        """
+        Конструктор класса SnapshotRemark.
+
+        Аргументы:
+            snapshot (Snapshot): Снимок, из которого читается текст.
+            index (int): Номер замечания в снимке.
+            category (str): Название категории.
+            tags (list[str]): Список тегов.
+        """
+        self._snapshot = snapshot
+        self._index = index
+        super().__init__(None, category, tags)  # None в слоте text - текст ещё не прочитан
+
+    @property
+    def text(self):
+        """Текст замечания (при первом обращении декодируется из снимка)."""
+        text = _REMARK_TEXT.__get__(self)
+        if text is None:
+            text = self._snapshot.text(self._index)
+            _REMARK_TEXT.__set__(self, text)
+        return text
+
+    @text.setter
+    def text(self, value):
+        """Задаёт текст замечания (после редактирования снимок для этого замечания больше не нужен)."""
+        _REMARK_TEXT.__set__(self, value)
+
+
+class Snapshot:
+    """
+    Снимок файла замечаний: компактная двоичная копия, которая отображается в память и читается без разбора JSON.
+
+    Снимок состоит из заголовка (см. HEADER) и таблиц: таблица строк (все различные категории и теги, каждая строка
+    хранится один раз), номера категорий замечаний, ссылки на теги замечаний, смещения текстов и сами тексты в UTF-8.
+    Заголовок содержит размер, время изменения и контрольную сумму исходного файла, по которым проверяется,
+    что снимок соответствует текущей версии файла.
+
+    Методы:
+        open(filename):
+            Открывает снимок файла, если он соответствует файлу.
+        remarks(progress=None):
+            Возвращает замечания снимка по одному.
+        text(index):
+            Возвращает текст замечания по номеру.
+    """
+    def __init__(self, file, header):
+        """
+        Конструктор класса Snapshot. Отображает открытый файл снимка в память.
+
+        Аргументы:
+            file (BinaryIO): Файл снимка, открытый в двоичном режиме.
+            header (tuple): Поля заголовка (см. HEADER).
+        """
+        _, _, self.count, string_count, tag_ref_count, strings_size, _, _, _ = header
+        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)  # Файл остаётся открытым только в mmap
+        view = memoryview(self._map)
+        position = HEADER.size
+        string_offsets = view[position:position + 4 * (string_count + 1)].cast("I")
+        position += string_offsets.nbytes
+        strings = self._map[position:position + strings_size]
+        self.strings = [
+            strings[string_offsets[i]:string_offsets[i + 1]].decode("utf-8") for i in range(string_count)
+        ]  # Категории и теги декодируются сразу: их немного, и замечания ссылаются на одни и те же строки
+        position = align(position + strings_size)
+        self._categories = view[position:position + 4 * self.count].cast("I")
+        position += self._categories.nbytes
+        self._tag_offsets = view[position:position + 4 * (self.count + 1)].cast("I")
+        position += self._tag_offsets.nbytes
+        self._tag_refs = view[position:position + 4 * tag_ref_count].cast("I")
+        position = align(position + self._tag_refs.nbytes)
+        self._text_offsets = view[position:position + 8 * (self.count + 1)].cast("Q")
+        self._texts_start = position + self._text_offsets.nbytes  # Тексты замечаний - в конце файла
+        if self._texts_start + self._text_offsets[self.count] > len(self._map):
+            raise ValueError("Снимок обрезан.")
+        references = max(max(self._categories, default=-1), max(self._tag_refs, default=-1))  # Наибольший номер строки
+        if self._tag_offsets[self.count] != tag_ref_count or references >= string_count:
+            raise ValueError("Таблицы снимка не согласованы.")
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Открывает снимок файла filename.
+
+        Снимок считается действительным, если размер и время изменения файла совпадают с записанными в снимке.
+        Если совпадает только размер (например, файл скопировали), сравнивается контрольная сумма файла, и при
+        совпадении в снимок записывается новое время изменения, чтобы не считать сумму при каждом запуске.
+
+        Возвращает:
+            Snapshot | None: Снимок или None, если его нет, он повреждён или относится к другой версии файла.
+        """
+        path = snapshot_path(filename)
+        try:
+            stat = os.stat(filename)
+            file = open(path, "rb")
+        except OSError:
+            return None
+        with file:
+            try:
+                header = HEADER.unpack(file.read(HEADER.size))
+            except struct.error:
+                return None  # Снимок короче заголовка
+            magic, byte_order, _, _, _, _, source_size, source_mtime, source_checksum = header
+            if magic != SNAPSHOT_MAGIC or byte_order != BYTE_ORDER or source_size != stat.st_size:
+                return None
+            if source_mtime != stat.st_mtime_ns:
+                try:
+                    if bytes.fromhex(file_checksum(filename)) != source_checksum:
+                        return None  # Файл изменился
+                except OSError:
+                    return None
+                try:
+                    with open(path, "r+b") as header_file:  # Содержимое то же - запоминаем новое время изменения
+                        header_file.write(HEADER.pack(*header[:7], stat.st_mtime_ns, source_checksum))
+                except OSError:
+                    pass  # Снимок всё равно подходит, в следующий раз снова сверим контрольную сумму
+            try:
+                return cls(file, header)
+            except (ValueError, TypeError, IndexError, UnicodeDecodeError):
+                return None  # Таблицы снимка повреждены
+
+    def remarks(self, progress=None):
+        """
+        Возвращает замечания снимка по одному (см. SnapshotRemark), не декодируя их тексты.
+
+        Аргументы:
+            progress (Callable[[float], None], optional): Вызывается с долей (от 0 до 1) прочитанных замечаний.
+
+        Возвращает:
+            Iterator[SnapshotRemark]: Замечания в порядке следования в исходном файле.
+        """
+        strings = self.strings
+        categories = self._categories
+        tag_offsets = self._tag_offsets
+        tag_refs = self._tag_refs
+        for index in range(self.count):
+            if progress and index % CHUNK_SIZE == 0:
+                progress(index / self.count)
+            tags = [strings[ref] for ref in tag_refs[tag_offsets[index]:tag_offsets[index + 1]]]
+            yield SnapshotRemark(self, index, strings[categories[index]], tags)
+
+    def text(self, index):
+        """Декодирует и возвращает текст замечания с номером index."""
+        start = self._texts_start + self._text_offsets[index]
+        return self._map[start:self._texts_start + self._text_offsets[index + 1]].decode("utf-8")
+
+
+def snapshot_chunks(remarks, stat, checksum):
+    """
+    Возвращает содержимое снимка частями (см. описание формата в Snapshot).
+
+    Замечания приводятся к тому виду, в котором их прочитал бы из файла iter_json: текст без пробельных символов
+    по краям, замечания с пустым текстом пропускаются.
+
+    Аргументы:
+        remarks (Iterable[Remark]): Замечания в порядке следования в исходном файле.
+        stat (os.stat_result): Размер и время изменения исходного файла.
+        checksum (str): Контрольная сумма исходного файла (SHA-256 в шестнадцатеричном виде).
+
+    Возвращает:
+        Iterator[bytes]: Части содержимого снимка.
+    """
+    string_ids = {}  # Строка -> её номер в таблице строк
+    categories = array.array("I")  # Номер строки категории для каждого замечания
+    tag_offsets = array.array("I", [0])  # Начало ссылок на теги каждого замечания (и конец последнего)
+    tag_refs = array.array("I")  # Номера строк тегов подряд для всех замечаний
+    text_offsets = array.array("Q", [0])  # Начало текста каждого замечания (и конец последнего)
+    texts = []  # Тексты замечаний в UTF-8
+    for remark in remarks:
+        text = remark.text.strip()
+        if not text:
+            continue
+        if not isinstance(remark.category, str) or not all(isinstance(tag, str) for tag in remark.tags):
+            raise ValueError("Категории и теги снимка должны быть строками.")
+        categories.append(string_ids.setdefault(remark.category, len(string_ids)))
+        tag_refs.extend(string_ids.setdefault(tag, len(string_ids)) for tag in remark.tags)
+        tag_offsets.append(len(tag_refs))
+        texts.append(text.encode("utf-8"))
+        text_offsets.append(text_offsets[-1] + len(texts[-1]))
+    strings = [string.encode("utf-8") for string in string_ids]
+    string_offsets = array.array("I", [0])
+    for string in strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+    strings_size = string_offsets[-1]
+    yield HEADER.pack(
+        SNAPSHOT_MAGIC, BYTE_ORDER, len(categories), len(strings), len(tag_refs), strings_size,
+        stat.st_size, stat.st_mtime_ns, bytes.fromhex(checksum)
+    )
+    yield string_offsets.tobytes()
+    yield b"".join(strings)
+    position = HEADER.size + string_offsets.itemsize * len(string_offsets) + strings_size
+    yield bytes(align(position) - position)  # Выравнивание перед таблицами чисел
+    position = align(position)
+    yield categories.tobytes()
+    yield tag_offsets.tobytes()
+    yield tag_refs.tobytes()
+    position += (len(categories) + len(tag_offsets) + len(tag_refs)) * 4
+    yield bytes(align(position) - position)
+    yield text_offsets.tobytes()
+    yield from texts
+
+
+def write_snapshot(filename, remarks, checksum=None):
+    """
+    Записывает снимок файла filename, прочитанного или только что записанного из замечаний remarks.
+
+    Аргументы:
+        filename (str): Путь к исходному файлу.
+        remarks (Iterable[Remark]): Замечания в порядке следования в файле.
+        checksum (str, optional): Контрольная сумма файла, если она уже известна (например, после записи файла).
+            По умолчанию вычисляется заново.
+    """
+    stat = os.stat(filename)
+    if checksum is None:
+        checksum = file_checksum(filename)
+    write_file(snapshot_path(filename), snapshot_chunks(remarks, stat, checksum))
+
+
+def write_json_snapshot(filename, remarks, categories, checksum=None):
+    """
+    Записывает снимок .json-файла, только что записанного из замечаний remarks (см. remark_io.json_chunks).
+
+    Замечания в .json-файле сгруппированы по категориям в порядке categories, в снимке они идут в том же порядке.
+    """
+    ordered = (remark for _, category_remarks in group_by_category(remarks, categories) for remark in category_remarks)
+    write_snapshot(filename, ordered, checksum)
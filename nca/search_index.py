@@ -0,0 +1,188 @@
+import itertools
+import re
+import time
+
+
+WORD_RE = re.compile(r"\w+")  # Слово - непрерывная последовательность букв, цифр и знаков подчёркивания
+NGRAM = 3  # Длина n-грамм (триграммы), по которым индексируется словарь слов
+
+
+def normalize(text):
+    """Приводит текст к виду, в котором выполняется поиск (нижний регистр)."""
+    return text.lower()
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс для поиска замечаний по подстроке.
+
+    Текст каждого замечания нормализуется один раз - при добавлении или изменении замечания. Индекс состоит из двух
+    уровней: "слово -> идентификаторы замечаний, где оно встречается" и "триграмма -> слова, в которых она
+    встречается". Каждое слово запроса является подстрокой какого-то слова подходящего замечания, поэтому кандидаты
+    находятся пересечением списков из индекса, а проверка "запрос является подстрокой текста" выполняется только для
+    кандидатов. Результат совпадает с простым перебором всех замечаний.
+
+    Запрос из одного слова разрешается по индексу целиком, без проверки текстов. Если новый запрос из нескольких
+    слов содержит предыдущий (пользователь продолжает печатать), кандидатами становятся результаты предыдущего
+    запроса. Время последнего поиска в секундах сохраняется в last_search_time.
+
+    Замечания, текст которых ещё не прочитан (см. remark_snapshot.SnapshotRemark), добавляются отложенно (defer)
+    и попадают в индекс порциями в свободное время (add_pending) или перед первым поиском, поэтому загрузка файла
+    не декодирует все тексты.
+
+    Методы:
+        add(remark_id, text):
+            Добавляет замечание в индекс.
+        defer(remark_id, remark):
+            Откладывает добавление замечания до первого поиска.
+        add_pending(limit=None):
+            Добавляет в индекс отложенные замечания.
+        remove(remark_id):
+            Удаляет замечание из индекса.
+        update(remark_id, text):
+            Обновляет текст замечания в индексе.
+        clear():
+            Очищает индекс.
+        search(query):
+            Возвращает множество идентификаторов замечаний, текст которых содержит запрос.
+    """
+    def __init__(self):
+        """Конструктор класса SearchIndex."""
+        self._texts = {}  # Нормализованные тексты: идентификатор -> текст
+        self._postings = {}  # Слово -> множество идентификаторов замечаний, в которых оно встречается
+        self._ngrams = {}  # Триграмма -> множество слов словаря, в которых она встречается
+        self._pending = {}  # Отложенные замечания: идентификатор -> замечание, текст которого ещё не проиндексирован
+        self._last_query = None  # Предыдущий запрос (для сужения поиска при наборе текста)
+        self._last_result = None  # Результат предыдущего запроса
+        self.last_search_time = 0.0  # Длительность последнего поиска в секундах
+
+    def __len__(self):
+        """Возвращает количество замечаний в индексе."""
+        return len(self._texts) + len(self._pending)
+
+    def add(self, remark_id, text):
+        """Добавляет замечание remark_id с текстом text в индекс."""
+        text = normalize(text)
+        self._texts[remark_id] = text
+        for word in set(WORD_RE.findall(text)):
+            remark_ids = self._postings.get(word)
+            if remark_ids is None:  # Новое слово - добавляем его триграммы в индекс словаря
+                remark_ids = self._postings[word] = set()
+                for ngram in self._word_ngrams(word):
+                    self._ngrams.setdefault(ngram, set()).add(word)
+            remark_ids.add(remark_id)
+        self._last_query = None  # Кэш предыдущего запроса больше не актуален
+
+    def defer(self, remark_id, remark):
+        """Откладывает добавление замечания remark в индекс до первого поиска (его текст пока не читается)."""
+        self._pending[remark_id] = remark
+        self._last_query = None
+
+    def remove(self, remark_id):
+        """Удаляет замечание remark_id из индекса."""
+        if self._pending.pop(remark_id, None) is not None:
+            return  # Замечание ещё не попало в индекс
+        text = self._texts.pop(remark_id, None)
+        if text is None:
+            return
+        for word in set(WORD_RE.findall(text)):
+            remark_ids = self._postings[word]
+            remark_ids.discard(remark_id)
+            if not remark_ids:  # Слово больше нигде не встречается - убираем его из словаря
+                del self._postings[word]
+                for ngram in self._word_ngrams(word):
+                    words = self._ngrams[ngram]
+                    words.discard(word)
+                    if not words:
+                        del self._ngrams[ngram]
+        self._last_query = None
+
+    def update(self, remark_id, text):
+        """Обновляет текст замечания remark_id в индексе (если текст изменился)."""
+        self._pending.pop(remark_id, None)  # Отложенное замечание индексируем сразу с новым текстом
+        if self._texts.get(remark_id) == normalize(text):
+            return
+        self.remove(remark_id)
+        self.add(remark_id, text)
+
+    def clear(self):
+        """Очищает индекс."""
+        self._texts.clear()
+        self._postings.clear()
+        self._ngrams.clear()
+        self._pending.clear()
+        self._last_query = None
+        self._last_result = None
+
+    def search(self, query):
+        """
+        Возвращает множество идентификаторов замечаний, нормализованный текст которых содержит запрос.
+
+        Аргументы:
+            query (str): Поисковый запрос.
+
+        Возвращает:
+            set[int]: Идентификаторы подходящих замечаний.
+        """
+        start = time.perf_counter()
+        self.add_pending()
+        query = normalize(query)
+        if WORD_RE.fullmatch(query):
+            # Запрос из одного слова: все кандидаты из индекса заведомо содержат его, проверка текстов не нужна
+            result = self._word_candidates(query)
+        else:
+            if self._last_query is not None and self._last_query in query:
+                candidates = self._last_result  # Запрос уточняет предыдущий - проверяем только его результаты
+            else:
+                candidates = None
+                # Начинаем с самых длинных слов запроса: они дают самые короткие списки кандидатов
+                for word in sorted(set(WORD_RE.findall(query)), key=len, reverse=True):
+                    word_candidates = self._word_candidates(word)
+                    candidates = word_candidates if candidates is None else candidates & word_candidates
+                    if not candidates:
+                        break
+                if candidates is None:  # В запросе нет ни одного слова (например, только знаки препинания)
+                    candidates = self._texts.keys()
+            texts = self._texts
+            result = {remark_id for remark_id in candidates if query in texts[remark_id]}
+        self._last_query = query
+        self._last_result = result
+        self.last_search_time = time.perf_counter() - start
+        return result
+
+    def add_pending(self, limit=None):
+        """
+        Добавляет в индекс отложенные замечания (их тексты читаются здесь).
+
+        Аргументы:
+            limit (int, optional): Сколько замечаний добавить за вызов. По умолчанию - все.
+
+        Возвращает:
+            bool: True, если отложенные замечания ещё остались.
+        """
+        pending = self._pending
+        for remark_id in list(itertools.islice(pending, limit)):
+            self.add(remark_id, pending.pop(remark_id).text)
+        return bool(pending)
+
+    def _word_candidates(self, word):
+        """Возвращает идентификаторы замечаний, в которых есть слово, содержащее word как подстроку."""
+        if len(word) >= NGRAM:
+            # Слова-кандидаты - пересечение множеств слов для всех триграмм word
+            words = None
+            for ngram in sorted(self._word_ngrams(word), key=lambda ngram: len(self._ngrams.get(ngram, ()))):
+                ngram_words = self._ngrams.get(ngram)
+                if not ngram_words:
+                    return set()
+                words = ngram_words if words is None else words & ngram_words
+                if not words:
+                    return set()
+            words = [candidate for candidate in words if word in candidate]
+        else:
+            words = [candidate for candidate in self._postings if word in candidate]  # Короткое слово - по словарю
+        return set().union(*(self._postings[candidate] for candidate in words))
+
+    @staticmethod
+    def _word_ngrams(word):
+        """Возвращает множество триграмм слова (для слов короче триграммы - пустое множество)."""
+        return {word[i:i + NGRAM] for i in range(len(word) - NGRAM + 1)}
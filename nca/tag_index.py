@@ -0,0 +1,398 @@
+from bisect import bisect_left, insort
+from heapq import nsmallest
+
+
+COMPLETION_LIMIT = 20  # Сколько подсказок возвращает автодополнение тегов
+COMPLETION_SORT_LIMIT = 512  # Если тегов с префиксом больше, они не сортируются, а ищутся среди самых частых
+PREFIX_END = "\U0010ffff"  # Больше любого символа: строки с префиксом p лежат между p и p + PREFIX_END
+
+
+def ids_to_mask(remark_ids):
+    """
+    Возвращает битовую маску (int), в которой установлены биты с номерами из remark_ids.
+
+    Биты выставляются в bytearray, а в int он превращается один раз, поэтому построение маски линейно по количеству
+    идентификаторов (установка битов прямо в int копировала бы всё число на каждом шаге).
+    """
+    if not remark_ids:
+        return 0
+    bits = bytearray(max(remark_ids) // 8 + 1)
+    for remark_id in remark_ids:
+        bits[remark_id >> 3] |= 1 << (remark_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+class TagIndex:
+    """
+    Индекс тегов на битовых масках.
+
+    Каждый тег получает целочисленный идентификатор, а замечания, у которых есть этот тег, хранятся как битовая
+    маска (int), где номер бита - идентификатор замечания. Фильтрация в режиме "И" - это пересечение масок выбранных
+    тегов, в режиме "ИЛИ" - объединение. Обе операции выполняются над целыми числами целиком, без перебора замечаний.
+
+    Методы:
+        build(remarks):
+            Строит индекс заново по списку замечаний.
+        extend(remarks):
+            Добавляет в индекс теги группы замечаний.
+        add(remark_id, tags):
+            Добавляет теги замечания в индекс.
+        remove(remark_id, tags):
+            Удаляет теги замечания из индекса.
+        update(remark_id, old_tags, new_tags):
+            Обновляет теги замечания.
+        update_many(added, removed):
+            Обновляет теги группы замечаний.
+        clear():
+            Очищает индекс.
+        tag_id(tag):
+            Возвращает идентификатор тега.
+        mask(tags, tag_filter_mode):
+            Возвращает маску замечаний, подходящих под выбранные теги.
+    """
+    def __init__(self):
+        """Конструктор класса TagIndex."""
+        self._tag_ids = {}  # Тег -> идентификатор тега
+        self._masks = []  # Идентификатор тега -> битовая маска замечаний с этим тегом
+
+    def build(self, remarks):
+        """Строит индекс заново по списку замечаний (каждое замечание должно уже иметь идентификатор)."""
+        self.clear()
+        self.extend(remarks)
+
+    def extend(self, remarks):
+        """
+        Добавляет в индекс теги группы замечаний (например, очередной порции при потоковой загрузке).
+
+        Биты группы выставляются в bytearray относительно наименьшего идентификатора, и с маской тега объединяется
+        уже готовое число, поэтому каждая маска обновляется один раз на группу, а не на каждое замечание.
+        """
+        if not remarks:
+            return
+        low = min(remark.id for remark in remarks)  # Номер бита, с которого начинаются маски группы
+        size = (max(remark.id for remark in remarks) - low) // 8 + 1  # Размер маски группы в байтах
+        bits = {}  # Идентификатор тега -> bytearray, в котором выставляем биты (см. ids_to_mask)
+        for remark in remarks:
+            offset = remark.id - low
+            byte, bit = offset >> 3, 1 << (offset & 7)
+            for tag in remark.tags:
+                tag_id = self.tag_id(tag)
+                tag_bits = bits.get(tag_id)
+                if tag_bits is None:
+                    tag_bits = bits[tag_id] = bytearray(size)
+                tag_bits[byte] |= bit
+        for tag_id, tag_bits in bits.items():
+            self._masks[tag_id] |= int.from_bytes(tag_bits, "little") << low
+
+    def add(self, remark_id, tags):
+        """Добавляет замечание remark_id в маски его тегов."""
+        bit = 1 << remark_id
+        for tag in tags:
+            tag_id = self.tag_id(tag)
+            self._masks[tag_id] |= bit
+
+    def remove(self, remark_id, tags):
+        """Убирает замечание remark_id из масок его тегов."""
+        bit = 1 << remark_id
+        for tag in tags:
+            tag_id = self._tag_ids.get(tag)
+            if tag_id is not None:
+                self._masks[tag_id] &= ~bit
+
+    def update(self, remark_id, old_tags, new_tags):
+        """Обновляет теги замечания remark_id: убирает исчезнувшие и добавляет новые."""
+        old_tags, new_tags = set(old_tags), set(new_tags)
+        self.remove(remark_id, old_tags - new_tags)
+        self.add(remark_id, new_tags - old_tags)
+
+    def update_many(self, added, removed):
+        """
+        Обновляет теги группы замечаний: каждая маска меняется одной операцией, а не по биту на замечание.
+
+        Аргументы:
+            added (dict[str, list[int]]): Тег -> идентификаторы замечаний, у которых он появился.
+            removed (dict[str, list[int]]): Тег -> идентификаторы замечаний, у которых он исчез.
+        """
+        for tag, remark_ids in removed.items():
+            tag_id = self._tag_ids.get(tag)
+            if tag_id is not None:
+                self._masks[tag_id] &= ~ids_to_mask(remark_ids)
+        for tag, remark_ids in added.items():
+            self._masks[self.tag_id(tag)] |= ids_to_mask(remark_ids)
+
+    def clear(self):
+        """Очищает индекс."""
+        self._tag_ids.clear()
+        self._masks.clear()
+
+    def tag_id(self, tag):
+        """Возвращает идентификатор тега, при первом обращении регистрирует тег с пустой маской."""
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self._masks)
+            self._masks.append(0)
+        return tag_id
+
+    def mask(self, tags, tag_filter_mode):
+        """
+        Возвращает битовую маску замечаний, подходящих под выбранные теги.
+
+        Аргументы:
+            tags (Iterable[str]): Выбранные теги.
+            tag_filter_mode (str): "AND" - у замечания должны быть все теги, "OR" - хотя бы один.
+
+        Возвращает:
+            int | None: Маска замечаний или None, если теги не выбраны (фильтр по тегам не задан).
+        """
+        masks = [self._masks[self._tag_ids[tag]] if tag in self._tag_ids else 0 for tag in tags]
+        if not masks:
+            return None
+        result = masks[0]
+        for mask in masks[1:]:
+            result = result & mask if tag_filter_mode == "AND" else result | mask
+        return result
+
+
+class TagCounts:
+    """
+    Счётчики тегов по категориям: для каждой категории (и для всех замечаний вместе) - сколько замечаний с каждым тегом.
+
+    Счётчики обновляются при каждом добавлении, изменении и удалении замечания, поэтому список тегов вкладки
+    и проверка "есть ли теги вообще" не перебирают замечания, а занимают время, пропорциональное числу различных
+    тегов. Тег исчезает из счётчиков, когда у категории не остаётся ни одного замечания с ним.
+    Общие счётчики тегов заодно поддерживают индекс автодополнения (completion, см. TagCompletion).
+
+    Методы:
+        add(category, tags):
+            Учитывает теги нового замечания категории.
+        remove(category, tags):
+            Перестаёт учитывать теги удалённого замечания категории.
+        rename_category(old_name, new_name):
+            Переносит счётчики категории под новое название.
+        counts(category=None):
+            Возвращает счётчики тегов категории или всех замечаний.
+        clear():
+            Очищает счётчики.
+    """
+    def __init__(self):
+        """Конструктор класса TagCounts."""
+        self._by_category = {}  # Категория -> {тег: количество замечаний категории с этим тегом}
+        self._all = {}  # Тег -> количество всех замечаний с этим тегом
+        self.completion = TagCompletion(self._all)  # Подсказки тегов по их началу
+
+    def add(self, category, tags):
+        """Учитывает теги tags замечания категории category (повторы тега в одном замечании считаются один раз)."""
+        if not tags:
+            return
+        category_counts = self._by_category.setdefault(category, {})
+        for tag in set(tags):
+            category_counts[tag] = category_counts.get(tag, 0) + 1
+            self._all[tag] = self._all.get(tag, 0) + 1
+            if self.completion.built:
+                self.completion.increment(tag)
+
+    def remove(self, category, tags):
+        """Перестаёт учитывать теги tags замечания категории category."""
+        if not tags:
+            return
+        category_counts = self._by_category.get(category, {})
+        for tag in set(tags):
+            self._decrement(category_counts, tag)
+            if self.completion.built and tag in self._all:
+                self.completion.decrement(tag)  # До изменения счётчика: индексу нужно прежнее количество
+            self._decrement(self._all, tag)
+        if not category_counts:
+            self._by_category.pop(category, None)
+
+    def rename_category(self, old_name, new_name):
+        """Переносит счётчики категории old_name под название new_name."""
+        category_counts = self._by_category.pop(old_name, None)
+        if not category_counts:
+            return
+        if not self._by_category.get(new_name):
+            self._by_category[new_name] = category_counts  # Счётчики переносятся целиком, без перебора тегов
+            return
+        new_counts = self._by_category[new_name]
+        for tag, count in category_counts.items():
+            new_counts[tag] = new_counts.get(tag, 0) + count
+
+    def counts(self, category=None):
+        """
+        Возвращает счётчики тегов категории category (None - всех замечаний) в виде словаря {тег: количество}.
+
+        Словарь принадлежит индексу и меняется вместе с замечаниями: его нельзя изменять, а сохранять нужно копию.
+        """
+        if category is None:
+            return self._all
+        return self._by_category.get(category, {})
+
+    def clear(self):
+        """Очищает счётчики."""
+        self._by_category.clear()
+        self._all.clear()
+        self.completion.clear()
+
+    @staticmethod
+    def _decrement(counts, tag):
+        """Уменьшает счётчик тега на единицу и убирает тег, если счётчик стал нулевым."""
+        count = counts.get(tag, 0) - 1
+        if count > 0:
+            counts[tag] = count
+        else:
+            counts.pop(tag, None)
+
+
+class TagCompletion:
+    """
+    Индекс автодополнения тегов: по началу тега возвращает самые частые теги с этим началом (без учёта регистра).
+
+    Теги хранятся в двух массивах. В первом они отсортированы по алфавиту, и теги с заданным началом находятся
+    двоичным поиском. Во втором они упорядочены по убыванию количества замечаний: теги с одинаковым количеством
+    образуют непрерывный блок, поэтому при изменении количества на единицу тег меняется местами с первым
+    (или последним) тегом своего блока и граница блока сдвигается - за постоянное время, без пересортировки.
+
+    Если тегов с введённым началом немного, они сортируются по количеству замечаний целиком. Если много (короткое
+    начало вроде одной буквы), подходящие теги быстро находятся просмотром самых частых тегов с начала второго
+    массива. В обоих случаях время ответа не зависит от общего числа тегов в библиотеке.
+
+    Индекс строится по счётчикам при первом запросе подсказок (загрузка файла не тратит время на теги, которые,
+    может быть, никто не станет вводить), а после этого обновляется при каждом изменении счётчиков.
+
+    Методы:
+        increment(tag):
+            Учитывает ещё одно замечание с тегом.
+        decrement(tag):
+            Перестаёт учитывать одно замечание с тегом.
+        complete(prefix, limit=COMPLETION_LIMIT):
+            Возвращает самые частые теги, начинающиеся с префикса.
+        clear():
+            Очищает индекс.
+    """
+    def __init__(self, counts):
+        """
+        Конструктор класса TagCompletion.
+
+        Аргументы:
+            counts (dict[str, int]): Общие счётчики тегов (см. TagCounts). Индекс их только читает, а владелец
+                вызывает increment после увеличения счётчика и decrement до его уменьшения.
+        """
+        self._counts = counts
+        self._sorted = []  # Пары (тег без учёта регистра, тег) в алфавитном порядке
+        self._by_frequency = []  # Пары (тег без учёта регистра, тег) по убыванию количества замечаний
+        self._positions = {}  # Тег -> его позиция в _by_frequency
+        self._blocks = {}  # Количество замечаний -> [первая, последняя] позиции тегов с ним в _by_frequency
+        self._last_completion = None  # Последний запрос и его результат (сбрасывается при изменении тегов)
+        self.built = False  # Построен ли индекс (до первого запроса подсказок владелец не сообщает об изменениях)
+
+    def increment(self, tag):
+        """Учитывает ещё одно замечание с тегом tag (счётчик тега уже увеличен)."""
+        self._last_completion = None
+        count = self._counts[tag]
+        if count == 1:  # Новый тег - в конец массива частот, к тегам с одним замечанием
+            item = (tag.casefold(), tag)
+            insort(self._sorted, item)
+            self._positions[tag] = len(self._by_frequency)
+            self._by_frequency.append(item)
+            self._extend_block(1, self._positions[tag])
+            return
+        position = self._shrink_block(count - 1, self._positions[tag], first=True)  # Первым в блоке прежнего...
+        self._extend_block(count, position)  # ... и последним в блоке нового количества
+
+    def decrement(self, tag):
+        """Перестаёт учитывать одно замечание с тегом tag (счётчик тега ещё не уменьшен)."""
+        self._last_completion = None
+        count = self._counts[tag]
+        position = self._shrink_block(count, self._positions[tag], first=False)  # Последним в блоке прежнего...
+        if count > 1:
+            self._extend_block(count - 1, position)  # ... и первым в блоке нового количества
+            return
+        item = self._by_frequency.pop()  # Тег исчезает из библиотеки (блок одного замечания - в конце массива)
+        del self._positions[tag]
+        del self._sorted[bisect_left(self._sorted, item)]
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """
+        Возвращает до limit тегов, начинающихся с prefix (без учёта регистра), по убыванию количества замечаний,
+        при равенстве - по алфавиту. Список принадлежит индексу: изменять его нельзя.
+        """
+        if self._last_completion is not None and self._last_completion[0] == (prefix, limit):
+            return self._last_completion[1]  # Тот же запрос (QCompleter повторяет его при одном нажатии клавиши)
+        if not self.built:
+            self._build()
+        key = prefix.casefold()
+        start = bisect_left(self._sorted, (key,))
+        end = bisect_left(self._sorted, (key + PREFIX_END,), start)
+        if end - start <= COMPLETION_SORT_LIMIT:
+            candidates = self._sorted[start:end]
+        else:  # Подходящих тегов много - первые limit из них найдутся среди самых частых
+            candidates = []
+            items = self._by_frequency
+            end = len(items)
+            for position, item in enumerate(items):
+                if position == end:
+                    break
+                if item[0].startswith(key):
+                    candidates.append(item)
+                    if len(candidates) == limit:
+                        # Внутри блока тегов с равным количеством порядок не алфавитный (см. _shrink_block), поэтому
+                        # блок последнего кандидата просматривается до конца, и nsmallest выберет первые по алфавиту
+                        end = self._blocks[self._counts[item[1]]][1] + 1
+        counts = self._counts
+        best = nsmallest(limit, candidates, key=lambda item: (-counts[item[1]], item[0]))
+        result = [tag for _, tag in best]
+        self._last_completion = ((prefix, limit), result)
+        return result
+
+    def clear(self):
+        """Очищает индекс."""
+        self._sorted.clear()
+        self._by_frequency.clear()
+        self._positions.clear()
+        self._blocks.clear()
+        self._last_completion = None
+        self.built = False
+
+    def _build(self):
+        """Строит индекс по текущим счётчикам тегов."""
+        counts = self._counts
+        self._sorted = sorted((tag.casefold(), tag) for tag in counts)
+        self._by_frequency = sorted(self._sorted, key=lambda item: -counts[item[1]])
+        self._positions = {tag: position for position, (_, tag) in enumerate(self._by_frequency)}
+        self._blocks = {}
+        for position, (_, tag) in enumerate(self._by_frequency):
+            self._extend_block(counts[tag], position)
+        self.built = True
+
+    def _shrink_block(self, count, position, first):
+        """
+        Переставляет тег с позиции position на край блока тегов с количеством count (first - в начало, иначе в конец)
+        и исключает этот край из блока. Возвращает новую позицию тега.
+        """
+        block = self._blocks[count]
+        edge = block[0] if first else block[1]
+        self._swap(position, edge)
+        if block[0] == block[1]:
+            del self._blocks[count]  # Тег был в блоке один
+        elif first:
+            block[0] += 1
+        else:
+            block[1] -= 1
+        return edge
+
+    def _extend_block(self, count, position):
+        """Присоединяет позицию position (соседнюю с блоком) к блоку тегов с количеством count."""
+        block = self._blocks.get(count)
+        if block is None:
+            self._blocks[count] = [position, position]
+        else:
+            block[0] = min(block[0], position)
+            block[1] = max(block[1], position)
+
+    def _swap(self, first, second):
+        """Меняет местами теги на позициях first и second массива частот."""
+        if first == second:
+            return
+        items = self._by_frequency
+        items[first], items[second] = items[second], items[first]
+        self._positions[items[first][1]] = first
+        self._positions[items[second][1]] = second
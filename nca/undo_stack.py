@@ -0,0 +1,135 @@
+from collections import deque
+
+
+class UndoCommand:
+    """
+    Отменяемое действие пользователя: записи журнала (см. journal.OperationJournal), которые отменяют действие,
+    и записи, которые выполняют его повторно.
+
+    Команда хранит только идентификаторы замечаний и изменённые поля (для удалённых замечаний - их тексты, категории,
+    теги и номера строк), а не копию всех замечаний, поэтому отмена не зависит от размера библиотеки.
+    """
+    __slots__ = ("op", "undo", "redo", "size")
+
+    def __init__(self, op, undo, redo):
+        """
+        Конструктор класса UndoCommand.
+
+        Аргументы:
+            op (str): Операция, которую выполнил пользователь (по ней строится подпись в строке состояния).
+            undo (list[dict]): Записи журнала, отменяющие действие (применяются по порядку).
+            redo (list[dict]): Записи журнала, выполняющие действие повторно.
+        """
+        self.op = op
+        self.undo = undo
+        self.redo = redo
+        self.size = estimate_size(undo) + estimate_size(redo)  # Примерный объём памяти в байтах
+
+
+def estimate_size(value):
+    """Возвращает примерный объём памяти (в байтах), который занимают записи value: строки, числа, списки, словари."""
+    if isinstance(value, str):
+        return 49 + len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    elif not isinstance(value, (list, tuple)):
+        return 28  # Число, None или логическое значение
+    size = 56 + 8 * len(value)
+    for item in value:  # Строки и числа считаем на месте: у удалённых замечаний их сотни тысяч
+        if isinstance(item, str):
+            size += 49 + len(item)
+        elif isinstance(item, (list, tuple, dict)):
+            size += estimate_size(item)
+        else:
+            size += 28
+    return size
+
+
+def restore_record(library, remark_ids=None):
+    """
+    Возвращает запись журнала "restore", которая вернёт замечания remark_ids (None - все замечания) библиотеки
+    library (RemarkLibrary) на их нынешние места.
+    """
+    remarks = library.remarks
+    rows = range(len(remarks)) if remark_ids is None else library.rows_of(remark_ids)
+    return {
+        "op": "restore",
+        "remarks": [
+            [remarks[row].id, row, remarks[row].text, remarks[row].category, list(remarks[row].tags)] for row in rows
+        ],
+    }
+
+
+class UndoStack:
+    """
+    Стек отмены и повтора действий пользователя с ограниченным объёмом памяти.
+
+    Новое действие очищает стек повтора. Если команды вместе занимают больше budget байт, самые старые из них
+    забываются (их уже нельзя отменить), а команда, которая одна больше бюджета, не сохраняется вовсе.
+
+    Методы:
+        push(command):
+            Запоминает выполненное действие.
+        undo():
+            Возвращает команду для отмены и переносит её в стек повтора.
+        redo():
+            Возвращает команду для повтора и переносит её в стек отмены.
+        clear():
+            Забывает все команды.
+    """
+    def __init__(self, budget):
+        """
+        Конструктор класса UndoStack.
+
+        Аргументы:
+            budget (int): Наибольший объём памяти команд в байтах (0 - отмена выключена).
+        """
+        self.budget = budget
+        self.size = 0  # Примерный объём памяти всех команд в байтах
+        self._undo = deque()  # Команды для отмены, последняя - самая новая
+        self._redo = []  # Команды для повтора, последняя - ближайшая
+
+    @property
+    def can_undo(self):
+        """True, если есть действие для отмены."""
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        """True, если есть отменённое действие для повтора."""
+        return bool(self._redo)
+
+    def push(self, command):
+        """Запоминает выполненное действие command (UndoCommand) и очищает стек повтора."""
+        self.size -= sum(redo_command.size for redo_command in self._redo)
+        self._redo.clear()
+        self._undo.append(command)
+        self.size += command.size
+        self._trim()
+
+    def undo(self):
+        """Возвращает последнюю выполненную команду (None, если отменять нечего) и переносит её в стек повтора."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._redo.append(command)
+        return command
+
+    def redo(self):
+        """Возвращает последнюю отменённую команду (None, если повторять нечего) и переносит её в стек отмены."""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._undo.append(command)
+        return command
+
+    def clear(self):
+        """Забывает все команды (например, при открытии другого файла)."""
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
+
+    def _trim(self):
+        """Забывает самые старые команды, пока их объём превышает бюджет."""
+        while self.size > self.budget and self._undo:
+            self.size -= self._undo.popleft().size
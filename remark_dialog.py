@@ -1,4 +1,4 @@
-from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtCore import QEvent, QStringListModel, Qt
 from PyQt5.QtWidgets import QDialog, QCompleter
 
 from ui_remark_dialog import Ui_RemarkDialog
@@ -40,10 +40,9 @@ class RemarkDialog(QDialog):
                 if parent.ui.tabWidget.tabText(i) != "Все"
             ]
             self.ui.categoryComboBox.addItems(categories)
-            # Собираем все теги из родителя для автодополнения
-            all_tags = parent.get_tab_tags(0)  # tab_index = 0 -> собираем теги со вкладки "Все"
-            # Создаём completer для подсказок при вводе
-            completer = TagCompleter(all_tags, self.ui.tagsLineEdit)
+            # Создаём completer для подсказок при вводе: он берёт теги из общего индекса тегов главного окна,
+            # поэтому открытие окна не собирает список всех тегов заново
+            completer = TagCompleter(parent.remark_model, self.ui.tagsLineEdit)
             self.ui.tagsLineEdit.setCompleter(completer)
         # В поле textEdit загружаем текущий текст замечания
         self.ui.textEdit.setPlainText(text)
@@ -131,23 +130,31 @@ class TagCompleter(QCompleter):
     Предлагает подсказки для редактируемого в данный момент тега, даже если пользователь будет редактировать тег
     из середины списка тегов. При автозаполнении ранее введённые теги остаются нетронутыми.
 
+    Подсказки не фильтруются самим QCompleter (он перебирал бы все теги при каждом нажатии клавиши): при каждом
+    вводе completer запрашивает у модели замечаний (см. RemarkModel.complete_tag) самые частые теги с введённым
+    началом и показывает их как есть. Индекс тегов общий для всех окон и обновляется вместе с замечаниями.
+
     Методы:
-        __init__(tags, parent=None):
+        __init__(remark_model, parent=None):
             Конструктор класса.
         pathFromIndex(index):
             Формирует итоговую строку после выбора подсказки.
         splitPath(path):
             Определяет часть строки для поиска подсказок.
     """
-    def __init__(self, tags, parent=None):
+    def __init__(self, remark_model, parent=None):
         """
         Конструктор класса TagCompleter.
 
         Аргументы:
-            tags (list[str]): Список возможных тегов для автодополнения.
+            remark_model (RemarkModel): Модель замечаний, по тегам которой строятся подсказки.
             parent (QWidget, optional): Родительский виджет (например, QLineEdit). По умолчанию None.
         """
-        super().__init__(tags, parent)  # Вызываем конструктор родительского класса QCompleter
+        super().__init__(parent)  # Вызываем конструктор родительского класса QCompleter
+        self.remark_model = remark_model
+        self.suggestions = QStringListModel(self)  # Подсказки для текущего ввода (не больше нескольких десятков)
+        self.setModel(self.suggestions)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)  # Показываем подсказки в порядке частоты
         self.setCaseSensitivity(Qt.CaseInsensitive)  # Игнорируем регистр при поиске совпадений
 
     def pathFromIndex(self, index):
@@ -196,4 +203,7 @@ class TagCompleter(QCompleter):
         left_comma_pos = path[:cursor_pos].rfind(',')  # Узнаём позицию последней запятой слева от курсора
         start = left_comma_pos + 1 if left_comma_pos != -1 else 0  # Запятой слева может не быть, если это первый тег
         current_tag = path[start:cursor_pos].strip()  # Будем искать подсказки только по этому фрагменту
+        suggestions = self.remark_model.complete_tag(current_tag)  # Самые частые теги с этим началом
+        if suggestions != self.suggestions.stringList():
+            self.suggestions.setStringList(suggestions)
         return [current_tag]
\ No newline at end of file
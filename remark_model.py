@@ -0,0 +1,652 @@
+import contextlib
+
+from bisect import bisect_left, bisect_right
+
+from PyQt5.QtCore import QAbstractListModel, QAbstractProxyModel, QItemSelection, QModelIndex, Qt
+
+from nca.remark_library import RemarkLibrary
+
+
+CATEGORY_ROLE = Qt.UserRole  # Роль, под которой модель отдаёт категорию замечания
+TAGS_ROLE = Qt.UserRole + 1  # Роль, под которой модель отдаёт список тегов замечания
+ID_ROLE = Qt.UserRole + 2  # Роль, под которой модель отдаёт идентификатор замечания
+RANGE_SIGNAL_LIMIT = 32  # Если строки разбиты на большее число диапазонов, сигналы по диапазонам не отправляются
+BIT_POSITIONS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))  # Единичные биты байта
+
+
+def mask_ids(visible_bits):
+    """Возвращает по возрастанию идентификаторы, установленные в маске visible_bits (байты, младшие биты - первыми)."""
+    remark_ids = []
+    for index, byte in enumerate(visible_bits):
+        if byte:  # Пустые байты пропускаются одной проверкой
+            base = index << 3
+            remark_ids.extend(base + bit for bit in BIT_POSITIONS[byte])
+    return remark_ids
+
+
+def row_ranges(rows):
+    """Объединяет возрастающие номера строк rows в диапазоны подряд идущих строк [first, last]."""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+
+class RemarkModel(QAbstractListModel):
+    """
+    Qt-модель над библиотекой замечаний (RemarkLibrary), по одной строке на каждое замечание.
+
+    Вкладка "Все" и вкладки категорий отображают эту модель через RemarkFilterProxyModel, поэтому каждое
+    замечание хранится в памяти один раз, сколько бы вкладок его ни показывало. Все изменения проходят через модель:
+    она изменяет библиотеку (вместе с её индексами) и сообщает об изменениях представлениям.
+
+    Группу изменений можно выполнить внутри batch(): тогда модель не сообщает о каждом изменении отдельно,
+    а в конце группы отправляет один сброс (если замечания добавлялись или удалялись) или сигналы dataChanged
+    по диапазонам изменённых строк (если только редактировались).
+
+    Методы:
+        rowCount(parent=QModelIndex()):
+            Возвращает количество замечаний.
+        data(index, role=Qt.DisplayRole):
+            Возвращает текст, категорию или теги замечания в зависимости от роли.
+        batch():
+            Контекст, в котором сигналы об изменениях объединяются.
+        set_library(library):
+            Подставляет в модель другую библиотеку.
+        get_remark(remark_id):
+            Возвращает замечание по идентификатору.
+        add_remark(remark):
+            Добавляет замечание в конец модели.
+        append_remarks(remarks):
+            Добавляет группу замечаний в конец модели.
+        update_remark(remark_id, text, category, tags):
+            Изменяет данные замечания.
+        bulk_update(remark_ids, category=None, add_tags=(), remove_tags=()):
+            Переносит группу замечаний в категорию и добавляет или убирает у них теги.
+        remove_remarks(remark_ids):
+            Удаляет замечания с указанными идентификаторами.
+        restore_remarks(items):
+            Возвращает удалённые замечания на прежние места.
+        category_ids(name):
+            Возвращает идентификаторы замечаний категории.
+        filter_mask(query, tags, tag_filter_mode):
+            Возвращает битовую маску замечаний, подходящих под поисковый запрос и теги.
+        tag_counts(category=None):
+            Возвращает количество замечаний с каждым тегом в категории или во всей библиотеке.
+        complete_tag(prefix):
+            Возвращает подсказки автодополнения для начала тега.
+        rename_category(old_name, new_name):
+            Переименовывает категорию у всех её замечаний.
+        remove_category(name):
+            Удаляет все замечания категории.
+        clear():
+            Удаляет все замечания.
+    """
+    def __init__(self, parent=None):
+        """
+        Конструктор класса RemarkModel.
+
+        Аргументы:
+            parent (QObject, optional): Родительский объект. По умолчанию None.
+        """
+        super().__init__(parent)  # Вызываем конструктор родительского класса QAbstractListModel
+        self.library = RemarkLibrary()  # Библиотека замечаний с индексами
+        self._batch_depth = 0  # Глубина вложенности batch() (0 - изменения сообщаются сразу)
+        self._batch_reset = False  # В текущей группе начат сброс модели (добавлялись или удалялись строки)
+        self._batch_rows = set()  # Строки, изменённые в текущей группе (пока сброс не начат)
+        self.batch_proxies = []  # Прокси-модели, которые подключатся к модели в конце начатого в группе сброса
+
+    @property
+    def remarks(self):
+        """Список замечаний библиотеки, номер строки модели = индекс в списке."""
+        return self.library.remarks
+
+    def rowCount(self, parent=QModelIndex()):
+        """Возвращает количество замечаний (у элементов списка дочерних строк нет)."""
+        return 0 if parent.isValid() else len(self.library.remarks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Возвращает текст (Qt.DisplayRole), категорию (CATEGORY_ROLE) или теги (TAGS_ROLE) замечания."""
+        if not index.isValid():
+            return None
+        remark = self.library.remarks[index.row()]
+        if role == Qt.DisplayRole:
+            return remark.text
+        if role == CATEGORY_ROLE:
+            return remark.category
+        if role == TAGS_ROLE:
+            return remark.tags
+        if role == ID_ROLE:
+            return remark.id
+        return None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Контекст для группы изменений: сигналы об изменениях откладываются до выхода из внешнего batch().
+
+        Первое добавление или удаление строк начинает сброс модели, который завершается в конце группы, - прокси-модели
+        и представления перестраиваются один раз, сколько бы изменений ни было. Если строки только редактировались,
+        в конце отправляются сигналы dataChanged по диапазонам изменённых строк.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                reset, rows = self._batch_reset, sorted(self._batch_rows)
+                self._batch_reset = False
+                self._batch_rows.clear()
+                if reset:
+                    self.library.compact()  # Удалённые в группе замечания убираем из списка одним проходом
+                    self.endResetModel()
+                    proxies, self.batch_proxies = self.batch_proxies, []
+                    for proxy in proxies:
+                        proxy.set_active(True)
+                else:
+                    self._emit_rows_changed(rows)
+
+    def set_library(self, library):
+        """Подставляет в модель готовую библиотеку (например, загруженную в фоне) одним сбросом модели."""
+        if self._begin_batch_reset():
+            self.library = library
+            return
+        self.beginResetModel()
+        self.library = library
+        self.endResetModel()
+
+    def get_remark(self, remark_id):
+        """Возвращает замечание с идентификатором remark_id."""
+        return self.library.get(remark_id)
+
+    def add_remark(self, remark):
+        """Добавляет замечание в конец модели и возвращает его идентификатор."""
+        if self._begin_batch_reset():
+            self.library.append(remark)
+            return remark.id
+        row = len(self.library)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.library.append(remark)
+        self.endInsertRows()
+        return remark.id
+
+    def append_remarks(self, remarks):
+        """Добавляет группу замечаний (например, порцию потоковой загрузки) в конец модели одним сигналом."""
+        if not remarks:
+            return
+        if self._begin_batch_reset():
+            self.library.extend(remarks)
+            return
+        first = len(self.library)
+        self.beginInsertRows(QModelIndex(), first, first + len(remarks) - 1)
+        self.library.extend(remarks)
+        self.endInsertRows()
+
+    def update_remark(self, remark_id, text, category, tags):
+        """Изменяет текст, категорию и теги замечания с идентификатором remark_id."""
+        row = self.library.update(remark_id, text, category, tags)
+        self._emit_rows_changed([row])  # Прокси-модели перепроверят фильтр для этой строки
+
+    def bulk_update(self, remark_ids, category=None, add_tags=(), remove_tags=()):
+        """
+        Групповое редактирование замечаний remark_ids (см. RemarkLibrary.bulk_update).
+
+        Об изменённых строках сообщается по диапазонам подряд идущих строк, а если диапазонов слишком много - одним
+        сигналом от первой до последней изменённой строки.
+
+        Возвращает:
+            int: Количество изменённых замечаний.
+        """
+        rows = self.library.bulk_update(remark_ids, category, add_tags, remove_tags)
+        self._emit_rows_changed(rows)
+        return len(rows)
+
+    def remove_remarks(self, remark_ids):
+        """
+        Удаляет замечания с указанными идентификаторами.
+
+        Соседние строки объединяются в диапазоны, и для каждого диапазона отправляется один сигнал. Если диапазонов
+        слишком много (например, выделены тысячи разрозненных замечаний), модель сбрасывается целиком: это один
+        проход по списку вместо отдельной перестройки прокси-моделей на каждый диапазон.
+        """
+        remark_ids = set(remark_ids)
+        rows = self.library.rows_of(remark_ids)
+        if not rows:
+            return
+        if self._begin_batch_reset():
+            self.library.remove(remark_ids, compact=False)
+            return
+        ranges = []  # Диапазоны подряд идущих строк [first, last], от последнего к первому
+        for row in reversed(rows):  # Удаляем с конца, чтобы не сбивать номера оставшихся строк
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row  # Строка продолжает текущий диапазон
+            else:
+                ranges.append([row, row])  # Начинаем новый диапазон
+        if len(ranges) > RANGE_SIGNAL_LIMIT:
+            self.beginResetModel()
+            self.library.remove(remark_ids)
+            self.endResetModel()
+            return
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.library.remove_rows(first, last)
+            self.endRemoveRows()
+        self.library.reindex_rows(rows[0])  # Номера строк сдвинулись только начиная с первой удалённой
+
+    def restore_remarks(self, items):
+        """
+        Возвращает удалённые замечания на прежние места с прежними идентификаторами (см. RemarkLibrary.restore).
+
+        Аргументы:
+            items (list[tuple[int, Remark]]): Пары (номер строки, замечание), отсортированные по номеру строки.
+
+        Как и при удалении, о подряд идущих строках сообщается одним сигналом на диапазон, а если диапазонов слишком
+        много, модель сбрасывается целиком.
+        """
+        if not items:
+            return
+        if self._begin_batch_reset():
+            self.library.restore(items)
+            return
+        ranges = []  # Группы подряд идущих строк, от первой к последней
+        for item in items:
+            if ranges and ranges[-1][-1][0] == item[0] - 1:
+                ranges[-1].append(item)  # Строка продолжает текущую группу
+            else:
+                ranges.append([item])  # Начинаем новую группу
+        if len(ranges) > RANGE_SIGNAL_LIMIT or items[-1][0] >= len(self.library) + len(items):
+            self.beginResetModel()  # Слишком много диапазонов (или номера строк за концом списка)
+            self.library.restore(items)
+            self.endResetModel()
+            return
+        for group in ranges:  # По возрастанию: строки следующих групп ещё не вставлены и не сдвигают эти
+            self.beginInsertRows(QModelIndex(), group[0][0], group[-1][0])
+            self.library.restore(group, reindex=False)
+            self.endInsertRows()
+        self.library.reindex_rows(items[0][0])  # Номера строк сдвинулись только начиная с первой возвращённой
+
+    def category_ids(self, name):
+        """Возвращает множество идентификаторов замечаний категории name."""
+        return self.library.category_ids(name)
+
+    def filter_mask(self, query, tags, tag_filter_mode):
+        """Возвращает битовую маску замечаний, подходящих под запрос и теги (см. RemarkLibrary.filter_mask)."""
+        return self.library.filter_mask(query, tags, tag_filter_mode)
+
+    def tag_counts(self, category=None):
+        """Возвращает словарь {тег: количество замечаний} категории category (None - всех), только для чтения."""
+        return self.library.tag_counts.counts(category)
+
+    def complete_tag(self, prefix):
+        """Возвращает самые частые теги библиотеки, начинающиеся с prefix (без учёта регистра)."""
+        return self.library.tag_counts.completion.complete(prefix)
+
+    def rename_category(self, old_name, new_name):
+        """
+        Переименовывает категорию old_name в new_name у всех её замечаний (см. RemarkLibrary.rename_category).
+
+        Строки не перебираются и сигналы о них не отправляются: списки не показывают категорию, вкладка "Все"
+        от неё не зависит, а прокси-модели вкладки категории название меняют до переименования (см.
+        MainWindow.rename_category_tab), поэтому набор её строк остаётся прежним.
+        """
+        self.library.rename_category(old_name, new_name)
+
+    def remove_category(self, name):
+        """Удаляет все замечания категории name."""
+        self.remove_remarks(list(self.library.category_ids(name)))
+
+    def clear(self):
+        """Удаляет все замечания."""
+        self.set_library(RemarkLibrary())
+
+    @property
+    def batch_resetting(self):
+        """True, если в текущей группе изменений (batch) начат сброс модели: строки пока нельзя читать."""
+        return self._batch_reset
+
+    def _begin_batch_reset(self):
+        """
+        Внутри batch() начинает (при первом вызове в группе) отложенный сброс модели и возвращает True: строки можно
+        добавлять и удалять в библиотеке без отдельных сигналов. Вне batch() возвращает False.
+        """
+        if not self._batch_depth:
+            return False
+        if not self._batch_reset:
+            self.beginResetModel()  # Сброс завершится в конце группы
+            self._batch_reset = True
+            self._batch_rows.clear()  # Изменённые строки сообщит сам сброс
+        return True
+
+    def _emit_rows_changed(self, rows):
+        """
+        Сообщает об изменении строк rows (отсортированных по возрастанию): по диапазонам подряд идущих строк, а если
+        диапазонов слишком много - одним сигналом от первой до последней строки. Внутри batch() запоминает строки
+        до конца группы.
+        """
+        if self._batch_depth:
+            if not self._batch_reset:
+                self._batch_rows.update(rows)
+            return
+        ranges = []  # Диапазоны подряд идущих строк [first, last]
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        if len(ranges) > RANGE_SIGNAL_LIMIT:
+            ranges = [[rows[0], rows[-1]]]
+        for first, last in ranges:
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+
+class RemarkFilterProxyModel(QAbstractProxyModel):
+    """
+    Прокси-модель вкладки: показывает замечания одной категории (или все замечания для вкладки "Все"),
+    отфильтрованные по битовой маске, которую строит RemarkModel.filter_mask по поисковому запросу и тегам.
+
+    К модели замечаний подключена только прокси-модель текущей вкладки (set_active): скрытые вкладки не перепроверяют
+    фильтр при каждой вставке и удалении строк, а отображение строится заново при переходе на вкладку.
+
+    Видимые строки - отсортированный список номеров строк модели замечаний (rows), который строится по индексам
+    библиотеки: для вкладки категории - по идентификаторам её замечаний, для маски - по установленным битам. Поэтому
+    переход на вкладку и смена фильтра стоят столько, сколько замечаний на вкладке, без проверки каждой строки
+    библиотеки на Python, как в QSortFilterProxyModel. Вкладка "Все" без фильтра показывает строки модели как есть.
+    Замечания, которые при редактировании сменили категорию, появляются на вкладке или пропадают с неё.
+
+    Методы:
+        set_active(active):
+            Подключает прокси-модель к модели замечаний или отключает её.
+        set_filter(mask):
+            Устанавливает маску видимых замечаний и применяет её.
+        accepts_row(source_row):
+            Определяет, отображать ли строку модели замечаний.
+        source_rows(first, last):
+            Возвращает номера строк модели замечаний для диапазона строк прокси-модели.
+        index_of(remark_id):
+            Возвращает индекс строки замечания в прокси-модели.
+        selection_of(remark_ids):
+            Возвращает выделение видимых строк с замечаниями remark_ids.
+    """
+    def __init__(self, remark_model, category=None, parent=None):
+        """
+        Конструктор класса RemarkFilterProxyModel.
+
+        Аргументы:
+            remark_model (RemarkModel): Модель замечаний, которую показывает вкладка (подключается в set_active).
+            category (str, optional): Категория вкладки. None - вкладка "Все" (без фильтра по категории).
+            parent (QObject, optional): Родительский объект. По умолчанию None.
+        """
+        super().__init__(parent)  # Вызываем конструктор родительского класса QAbstractProxyModel
+        self.remark_model = remark_model  # Модель замечаний (исходная модель, пока вкладка активна)
+        self.category = category  # Категория вкладки (None для вкладки "Все")
+        self.visible_bits = None  # Маска видимых замечаний в виде байтов (None - фильтр не задан)
+        self.rows = []  # Видимые строки модели замечаний по возрастанию (None - все строки, без фильтра)
+        self._source_resetting = False  # Модель замечаний начала сброс, и прокси-модель сбрасывается вместе с ней
+
+    def set_active(self, active):
+        """
+        Подключает прокси-модель к модели замечаний (active=True) или отключает её, сбрасывая фильтр.
+
+        Отключённая прокси-модель пуста и не получает сигналов модели, поэтому скрытые вкладки ничего не стоят
+        при загрузке и изменении замечаний. Если модель посреди группы изменений со сбросом (RemarkModel.batch),
+        прокси-модель подключится в конце группы, когда строки модели снова можно читать.
+        """
+        if self in self.remark_model.batch_proxies:
+            self.remark_model.batch_proxies.remove(self)
+        source_model = self.remark_model if active else None
+        if self.sourceModel() is source_model:
+            return
+        if not active:
+            self.visible_bits = None  # При возвращении на вкладку фильтр задаётся заново
+        elif self.remark_model.batch_resetting:
+            self.remark_model.batch_proxies.append(self)
+            return
+        if not self._source_resetting:  # Иначе сброс уже начат вместе со сбросом модели замечаний
+            self.beginResetModel()
+        self._source_resetting = False
+        for signal, slot in self._source_connections():
+            if active:
+                signal.connect(slot)
+            else:
+                signal.disconnect(slot)
+        self.setSourceModel(source_model)
+        self.rows = self._visible_rows()
+        self.endResetModel()
+
+    def set_filter(self, mask):
+        """
+        Устанавливает маску видимых замечаний (None - показывать все) и строит видимые строки заново одним сбросом.
+
+        Сброс не переносит выделение списка на новые строки (при тысячах выделенных замечаний это занимало бы
+        секунды): выделение после смены фильтра восстанавливает сам список (см. selection_of).
+
+        Аргументы:
+            mask (int | None): Маска видимых замечаний по их идентификаторам.
+
+        Возвращает:
+            bool: True, если набор видимых замечаний изменился.
+        """
+        # Переводим маску в байты один раз, чтобы проверка каждой строки была обращением к байту, а не сдвигом int
+        visible_bits = None if mask is None else mask.to_bytes(mask.bit_length() // 8 + 1, "little")
+        if visible_bits == self.visible_bits:
+            return False  # Результат фильтрации не изменился (например, к запросу добавили пробел) - список не трогаем
+        self.visible_bits = visible_bits
+        if self.sourceModel() is None or self.remark_model.batch_resetting:
+            return True  # Отображение перестроится при подключении или в конце сброса модели уже с новой маской
+        self.beginResetModel()
+        self.rows = self._visible_rows()
+        self.endResetModel()
+        return True
+
+    def accepts_row(self, source_row):
+        """Возвращает True, если замечание подходит под категорию вкладки и установлено в маске видимых замечаний."""
+        remark = self.remark_model.library.remarks[source_row]
+        if self.category is not None and remark.category != self.category:
+            return False  # Замечание из другой категории
+        if self.visible_bits is not None:
+            byte = remark.id >> 3
+            return byte < len(self.visible_bits) and bool(self.visible_bits[byte] >> (remark.id & 7) & 1)
+        return True
+
+    def source_rows(self, first, last):
+        """Возвращает номера строк модели замечаний, которые показаны в строках first..last прокси-модели."""
+        return range(first, last + 1) if self.rows is None else self.rows[first:last + 1]
+
+    def index_of(self, remark_id):
+        """Возвращает индекс строки замечания remark_id (недействительный, если замечание скрыто фильтром)."""
+        return self.mapFromSource(self.remark_model.index(self.remark_model.library.row_of(remark_id)))
+
+    def selection_of(self, remark_ids):
+        """Возвращает выделение (QItemSelection) видимых строк с замечаниями remark_ids, по диапазону на отрезок."""
+        rows = [self.mapFromSource(self.remark_model.index(row)).row()
+                for row in self.remark_model.library.rows_of(remark_ids)]
+        selection = QItemSelection()
+        for first, last in row_ranges(row for row in rows if row >= 0):  # Скрытые фильтром замечания пропускаем
+            selection.select(self.index(first, 0), self.index(last, 0))
+        return selection
+
+    def rowCount(self, parent=QModelIndex()):
+        """Возвращает количество видимых строк."""
+        if parent.isValid():
+            return 0
+        return self.remark_model.rowCount() if self.rows is None else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Возвращает количество столбцов (у списка - один)."""
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        """Возвращает индекс строки row прокси-модели."""
+        if parent.isValid() or column != 0 or not 0 <= row < self.rowCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index):
+        """У строк списка нет родителя."""
+        return QModelIndex()
+
+    def hasChildren(self, parent=QModelIndex()):
+        """Дочерние строки есть только у корня списка."""
+        return not parent.isValid() and self.rowCount() > 0
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Возвращает данные замечания из модели замечаний (см. RemarkModel.data)."""
+        if not index.isValid():
+            return None
+        return self.remark_model.data(self.mapToSource(index), role)
+
+    def mapToSource(self, proxy_index):
+        """Возвращает индекс модели замечаний для строки прокси-модели."""
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = proxy_index.row()
+        return self.remark_model.index(row if self.rows is None else self.rows[row])
+
+    def mapFromSource(self, source_index):
+        """Возвращает индекс строки прокси-модели для строки модели замечаний (недействительный, если она скрыта)."""
+        if not source_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = source_index.row()
+        if self.rows is not None:
+            position = bisect_left(self.rows, row)
+            if position == len(self.rows) or self.rows[position] != row:
+                return QModelIndex()
+            row = position
+        return self.createIndex(row, 0)
+
+    def _visible_rows(self):
+        """Строит список видимых строк по индексам библиотеки (None - показываются все строки модели)."""
+        if self.sourceModel() is None:
+            return []
+        library = self.remark_model.library
+        bits = self.visible_bits
+        if self.category is None:
+            if bits is None:
+                return None
+            # В маске могут остаться замечания, удалённые после её построения
+            return library.rows_of(mask_ids(bits), skip_missing=True)
+        remark_ids = library.category_ids(self.category)
+        if bits is not None:
+            size = len(bits)
+            remark_ids = [
+                remark_id for remark_id in remark_ids
+                if remark_id >> 3 < size and bits[remark_id >> 3] >> (remark_id & 7) & 1
+            ]
+        return library.rows_of(remark_ids)
+
+    def _rebuild(self):
+        """Строит видимые строки заново одним сбросом (если изменения разбросаны по слишком многим диапазонам)."""
+        self.beginResetModel()
+        self.rows = self._visible_rows()
+        self.endResetModel()
+
+    def _source_connections(self):
+        """Возвращает пары (сигнал модели замечаний, обработчик), через которые прокси-модель следит за ней."""
+        model = self.remark_model
+        return (
+            (model.modelAboutToBeReset, self._source_about_to_be_reset),
+            (model.modelReset, self._source_reset),
+            (model.rowsAboutToBeInserted, self._source_rows_about_to_be_inserted),
+            (model.rowsInserted, self._source_rows_inserted),
+            (model.rowsAboutToBeRemoved, self._source_rows_about_to_be_removed),
+            (model.rowsRemoved, self._source_rows_removed),
+            (model.dataChanged, self._source_data_changed),
+        )
+
+    def _source_about_to_be_reset(self):
+        """Начинает сброс вместе с моделью замечаний."""
+        self.beginResetModel()
+        self._source_resetting = True
+
+    def _source_reset(self):
+        """Строит видимые строки по новому состоянию модели замечаний и завершает сброс."""
+        self._source_resetting = False
+        self.rows = self._visible_rows()
+        self.endResetModel()
+
+    def _source_rows_about_to_be_inserted(self, parent, first, last):
+        """Без фильтра строки модели показываются как есть: о вставке сообщаем тем же диапазоном."""
+        if self.rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _source_rows_inserted(self, parent, first, last):
+        """Сдвигает видимые строки после вставленных и показывает вставленные строки, подходящие под фильтр."""
+        if self.rows is None:
+            self.endInsertRows()
+            return
+        count = last - first + 1
+        rows = self.rows
+        position = bisect_left(rows, first)
+        rows[position:] = [row + count for row in rows[position:]]
+        inserted = [row for row in range(first, last + 1) if self.accepts_row(row)]
+        if inserted:  # Вставленные строки модели идут подряд, поэтому и в прокси-модели занимают один диапазон
+            self.beginInsertRows(QModelIndex(), position, position + len(inserted) - 1)
+            rows[position:position] = inserted
+            self.endInsertRows()
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        """Убирает видимые строки из удаляемого диапазона, пока их данные ещё можно прочитать."""
+        if self.rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        start, end = bisect_left(self.rows, first), bisect_right(self.rows, last)
+        if start < end:
+            self.beginRemoveRows(QModelIndex(), start, end - 1)
+            del self.rows[start:end]
+            self.endRemoveRows()
+
+    def _source_rows_removed(self, parent, first, last):
+        """Сдвигает видимые строки после удалённого диапазона."""
+        if self.rows is None:
+            self.endRemoveRows()
+            return
+        count = last - first + 1
+        rows = self.rows
+        position = bisect_left(rows, first)
+        rows[position:] = [row - count for row in rows[position:]]
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        """
+        Сообщает об изменённых строках. Строки, которые перестали подходить под фильтр (замечание сменило
+        категорию), убираются, а начавшие подходить - показываются.
+        """
+        first, last = top_left.row(), bottom_right.row()
+        if self.rows is None:
+            self.dataChanged.emit(self.index(first), self.index(last))
+            return
+        rows = self.rows
+        start, end = bisect_left(rows, first), bisect_right(rows, last)
+        visible = [row for row in range(first, last + 1) if self.accepts_row(row)]
+        if visible != rows[start:end]:
+            visible_set, shown = set(visible), set(rows[start:end])
+            removed = row_ranges(position for position in range(start, end) if rows[position] not in visible_set)
+            if len(removed) > RANGE_SIGNAL_LIMIT:
+                self._rebuild()
+                return
+            for removed_first, removed_last in reversed(removed):
+                self.beginRemoveRows(QModelIndex(), removed_first, removed_last)
+                del rows[removed_first:removed_last + 1]
+                self.endRemoveRows()
+            groups = []  # Новые видимые строки, которые встают в прокси-модели на одно место: [позиция, строки]
+            for row in visible:
+                if row in shown:
+                    continue
+                position = bisect_left(rows, row)
+                if groups and groups[-1][0] == position:
+                    groups[-1][1].append(row)
+                else:
+                    groups.append([position, [row]])
+            if len(groups) > RANGE_SIGNAL_LIMIT:
+                self._rebuild()
+                return
+            for position, inserted in reversed(groups):  # С конца: вставка не сдвигает позиции предыдущих групп
+                self.beginInsertRows(QModelIndex(), position, position + len(inserted) - 1)
+                rows[position:position] = inserted
+                self.endInsertRows()
+            start, end = bisect_left(rows, first), bisect_right(rows, last)
+        if start < end:
+            self.dataChanged.emit(self.index(start), self.index(end - 1))
@@ -0,0 +1,146 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+
+
+TAG_ROLE = Qt.UserRole  # Роль, под которой модель отдаёт сам тег (без количества замечаний)
+RANGE_SIGNAL_LIMIT = 32  # Если изменения разбиты на большее число диапазонов строк, модель сбрасывается целиком
+
+
+class TagListModel(QAbstractListModel):
+    """
+    Qt-модель списка тегов на панели тегов: теги текущей вкладки в алфавитном порядке с количеством замечаний.
+
+    Список не перестраивается целиком: set_counts сравнивает новые счётчики (см. tag_index.TagCounts) с показанными
+    и сообщает представлению только о добавленных и исчезнувших тегах и об изменившихся количествах. Отметки тегов
+    хранятся отдельно от строк, поэтому переживают изменения замечаний и переход на другую вкладку.
+
+    Сигналы:
+        check_changed(): Изменился набор отмеченных тегов.
+
+    Методы:
+        rowCount(parent=QModelIndex()):
+            Возвращает количество тегов.
+        data(index, role=Qt.DisplayRole):
+            Возвращает подпись, тег или состояние отметки.
+        set_counts(counts, all_counts):
+            Приводит список к новым счётчикам тегов.
+        toggle(index):
+            Переключает отметку тега.
+        checked_tags():
+            Возвращает отмеченные теги, показанные в списке.
+        uncheck_all():
+            Снимает все отметки.
+    """
+    check_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        """
+        Конструктор класса TagListModel.
+
+        Аргументы:
+            parent (QObject, optional): Родительский объект. По умолчанию None.
+        """
+        super().__init__(parent)  # Вызываем конструктор родительского класса QAbstractListModel
+        self.tags = []  # Показанные теги в алфавитном порядке (номер строки = индекс в списке)
+        self.counts = {}  # Тег -> количество замечаний с ним на текущей вкладке (копия счётчиков)
+        self.checked = set()  # Отмеченные теги (в том числе временно не показанные на текущей вкладке)
+
+    def rowCount(self, parent=QModelIndex()):
+        """Возвращает количество тегов (у элементов списка дочерних строк нет)."""
+        return 0 if parent.isValid() else len(self.tags)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Возвращает подпись "тег (количество)" (Qt.DisplayRole), тег (TAG_ROLE) или отметку (Qt.CheckStateRole)."""
+        if not index.isValid():
+            return None
+        tag = self.tags[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{tag} ({self.counts[tag]})"
+        if role == TAG_ROLE:
+            return tag
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if tag in self.checked else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        """
+        Возвращает флаги строки. Флаг Qt.ItemIsUserCheckable не ставится: отметку переключает щелчок по всей строке
+        (см. toggle), иначе щелчок по самому флажку переключал бы её дважды.
+        """
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+    def set_counts(self, counts, all_counts):
+        """
+        Приводит список к счётчикам counts, сообщая представлению только об изменениях.
+
+        Аргументы:
+            counts (dict[str, int]): Количество замечаний с каждым тегом на текущей вкладке.
+            all_counts (dict[str, int]): Количество замечаний с каждым тегом во всей библиотеке. Отметки тегов,
+                которых больше нет ни у одного замечания, снимаются; отметки тегов других вкладок сохраняются.
+        """
+        checked = {tag for tag in self.checked if tag in all_counts}
+        removed = [row for row, tag in enumerate(self.tags) if tag not in counts]  # По возрастанию
+        added = sorted(tag for tag in counts if tag not in self.counts)
+        if len(self._row_ranges(removed)) + len(added) > RANGE_SIGNAL_LIMIT:
+            self.beginResetModel()  # Вкладка с совсем другими тегами - одно перестроение вместо сотен сигналов
+            self.tags = sorted(counts)
+            self.counts = dict(counts)
+            self.endResetModel()
+        else:
+            for first, last in reversed(self._row_ranges(removed)):  # С конца, чтобы не сбивать номера строк
+                self.beginRemoveRows(QModelIndex(), first, last)
+                for tag in self.tags[first:last + 1]:
+                    del self.counts[tag]
+                del self.tags[first:last + 1]
+                self.endRemoveRows()
+            for tag in added:
+                row = bisect_left(self.tags, tag)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.tags.insert(row, tag)
+                self.counts[tag] = counts[tag]
+                self.endInsertRows()
+            changed = [row for row, tag in enumerate(self.tags) if self.counts[tag] != counts[tag]]
+            for first, last in self._row_ranges(changed):
+                for tag in self.tags[first:last + 1]:
+                    self.counts[tag] = counts[tag]
+                self.dataChanged.emit(self.index(first), self.index(last), [Qt.DisplayRole])
+        if checked != self.checked:
+            self.checked = checked
+            self.check_changed.emit()
+
+    def toggle(self, index):
+        """Переключает отметку тега в строке index."""
+        if not index.isValid():
+            return
+        tag = self.tags[index.row()]
+        if tag in self.checked:
+            self.checked.discard(tag)
+        else:
+            self.checked.add(tag)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        self.check_changed.emit()
+
+    def checked_tags(self):
+        """Возвращает множество отмеченных тегов, которые есть на текущей вкладке (по ним фильтруются замечания)."""
+        return {tag for tag in self.checked if tag in self.counts}
+
+    def uncheck_all(self):
+        """Снимает все отметки одним сигналом."""
+        if not self.checked:
+            return
+        self.checked.clear()
+        if self.tags:
+            self.dataChanged.emit(self.index(0), self.index(len(self.tags) - 1), [Qt.CheckStateRole])
+        self.check_changed.emit()
+
+    @staticmethod
+    def _row_ranges(rows):
+        """Объединяет возрастающие номера строк в диапазоны [first, last]."""
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        return ranges
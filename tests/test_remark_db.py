@@ -0,0 +1,151 @@
+"""
+Построчная запись в базу данных и восстановление несохранённых изменений из журнала.
+
+Изменения вносятся и восстанавливаются окном приложения (MainWindow) без вывода на экран: удаление, отмена
+и сохранение записываются в базу построчно, а после "сбоя" новое окно открывает базу и применяет журнал
+(MainWindow.recover_journal).
+
+Запуск:
+    python -m pytest tests
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+try:
+    from PyQt5.QtCore import QItemSelectionModel, QSettings, QStandardPaths
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
+    import main_window
+except ImportError:  # Без PyQt5 окно приложения не создать
+    QApplication = None
+
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "example.json")
+ROW = 5  # Строка удаляемого и редактируемого замечания
+EDITED_TEXT = "Изменённое замечание;"
+LOAD_TIMEOUT = 30  # Сколько секунд ждать загрузки файла
+
+
+class FakeRemarkDialog:
+    """Диалог редактирования замечания, который сразу возвращает новый текст, сохраняя категорию и теги."""
+    def __init__(self, parent, text="", category="Без категории", tags=None):
+        self.data = (EDITED_TEXT, category, tags)
+
+    def exec(self):
+        return True
+
+    def get_data(self):
+        return self.data
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 не установлен")
+class SQLiteRecoveryTest(unittest.TestCase):
+    """Удаление -> отмена -> сохранение -> редактирование -> сбой -> восстановление в базе данных."""
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт приложение без вывода на экран, с настройками и данными во временной папке."""
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        cls.settings_directory = tempfile.TemporaryDirectory()
+        QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, cls.settings_directory.name)
+        QStandardPaths.setTestModeEnabled(True)  # Журнал нового файла - не в папке данных пользователя
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Удаляет временную папку настроек."""
+        cls.settings_directory.cleanup()
+
+    def setUp(self):
+        """Записывает замечания примера в новую базу данных и открывает её в окне."""
+        from nca.remark_db import write_database
+        from nca.remark_io import load_library
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "library.sqlite")
+        library = load_library(EXAMPLE_FILE)
+        write_database(self.filename, library.remarks, list(library.categories)).close()
+        self.windows = []
+        self.window = self.open_window()
+
+    def tearDown(self):
+        """Закрывает журналы и базы окон и удаляет временную папку."""
+        for window in self.windows:
+            window.autosave_timer.stop()
+            window.journal.close()
+            window.close_database()
+            window.deleteLater()
+        self.app.processEvents()
+        self.directory.cleanup()
+
+    def open_window(self):
+        """Создаёт окно и загружает в него базу данных (на предложение восстановить изменения отвечает "Да")."""
+        window = main_window.MainWindow()
+        self.windows.append(window)
+        with mock.patch.object(main_window.QMessageBox, "question", return_value=QMessageBox.Yes):
+            window.load_file(self.filename)
+            deadline = time.monotonic() + LOAD_TIMEOUT
+            while window.load_worker is not None and time.monotonic() < deadline:
+                self.app.processEvents()
+        self.assertIsNone(window.load_worker, "файл не загрузился")
+        return window
+
+    def select_row(self, row):
+        """Выделяет строку row на вкладке "Все"."""
+        self.window.ui.tabWidget.setCurrentIndex(0)
+        list_view = self.window.ui.tabWidget.currentWidget()
+        list_view.selectionModel().select(list_view.model().index(row, 0), QItemSelectionModel.ClearAndSelect)
+
+    def remove_row(self, row):
+        """Удаляет замечание в строке row."""
+        self.select_row(row)
+        self.window.remove_remark()
+
+    def edit_and_crash(self):
+        """Редактирует замечание в строке ROW и "падает": окно не закрывается, журнал остаётся на диске."""
+        self.select_row(ROW)
+        with mock.patch("remark_dialog.RemarkDialog", FakeRemarkDialog):
+            self.window.edit_remark()
+        self.window.autosave_timer.stop()
+        self.window.journal.close()
+        self.window.close_database()
+
+    def texts(self, window):
+        """Возвращает тексты замечаний окна в порядке строк."""
+        return [remark.text for remark in window.remark_model.remarks]
+
+    def test_restored_row_keeps_position(self):
+        """Возвращённое замечание записывается в прежнюю строку: порядок в базе совпадает с порядком в памяти."""
+        self.remove_row(ROW)
+        self.window.undo()
+        self.assertTrue(self.window.save_file())
+        remark_ids = [remark.id for remark in self.window.remark_model.remarks]
+        self.assertEqual(self.window.database.ordered_ids(), remark_ids)
+        self.edit_and_crash()
+        expected = self.texts(self.window)
+        self.assertEqual(expected[ROW], EDITED_TEXT)
+
+        recovered = self.open_window()
+        self.assertTrue(recovered.is_modified)
+        self.assertEqual(self.texts(recovered), expected)
+
+    def test_restored_row_taken(self):
+        """Если прежняя строка занята, замечание дописывается в конец базы, и журнал учитывает этот порядок."""
+        self.remove_row(ROW)
+        self.assertTrue(self.window.save_file())
+        self.window.database.removed_rowids.clear()  # Как будто прежнюю строку заняло другое замечание
+        self.window.undo()
+        self.assertTrue(self.window.save_file())
+        self.assertEqual(self.window.database.ordered_ids()[-1], self.window.remark_model.remarks[ROW].id)
+        self.edit_and_crash()
+        expected = self.texts(self.window)
+
+        recovered = self.open_window()
+        self.assertTrue(recovered.is_modified)
+        self.assertEqual(sorted(self.texts(recovered)), sorted(expected))
+        self.assertEqual(self.texts(recovered)[-1], EDITED_TEXT)  # Возвращённое и изменённое замечание - в конце базы
+
+
+if __name__ == "__main__":
+    unittest.main()
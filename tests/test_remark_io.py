@@ -0,0 +1,140 @@
+"""
+Чтение файлов замечаний: потоковый разбор JSON, журнал операций и снимок .json-файла.
+
+Запуск:
+    python -m pytest tests
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from nca import remark_io
+from nca.journal import OperationJournal
+from nca.remark_io import JsonArrayStream, iter_json, json_chunks, load_library, write_file
+from nca.remark_snapshot import Snapshot, write_json_snapshot
+
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "example.json")
+
+
+def stream_items(data, read_size=remark_io.READ_SIZE):
+    """Разбирает JSON-массив data (bytes) потоково, читая файл блоками по read_size байт."""
+    with tempfile.TemporaryFile() as file:
+        file.write(data)
+        file.seek(0)
+        with mock.patch.object(remark_io, "READ_SIZE", read_size):
+            return list(JsonArrayStream(file))
+
+
+class JsonArrayStreamTest(unittest.TestCase):
+    """Потоковый разбор даёт те же элементы, что и json.load, при любой границе блоков."""
+    def test_example_file(self):
+        """Файл примера, прочитанный большими и маленькими блоками."""
+        with open(EXAMPLE_FILE, "rb") as file:
+            data = file.read()
+        expected = json.loads(data.decode("utf-8"))
+        for read_size in (remark_io.READ_SIZE, 1000, 7, 1):  # Маленькие блоки режут строки и символы UTF-8
+            self.assertEqual(stream_items(data, read_size), expected, read_size)
+
+    def test_values(self):
+        """Пустой массив, числа на границе блока, экранирование и вложенные значения."""
+        for items in ([], [1, 22, 333], [{"text": "кавычка \" и \\n", "tags": ["а", "б"]}], [[], {}, None, 1.5e3]):
+            data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+            for read_size in (1, 2, 3, 1024):
+                self.assertEqual(stream_items(data, read_size), items, (items, read_size))
+
+    def test_errors(self):
+        """Не массив, обрезанный массив и лишние данные после него."""
+        for data in (b'{"text": "a"}', b'[{"text": "a"}', b'[1, 2', b'[1] 2', b'[1 2]'):
+            with self.assertRaises(ValueError, msg=data):
+                stream_items(data, 3)
+
+
+class JournalReadTest(unittest.TestCase):
+    """Чтение журнала после аварийного завершения."""
+    def setUp(self):
+        """Записывает журнал из первой записи и двух операций."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "example.json.journal")
+        self.base = {"ids": [[0, 3]], "tabs": ["А"]}
+        journal = OperationJournal()
+        journal.start(self.path, self.base)
+        journal.append("edit", id=1, text="изменено", category="А", tags=[])
+        journal.append("remove", ids=[2])
+        journal.close()
+
+    def tearDown(self):
+        """Удаляет временную папку."""
+        self.directory.cleanup()
+
+    def test_complete(self):
+        """Целый журнал читается полностью."""
+        base, operations = OperationJournal.read(self.path)
+        self.assertEqual(base, dict(self.base, op="base"))
+        self.assertEqual([operation["op"] for operation in operations], ["edit", "remove"])
+
+    def test_truncated_last_line(self):
+        """Недописанная последняя строка (в том числе посреди символа UTF-8) пропускается."""
+        with open(self.path, "rb") as file:
+            data = file.read()
+        last_line = data.rstrip(b"\n").rfind(b"\n") + 1
+        for cut in (last_line + 5, len(data) - 2, data.index("изменено".encode("utf-8")) + 1):
+            with open(self.path, "wb") as file:
+                file.write(data[:cut])
+            base, operations = OperationJournal.read(self.path)
+            self.assertEqual(base["tabs"], ["А"])
+            self.assertLess(len(operations), 2)
+            self.assertTrue(all(operation["op"] in ("edit", "remove") for operation in operations))
+
+    def test_damaged_start(self):
+        """Журнал без целой первой записи и отсутствующий журнал не читаются."""
+        with open(self.path, "wb") as file:
+            file.write(b'{"op": "ba')
+        self.assertIsNone(OperationJournal.read(self.path))
+        self.assertIsNone(OperationJournal.read(self.path + ".missing"))
+
+
+class SnapshotTest(unittest.TestCase):
+    """Снимок .json-файла читается в те же замечания и не подходит к изменённому файлу."""
+    def setUp(self):
+        """Записывает файл примера и его снимок во временную папку."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "example.json")
+        self.library = load_library(EXAMPLE_FILE)
+        self.categories = list(self.library.categories)
+        checksum = write_file(self.filename, json_chunks(self.library.remarks, self.categories))
+        write_json_snapshot(self.filename, self.library.remarks, self.categories, checksum)
+
+    def tearDown(self):
+        """Удаляет временную папку."""
+        self.directory.cleanup()
+
+    def test_same_remarks(self):
+        """Замечания снимка совпадают с замечаниями, прочитанными из .json-файла."""
+        snapshot = Snapshot.open(self.filename)
+        self.assertIsNotNone(snapshot)
+        expected = [(remark.text, remark.category, remark.tags) for remark in iter_json(self.filename)]
+        actual = [(remark.text, str(remark.category), remark.tags) for remark in snapshot.remarks()]
+        self.assertEqual(actual, expected)
+
+    def test_changed_file(self):
+        """После изменения файла (другой размер) снимок не открывается."""
+        with open(self.filename, "ab") as file:
+            file.write(b"\n")
+        self.assertIsNone(Snapshot.open(self.filename))
+
+    def test_truncated_snapshot(self):
+        """Обрезанный снимок не открывается."""
+        path = self.filename + ".snapshot"
+        with open(path, "rb") as file:
+            data = file.read()
+        for size in (10, len(data) // 2, len(data) - 1):
+            with open(path, "wb") as file:
+                file.write(data[:size])
+            self.assertIsNone(Snapshot.open(self.filename), size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Поиск по подстроке, маски тегов и автодополнение тегов библиотеки замечаний в сравнении с прямым перебором.
+
+Запуск:
+    python -m pytest tests
+"""
+import random
+import unittest
+
+from nca.remark_library import Remark, RemarkLibrary
+from nca.tag_index import COMPLETION_SORT_LIMIT, TagCompletion
+
+
+WORDS = ["титульный", "лист", "Рисунок", "на", "подпись", "ссылка", "ГОСТ", "ёлка", "таблица", "номер"]
+TAGS = ["вкр", "гост", "оформление", "текст", "рисунки"]
+QUERIES = ["на", "лист", "ли", "РИС", "к н", "ё", "гост 7", "нет такого", " ", "."]
+
+
+def random_remarks(rnd, count):
+    """Возвращает count замечаний со случайными текстами из WORDS и тегами из TAGS."""
+    return [
+        Remark(" ".join(rnd.choices(WORDS + ["7.32", ",", "."], k=rnd.randint(1, 8))), rnd.choice(["А", "Б"]),
+               rnd.sample(TAGS, rnd.randint(0, 3)))
+        for _ in range(count)
+    ]
+
+
+def mask_ids(mask):
+    """Возвращает множество номеров установленных битов маски (None - фильтр не задан)."""
+    return None if mask is None else {bit for bit in range(mask.bit_length()) if mask >> bit & 1}
+
+
+class SearchTest(unittest.TestCase):
+    """Результат поиска совпадает с перебором "запрос - подстрока текста в нижнем регистре"."""
+    def setUp(self):
+        """Строит библиотеку из случайных замечаний."""
+        self.rnd = random.Random(1)
+        self.library = RemarkLibrary(random_remarks(self.rnd, 300))
+
+    def assert_matches_scan(self):
+        """Сверяет поиск по каждому запросу из QUERIES с перебором всех замечаний."""
+        for query in QUERIES:
+            expected = {remark.id for remark in self.library.remarks if query.lower() in remark.text.lower()}
+            self.assertEqual(self.library.search_index.search(query), expected, query)
+
+    def test_search(self):
+        """Поиск по только что построенной библиотеке."""
+        self.assert_matches_scan()
+
+    def test_search_after_changes(self):
+        """Поиск после добавления, изменения и удаления замечаний."""
+        self.library.search_index.search("на")  # Кэш предыдущего запроса не должен пережить изменения
+        for remark in random_remarks(self.rnd, 20):
+            self.library.append(remark)
+        for remark in self.rnd.sample(self.library.remarks, 30):
+            self.library.update(remark.id, remark.text + " на листе", remark.category, remark.tags)
+        self.library.remove([remark.id for remark in self.rnd.sample(self.library.remarks, 40)])
+        self.assert_matches_scan()
+
+    def test_refined_query(self):
+        """Уточнение запроса (поиск среди результатов предыдущего) даёт тот же результат, что и поиск с нуля."""
+        for query in ("л", "ли", "лис", "лист", "лист на"):
+            expected = {remark.id for remark in self.library.remarks if query in remark.text.lower()}
+            self.assertEqual(self.library.search_index.search(query), expected, query)
+
+
+class TagMaskTest(unittest.TestCase):
+    """Маски тегов в режимах "AND" и "OR" совпадают с перебором тегов замечаний."""
+    def setUp(self):
+        """Строит библиотеку из случайных замечаний."""
+        self.rnd = random.Random(2)
+        self.library = RemarkLibrary(random_remarks(self.rnd, 300))
+
+    def assert_masks(self, tags):
+        """Сверяет маски тегов tags в обоих режимах с перебором."""
+        tags = set(tags)
+        remarks = self.library.remarks
+        self.assertEqual(
+            mask_ids(self.library.filter_mask("", tags, "AND")),
+            {remark.id for remark in remarks if tags.issubset(remark.tags)} if tags else None
+        )
+        self.assertEqual(
+            mask_ids(self.library.filter_mask("", tags, "OR")),
+            {remark.id for remark in remarks if tags.intersection(remark.tags)} if tags else None
+        )
+
+    def test_masks(self):
+        """Маски для пустого выбора, одного, нескольких и неизвестного тега."""
+        for tags in ([], ["вкр"], ["вкр", "гост"], ["текст", "рисунки", "оформление"], ["нет такого"]):
+            self.assert_masks(tags)
+
+    def test_masks_after_changes(self):
+        """Маски после изменения тегов, группового изменения и удаления замечаний."""
+        for remark in self.rnd.sample(self.library.remarks, 30):
+            self.library.update(remark.id, remark.text, remark.category, self.rnd.sample(TAGS, 2))
+        self.library.bulk_update([remark.id for remark in self.library.remarks[:50]], add_tags=["гост"],
+                                 remove_tags=["вкр"])
+        self.library.remove([remark.id for remark in self.rnd.sample(self.library.remarks, 40)])
+        for tags in (["вкр"], ["гост", "текст"], TAGS):
+            self.assert_masks(tags)
+
+    def test_combined_with_search(self):
+        """Маска поиска и тегов - пересечение результата поиска и маски тегов."""
+        expected = {
+            remark.id for remark in self.library.remarks if "на" in remark.text.lower() and "вкр" in remark.tags
+        }
+        self.assertEqual(mask_ids(self.library.filter_mask("на", ["вкр"], "AND")), expected)
+
+
+class CompletionTest(unittest.TestCase):
+    """Подсказки тегов: по убыванию количества замечаний, при равенстве - по алфавиту без учёта регистра."""
+    def expected(self, counts, prefix, limit=20):
+        """Возвращает подсказки, вычисленные сортировкой всех тегов."""
+        tags = [tag for tag in counts if tag.casefold().startswith(prefix.casefold())]
+        return sorted(tags, key=lambda tag: (-counts[tag], tag.casefold()))[:limit]
+
+    def test_ranking(self):
+        """Порядок подсказок после увеличения и уменьшения счётчиков."""
+        counts = {}
+        completion = TagCompletion(counts)
+        completion.complete("")
+        rnd = random.Random(3)
+        names = ["Тег%d" % i for i in range(40)] + ["тип", "Тир", "вкр"]
+        for _ in range(2000):
+            tag = rnd.choice(names)
+            if tag in counts and rnd.random() < 0.4:
+                completion.decrement(tag)
+                counts[tag] -= 1
+                if not counts[tag]:
+                    del counts[tag]
+            else:
+                counts[tag] = counts.get(tag, 0) + 1
+                completion.increment(tag)
+        for prefix in ("", "т", "ТЕГ1", "ти", "вкр", "нет"):
+            self.assertEqual(completion.complete(prefix), self.expected(counts, prefix), prefix)
+
+    def test_ties_with_many_matches(self):
+        """
+        Если тегов с префиксом больше COMPLETION_SORT_LIMIT и у всех одинаковое количество, подсказки идут
+        по алфавиту, хотя увеличение и уменьшение счётчиков переставили теги внутри блока равных количеств.
+        """
+        counts = {"t%04d" % i: 1 for i in range(COMPLETION_SORT_LIMIT + 88)}
+        completion = TagCompletion(counts)
+        completion.complete("")
+        for tag in random.Random(4).sample(sorted(counts), len(counts) // 2):
+            counts[tag] += 1
+            completion.increment(tag)
+            completion.decrement(tag)
+            counts[tag] -= 1
+        self.assertEqual(completion.complete("t"), self.expected(counts, "t"))
+        counts["t0599"] += 1
+        completion.increment("t0599")
+        self.assertEqual(completion.complete("t"), self.expected(counts, "t"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Стек отмены и повтора действий пользователя.
+
+Запуск:
+    python -m pytest tests
+"""
+import unittest
+
+from nca.undo_stack import UndoCommand, UndoStack
+
+
+def command(name, size=10):
+    """Возвращает команду name с заданным примерным объёмом памяти."""
+    result = UndoCommand(name, [], [])
+    result.size = size
+    return result
+
+
+class UndoStackTest(unittest.TestCase):
+    """Порядок отмены и повтора и ограничение объёма памяти."""
+    def test_undo_redo(self):
+        """Команды отменяются с последней, повторяются с последней отменённой, новая команда очищает повтор."""
+        stack = UndoStack(1000)
+        first, second, third = command("first"), command("second"), command("third")
+        stack.push(first)
+        stack.push(second)
+        self.assertIs(stack.undo(), second)
+        self.assertIs(stack.undo(), first)
+        self.assertIsNone(stack.undo())
+        self.assertIs(stack.redo(), first)
+        stack.push(third)
+        self.assertFalse(stack.can_redo)
+        self.assertIsNone(stack.redo())
+        self.assertEqual(stack.size, 20)
+        self.assertIs(stack.undo(), third)
+        self.assertIs(stack.undo(), first)
+
+    def test_budget(self):
+        """Самые старые команды забываются при превышении бюджета, команда больше бюджета не сохраняется."""
+        stack = UndoStack(25)
+        for name in ("first", "second", "third"):
+            stack.push(command(name))
+        self.assertEqual(stack.size, 20)
+        self.assertEqual(stack.undo().op, "third")
+        self.assertEqual(stack.undo().op, "second")
+        self.assertIsNone(stack.undo())
+        stack.push(command("huge", 100))
+        self.assertFalse(stack.can_undo)
+        self.assertEqual(stack.size, 0)
+
+    def test_disabled(self):
+        """При нулевом бюджете отмена выключена."""
+        stack = UndoStack(0)
+        stack.push(command("first"))
+        self.assertFalse(stack.can_undo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from utils import resource_path
+
+
+class Ui_BulkEditDialog(object):
+    def setupUi(self, BulkEditDialog):
+        BulkEditDialog.setObjectName("BulkEditDialog")
+        BulkEditDialog.resize(600, 170)
+        BulkEditDialog.setMinimumSize(QtCore.QSize(600, 170))
+        icon = QtGui.QIcon()
+        icon.addPixmap(QtGui.QPixmap(resource_path("icons/edit.png")), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        BulkEditDialog.setWindowIcon(icon)
+        self.verticalLayout = QtWidgets.QVBoxLayout(BulkEditDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.countLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.countLabel.setMinimumSize(QtCore.QSize(0, 32))
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.countLabel.setFont(font)
+        self.countLabel.setObjectName("countLabel")
+        self.horizontalLayout_2.addWidget(self.countLabel)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_2.addItem(spacerItem)
+        self.categoryComboBox = QtWidgets.QComboBox(BulkEditDialog)
+        self.categoryComboBox.setMinimumSize(QtCore.QSize(200, 32))
+        self.categoryComboBox.setObjectName("categoryComboBox")
+        self.horizontalLayout_2.addWidget(self.categoryComboBox)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.addTagsLineEdit = QtWidgets.QLineEdit(BulkEditDialog)
+        self.addTagsLineEdit.setMinimumSize(QtCore.QSize(0, 32))
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.addTagsLineEdit.setFont(font)
+        self.addTagsLineEdit.setObjectName("addTagsLineEdit")
+        self.verticalLayout.addWidget(self.addTagsLineEdit)
+        self.removeTagsLineEdit = QtWidgets.QLineEdit(BulkEditDialog)
+        self.removeTagsLineEdit.setMinimumSize(QtCore.QSize(0, 32))
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        self.removeTagsLineEdit.setFont(font)
+        self.removeTagsLineEdit.setObjectName("removeTagsLineEdit")
+        self.verticalLayout.addWidget(self.removeTagsLineEdit)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        spacerItem1 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem1)
+        self.cancelButton = QtWidgets.QPushButton(BulkEditDialog)
+        self.cancelButton.setMinimumSize(QtCore.QSize(0, 32))
+        self.cancelButton.setObjectName("cancelButton")
+        self.horizontalLayout.addWidget(self.cancelButton)
+        self.saveButton = QtWidgets.QPushButton(BulkEditDialog)
+        self.saveButton.setMinimumSize(QtCore.QSize(0, 32))
+        self.saveButton.setDefault(True)
+        self.saveButton.setObjectName("saveButton")
+        self.horizontalLayout.addWidget(self.saveButton)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.retranslateUi(BulkEditDialog)
+        QtCore.QMetaObject.connectSlotsByName(BulkEditDialog)
+
+    def retranslateUi(self, BulkEditDialog):
+        _translate = QtCore.QCoreApplication.translate
+        BulkEditDialog.setWindowTitle(_translate("BulkEditDialog", "Редактирование выбранных замечаний"))
+        self.countLabel.setText(_translate("BulkEditDialog", "Выбрано замечаний:"))
+        self.addTagsLineEdit.setPlaceholderText(_translate("BulkEditDialog", "Добавить теги (через запятую)"))
+        self.removeTagsLineEdit.setPlaceholderText(_translate("BulkEditDialog", "Убрать теги (через запятую)"))
+        self.cancelButton.setText(_translate("BulkEditDialog", "Отмена"))
+        self.saveButton.setText(_translate("BulkEditDialog", "Сохранить"))
@@ -11,10 +11,10 @@ class Ui_MainWindow(object):
         icon = QtGui.QIcon()
         icon.addPixmap(QtGui.QPixmap(resource_path("icons/icon.png")), QtGui.QIcon.Normal, QtGui.QIcon.Off)
         MainWindow.setWindowIcon(icon)
-        MainWindow.setStyleSheet("QListWidget::item:hover {\n"
+        MainWindow.setStyleSheet("QListView::item:hover {\n"
 "    background-color: #e5f3ff;\n"
 "}\n"
-"QListWidget::item:selected {\n"
+"QListView::item:selected {\n"
 "    background-color: #cce8ff;\n"
 "    color: black;\n"
 "}")
@@ -174,9 +174,10 @@ class Ui_MainWindow(object):
         self.tagPanelOrButton.setObjectName("tagPanelOrButton")
         self.tagPanelTopLayout.addWidget(self.tagPanelOrButton)
         self.verticalLayout_2.addLayout(self.tagPanelTopLayout)
-        self.tagListWidget = QtWidgets.QListWidget(self.tagPanelWidget)
-        self.tagListWidget.setObjectName("tagListWidget")
-        self.verticalLayout_2.addWidget(self.tagListWidget)
+        self.tagListView = QtWidgets.QListView(self.tagPanelWidget)
+        self.tagListView.setUniformItemSizes(True)
+        self.tagListView.setObjectName("tagListView")
+        self.verticalLayout_2.addWidget(self.tagListView)
         self.centralHorizontalLayout.addWidget(self.tagPanelWidget)
         self.centralVerticalLayout = QtWidgets.QVBoxLayout()
         self.centralVerticalLayout.setObjectName("centralVerticalLayout")
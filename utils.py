@@ -1,5 +1,8 @@
 import sys
 import os
+import time
+
+STARTUP_TIMING_VARIABLE = "NCA_STARTUP_TIMING"  # Переменная окружения, включающая отчёт о времени запуска
 
 def resource_path(relative_path):
     """Возвращает абсолютный путь до ресурса. Работает и при запуске через терминал, и при запуске .exe-файла."""
@@ -8,3 +11,51 @@ def resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     # При обычном запуске через терминал
     return os.path.join(os.path.abspath("."), relative_path)
+
+
+class StartupTimer:
+    """
+    Замер времени запуска приложения по этапам (импорт, setupUi, чтение настроек, первая отрисовка, библиотека готова).
+
+    Включается переменной окружения NCA_STARTUP_TIMING=1 (работает и для собранного .exe-файла). Отсчёт идёт
+    от создания объекта, то есть от первого импорта utils в main.py. Когда отмечен последний этап, отчёт один раз
+    выводится в stderr: длительность каждого этапа и время от старта, в миллисекундах. Выключенный замер ничего
+    не делает.
+
+    Методы:
+        mark(stage):
+            Отмечает завершение этапа запуска.
+        finish(stage):
+            Отмечает последний этап и выводит отчёт.
+    """
+    def __init__(self, enabled):
+        """
+        Конструктор класса StartupTimer.
+
+        Аргументы:
+            enabled (bool): Вести замер и выводить отчёт.
+        """
+        self.enabled = enabled
+        self.start = time.perf_counter()  # Момент начала отсчёта
+        self.stages = []  # Отмеченные этапы: (название, момент завершения)
+
+    def mark(self, stage):
+        """Отмечает завершение этапа запуска stage (после вывода отчёта ничего не делает)."""
+        if self.enabled:
+            self.stages.append((stage, time.perf_counter()))
+
+    def finish(self, stage):
+        """Отмечает последний этап запуска stage и выводит отчёт в stderr (только один раз)."""
+        if not self.enabled:
+            return
+        self.mark(stage)
+        self.enabled = False  # Следующие загрузки и создания файлов к запуску не относятся
+        previous = self.start
+        lines = ["Время запуска (мс):"]
+        for name, moment in self.stages:
+            lines.append(f"{name:<20}{(moment - previous) * 1000:>10.1f}{(moment - self.start) * 1000:>10.1f}")
+            previous = moment
+        print("\n".join(lines), file=sys.stderr)
+
+
+startup_timer = StartupTimer(os.environ.get(STARTUP_TIMING_VARIABLE) == "1")  # Замер запуска этого процесса